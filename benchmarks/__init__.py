@@ -0,0 +1,10 @@
+# 性能基准测试，完全离线运行，DolphinDB和PocketBase均使用内存替身
+# 运行: python -m benchmarks.run
+import os
+import sys
+
+SRC_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"
+)
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
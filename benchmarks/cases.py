@@ -0,0 +1,325 @@
+import importlib.util
+import json
+
+import numpy as np
+
+from strategies.base import BaseStrategy, StateVariable
+from utils.common import record2dataframe
+from utils.option import MarketOptionChain
+from indicators.dsrt import DSRT
+from .stand_ins import MemoryDataFeed, make_bars
+
+# 基准测试名称 -> Case
+CASES = {}
+
+BENCH_SYMBOL = "510050.SH"
+BENCH_USER = "benchuser000001"
+
+
+class Case:
+    """
+    单个基准测试
+    setup(env)返回无参的操作函数，计时以一次调用为单位，ops为一次调用包含的操作次数
+    """
+
+    def __init__(self, name, setup, ops=1, requires=(), description=""):
+        self.name = name
+        self.setup = setup
+        self.ops = ops
+        self.requires = tuple(requires)
+        self.description = description
+
+    def missing_requirements(self):
+        """返回未安装的可选依赖"""
+        return [
+            name for name in self.requires if importlib.util.find_spec(name) is None
+        ]
+
+
+def case(name, ops=1, requires=()):
+    """注册基准测试的装饰器"""
+
+    def decorator(func):
+        CASES[name] = Case(name, func, ops, requires, (func.__doc__ or "").strip())
+        return func
+
+    return decorator
+
+
+class BenchStrategy(BaseStrategy):
+    """基准测试用的策略，on_bar只计数，处理完目标数量的K线后退出run循环"""
+
+    signal = StateVariable(0, description="信号")
+    last_close = StateVariable(0.0, description="最新收盘价")
+
+    def __init__(self, datafeed, strategy_id, name, params):
+        super().__init__(datafeed, strategy_id, name, params)
+        self.bars_seen = 0
+        self.stop_after = None
+
+    def on_bar(self, symbol, period, bar):
+        self.bars_seen += 1
+        if self.stop_after is not None and self.bars_seen >= self.stop_after:
+            self._running = False
+
+    def on_deal(self, deal_info):
+        pass
+
+
+class Env:
+    """一个基准测试的运行环境：内存数据源、内存PocketBase和一个策略"""
+
+    def __init__(self, seed=0, period=1, min_bars_count=300):
+        self.datafeed = MemoryDataFeed(seed=seed)
+        self.client = self.datafeed.client
+        self.strategy = BenchStrategy(
+            self.datafeed,
+            "benchstrategy01",
+            "bench",
+            {
+                "symbol": BENCH_SYMBOL,
+                "period": period,
+                "min_bars_count": min_bars_count,
+                "revaluation_window": 0,
+            },
+        )
+        self.strategy.set_user(BENCH_USER)
+
+    def prepare_strategy(self):
+        """完成策略run循环首次进入时的初始化（K线、持仓、组合、账户）"""
+        strategy = self.strategy
+        strategy._running = True
+        strategy.stop_after = 1
+        strategy._queue.put((BENCH_SYMBOL, strategy.period, make_bars(1).iloc[0]))
+        strategy.run()
+        strategy.account_id = "bench"
+        if not strategy.strategy_account.account:
+            strategy.strategy_account.account = {
+                "margin": 0,
+                "available_margin": 1e6,
+                "init_cash": 1e6,
+                "profit": 0,
+                "delta": 0,
+                "gamma": 0,
+                "vega": 0,
+                "theta": 0,
+                "rho": 0,
+            }
+        return strategy
+
+    def option_codes(self, count, seed=0):
+        """随机选取count个期权合约代码，与成交记录中的instrumentId格式相同"""
+        symbols = self.datafeed.instruments["InstrumentID"].to_numpy()
+        rng = np.random.default_rng(seed)
+        return rng.choice(
+            symbols, size=min(count, len(symbols)), replace=False
+        ).tolist()
+
+
+@case("bar_ingest", ops=1000)
+def bench_bar_ingest(env):
+    """行情消息经DolphinDBDataFeed._on_data_arrived分发到策略队列（1分钟和5分钟订阅）"""
+    env.datafeed.subscribe(BENCH_SYMBOL, 5, env.strategy._on_data_arrived)
+    bars = make_bars(1000)
+
+    def run():
+        env.datafeed.push_bars(BENCH_SYMBOL, bars)
+        # 清空队列，避免多轮之间积压
+        queue = env.strategy._queue
+        while not queue.empty():
+            queue.get_nowait()
+
+    return run
+
+
+@case("strategy_run_per_bar", ops=200)
+def bench_strategy_run(env):
+    """BaseStrategy.run每根K线的框架开销（追加K线、截断、状态检查、调用on_bar）"""
+    strategy = env.prepare_strategy()
+    bars = make_bars(200)
+    items = [(BENCH_SYMBOL, strategy.period, bar) for _, bar in bars.iterrows()]
+
+    def run():
+        for item in items:
+            strategy._queue.put(item)
+        strategy.bars_seen = 0
+        strategy.stop_after = len(items)
+        strategy._running = True
+        strategy.run()
+
+    return run
+
+
+@case("indicator_dsrt")
+def bench_dsrt(env):
+    """300根K线计算DSRT"""
+    bars = make_bars(300)
+    return lambda: DSRT(bars["close"], bars["high"], bars["low"])
+
+
+@case("indicator_macd", requires=["pandas_ta"])
+def bench_macd(env):
+    """300根K线计算MACD（pandas_ta）"""
+    from pandas_ta import macd
+
+    bars = make_bars(300)
+    return lambda: macd(bars["close"])
+
+
+@case("indicator_atr", requires=["pandas_ta"])
+def bench_atr(env):
+    """300根K线计算ATR（pandas_ta）"""
+    from pandas_ta import atr
+
+    bars = make_bars(300)
+    return lambda: atr(bars["high"], bars["low"], bars["close"], length=14)
+
+
+@case("option_chain_build")
+def bench_option_chain_build(env):
+    """由合约表构建MarketOptionChain"""
+    df = env.datafeed.instruments
+    return lambda: MarketOptionChain(df)
+
+
+@case("option_chain_lookup", ops=1000)
+def bench_option_chain_lookup(env):
+    """按合约代码查找合约、取合约信息和剩余天数"""
+    datafeed = env.datafeed
+    symbols = env.option_codes(1000)
+    datafeed.market_option_chain
+
+    def run():
+        for symbol in symbols:
+            contract = datafeed.get_option_contract_by_id(symbol)
+            datafeed.get_contract_info(symbol)
+            datafeed.get_days_to_expiry(contract)
+
+    return run
+
+
+@case("option_chain_select", ops=100)
+def bench_option_chain_select(env):
+    """按价值度选择合约（get_option_contract_by_moneyness）"""
+    datafeed = env.datafeed
+    datafeed.market_option_chain
+
+    def run():
+        for i in range(100):
+            datafeed.get_option_contract_by_moneyness(
+                2.9, [0.95, 1.05], i % 4, "510050.SH", i % 2 == 0, i % 3 == 0
+            )
+
+    return run
+
+
+def _calculate_risk_case(env, cached):
+    datafeed = env.datafeed
+    symbols = env.option_codes(50)
+    datafeed.calculate_risk(symbols)
+
+    def run():
+        if not cached:
+            datafeed.greeks_cache.invalidate()
+        datafeed.calculate_risk(symbols)
+
+    return run
+
+
+@case("calculate_risk_cold")
+def bench_calculate_risk_cold(env):
+    """50个合约计算保证金和希腊字母（不使用希腊字母缓存）"""
+    return _calculate_risk_case(env, cached=False)
+
+
+@case("calculate_risk_cached")
+def bench_calculate_risk_cached(env):
+    """50个合约计算保证金和希腊字母（价格未变，命中希腊字母缓存）"""
+    return _calculate_risk_case(env, cached=True)
+
+
+@case("position_open_close", ops=200)
+def bench_position_open_close(env):
+    """StrategyPosition.open/close，每次操作写入一条持仓记录"""
+    strategy = env.prepare_strategy()
+    positions = strategy.strategy_positions
+    symbols = env.option_codes(20)
+
+    def run():
+        for symbol in symbols:
+            for _ in range(5):
+                positions.open(symbol, symbol, 2, 0.05, -1, 1.8)
+        for symbol in symbols:
+            for _ in range(5):
+                positions.close(symbol, symbol, 2, 0.04, -1, 1.8)
+
+    return run
+
+
+@case("record2dataframe")
+def bench_record2dataframe(env):
+    """5000条持仓记录转换为DataFrame（StrategyPosition.refresh的主要开销）"""
+    datafeed = env.datafeed
+    for i, symbol in enumerate(env.option_codes(50) * 100):
+        datafeed.save_strategy_position(
+            "benchstrategy01",
+            symbol,
+            symbol,
+            1 if i % 2 else -1,
+            i % 7,
+            0.05,
+            1.8,
+            BENCH_USER,
+        )
+    records = datafeed.get_strategy_positions("benchstrategy01")
+    return lambda: record2dataframe(records)
+
+
+@case("position_refresh")
+def bench_position_refresh(env):
+    """当天5000条持仓记录时的StrategyPosition.refresh（读取记录并取各持仓的最新快照）"""
+    strategy = env.prepare_strategy()
+    datafeed = env.datafeed
+    for i, symbol in enumerate(env.option_codes(50) * 100):
+        datafeed.save_strategy_position(
+            strategy.strategy_id,
+            symbol,
+            symbol,
+            1 if i % 2 else -1,
+            i % 7,
+            0.05,
+            1.8,
+            BENCH_USER,
+        )
+    return strategy.strategy_positions.refresh
+
+
+@case("set_last_account")
+def bench_set_last_account(env):
+    """20个持仓的账户重估（风险计算、组合保证金、保存账户快照）"""
+    strategy = env.prepare_strategy()
+    for i, symbol in enumerate(env.option_codes(20)):
+        strategy.strategy_positions.open(
+            symbol, symbol, 5, 0.05, 1 if i % 2 else -1, 1.8
+        )
+    return strategy.strategy_account.set_last_account
+
+
+@case("state_save")
+def bench_state_save(env):
+    """StateVariable赋值触发的策略状态保存"""
+    strategy = env.strategy
+    counter = iter(range(10**9))
+
+    def run():
+        strategy.signal = next(counter)
+
+    return run
+
+
+@case("state_serialize")
+def bench_state_serialize(env):
+    """策略状态序列化（不含写库）"""
+    strategy = env.strategy
+    strategy.update_state_variables({f"key_{i}": i * 0.5 for i in range(50)})
+    return lambda: json.dumps(strategy.get_all_state_variables(), default=str)
@@ -0,0 +1,189 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from . import SRC_DIR  # noqa: F401  确保src已加入sys.path
+from utils.logger import get_logger
+from .cases import CASES, Env
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def run_case(case, repeat=7, min_time=0.2, seed=0):
+    """
+    运行单个基准测试
+    每轮至少持续min_time秒（不足时多次调用操作函数），取各轮的单次操作耗时统计
+    :return: 结果字典，单位为微秒/操作
+    """
+    missing = case.missing_requirements()
+    if missing:
+        return {"name": case.name, "status": "skipped", "reason": f"缺少{missing}"}
+
+    op = case.setup(Env(seed=seed))
+    op()  # 预热
+
+    # 估算每轮的调用次数
+    start = time.perf_counter()
+    op()
+    elapsed = time.perf_counter() - start
+    loops = max(1, int(min_time / elapsed)) if elapsed > 0 else 1000
+
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                op()
+            elapsed = time.perf_counter() - start
+            samples.append(elapsed / loops / case.ops * 1e6)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return {
+        "name": case.name,
+        "status": "ok",
+        "ops": case.ops,
+        "loops": loops,
+        "repeat": repeat,
+        "median_us": statistics.median(samples),
+        "min_us": min(samples),
+        "mean_us": statistics.fmean(samples),
+        "stdev_us": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    与基准结果比较中位数
+    :param threshold: 超过基准(1+threshold)倍记为变慢，低于1/(1+threshold)倍记为变快
+    :return: 名称 -> (当前/基准的比值, 结论)
+    """
+    previous = {
+        item["name"]: item
+        for item in baseline.get("results", [])
+        if item["status"] == "ok"
+    }
+    comparison = {}
+    for item in results:
+        base = previous.get(item["name"])
+        if item["status"] != "ok" or base is None:
+            continue
+        ratio = item["median_us"] / base["median_us"]
+        if ratio > 1 + threshold:
+            verdict = "slower"
+        elif ratio < 1 / (1 + threshold):
+            verdict = "faster"
+        else:
+            verdict = "same"
+        comparison[item["name"]] = (ratio, verdict)
+    return comparison
+
+
+def print_report(results, comparison):
+    print(
+        f"{'benchmark':<26}{'median(us/op)':>15}{'min(us/op)':>13}{'vs baseline':>14}"
+    )
+    for item in results:
+        if item["status"] != "ok":
+            print(f"{item['name']:<26}{'skipped: ' + item['reason']:>42}")
+            continue
+        ratio, verdict = comparison.get(item["name"], (None, ""))
+        vs = f"{ratio:.2f}x {verdict}" if ratio is not None else "-"
+        print(
+            f"{item['name']:<26}{item['median_us']:>15.2f}{item['min_us']:>13.2f}"
+            f"{vs:>14}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BotGo引擎离线性能基准测试")
+    parser.add_argument(
+        "-k", "--filter", default="", help="只运行名称包含该字符串的测试"
+    )
+    parser.add_argument("--repeat", type=int, default=7, help="每个测试的轮数")
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="每轮的最短持续时间（秒）"
+    )
+    parser.add_argument("--output", help="结果文件，默认为benchmarks/results/时间.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基准结果文件")
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="将本次结果保存为基准"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="判定变慢/变快的相对幅度"
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="有测试比基准变慢时以非零状态退出",
+    )
+    parser.add_argument("--list", action="store_true", help="列出全部测试")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出INFO日志")
+    args = parser.parse_args(argv)
+    if not args.verbose:
+        get_logger().setLevel(logging.WARNING)
+
+    cases = [case for name, case in CASES.items() if args.filter in name]
+    if args.list:
+        for case in cases:
+            print(f"{case.name:<26}{case.description}")
+        return 0
+
+    results = []
+    for case in cases:
+        results.append(run_case(case, args.repeat, args.min_time))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    comparison = compare(results, baseline, args.threshold)
+    print_report(results, comparison)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "results": results,
+        "comparison": {
+            name: {"ratio": ratio, "verdict": verdict}
+            for name, (ratio, verdict) in comparison.items()
+        },
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        name = datetime.now().strftime("%Y%m%d_%H%M%S") + ".json"
+        output = os.path.join(RESULTS_DIR, name)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}")
+
+    if args.save_baseline:
+        report.pop("comparison")
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"基准已更新 {args.baseline}")
+
+    if args.fail_on_regression and any(
+        verdict == "slower" for _, verdict in comparison.values()
+    ):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from strategies.dolphindb_datafeed import DolphinDBDataFeed
+from utils.memory_pocketbase import MemoryPocketBase
+
+# 标的代码 -> (市场, 期权交易所, 最新价)
+UNDERLYINGS = {
+    "510050": ("SH", "SHO", 2.9),
+    "510300": ("SH", "SHO", 3.9),
+    "159915": ("SZ", "SZO", 2.0),
+}
+BAR_COLUMNS = ["datetime", "open", "high", "low", "close", "volume", "amount"]
+
+
+def make_option_instruments(seed=0, today=None, strikes_per_side=10):
+    """
+    生成合约表（instruments）格式的期权合约
+    :param seed: 随机种子，控制非标合约和缺失合约
+    :param today: 合约表日期，到期日为其后的四个月份
+    :param strikes_per_side: 平值上下各多少档行权价
+    """
+    rng = random.Random(seed)
+    today = pd.Timestamp(today or datetime.now().date())
+    expires = [
+        int((today + pd.DateOffset(months=i, day=25)).strftime("%Y%m%d"))
+        for i in range(1, 5)
+    ]
+    rows = []
+    code = 10000000
+    for undl, (market, exchange, price) in UNDERLYINGS.items():
+        for expire in expires:
+            for k in range(-strikes_per_side, strikes_per_side + 1):
+                strike = round(price + 0.05 * k, 2)
+                multiples = [10000, 10265] if rng.random() < 0.3 else [10000]
+                for multiple in multiples:
+                    for option_type in ("CALL", "PUT"):
+                        if rng.random() < 0.03:
+                            continue
+                        code += 1
+                        rows.append(
+                            {
+                                "InstrumentID": str(code),
+                                "ExchangeID": exchange,
+                                "InstrumentName": f"{undl}{option_type}{expire}{strike}",
+                                "OptUndlCode": undl,
+                                "OptUndlMarket": market,
+                                "OptExercisePrice": strike,
+                                "ExpireDate": expire,
+                                "OptType": option_type,
+                                "VolumeMultiple": multiple,
+                                "date": today,
+                            }
+                        )
+    df = pd.DataFrame(rows)
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def make_bars(count, start=None, seed=0, price=3.0):
+    """生成随机游走的分钟K线"""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(start or "2025-06-06 09:30:00")
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.001, count)))
+    spread = np.abs(rng.normal(0, 0.002, count)) * close
+    open_ = np.concatenate([[price], close[:-1]])
+    return pd.DataFrame(
+        {
+            "datetime": pd.date_range(start, periods=count, freq="min"),
+            "open": open_.round(3),
+            "high": (np.maximum(open_, close) + spread).round(3),
+            "low": (np.minimum(open_, close) - spread).round(3),
+            "close": close.round(3),
+            "volume": rng.integers(1000, 100000, count).astype(float),
+            "amount": rng.uniform(1e5, 1e7, count).round(3),
+        }
+    )
+
+
+def make_stream_message(symbol, dt, bar):
+    """按流表的列顺序生成一条行情消息，与DolphinDB订阅回调收到的格式一致"""
+    return [
+        dt,
+        symbol,
+        bar["open"],
+        bar["high"],
+        bar["low"],
+        bar["close"],
+        bar["volume"],
+        bar["amount"],
+    ]
+
+
+class MemoryDataFeed(DolphinDBDataFeed):
+    """
+    DolphinDB数据源的内存替身
+    K线、合约表和最新tick都由随机数据生成，行情通过_on_data_arrived手动推送
+    """
+
+    def __init__(self, client=None, seed=0, instruments=None):
+        super().__init__(
+            {},
+            {},
+            client if client is not None else MemoryPocketBase(async_events=False),
+        )
+        self.seed = seed
+        self.instruments = (
+            instruments if instruments is not None else make_option_instruments(seed)
+        )
+        self.ticks = self._make_ticks()
+
+    def _make_ticks(self):
+        """标的按固定价格，期权按内在价值加时间价值生成最新价"""
+        prices = {
+            f"{undl}.{market}": price
+            for undl, (market, _, price) in UNDERLYINGS.items()
+        }
+        rng = np.random.default_rng(self.seed)
+        df = self.instruments
+        underlying = df["OptUndlCode"].map(lambda code: UNDERLYINGS[code][2])
+        strike = df["OptExercisePrice"]
+        intrinsic = np.where(
+            df["OptType"] == "CALL",
+            np.maximum(underlying - strike, 0),
+            np.maximum(strike - underlying, 0),
+        )
+        option_prices = (intrinsic + rng.uniform(0.01, 0.08, len(df))).round(4)
+        symbols = df["InstrumentID"] + "." + df["ExchangeID"]
+        prices.update(zip(symbols, option_prices.tolist()))
+        return prices
+
+    def load_history_minute_bars(self, symbol, count, period=1):
+        return make_bars(count, seed=self.seed)
+
+    def load_active_minute_bars(self, symbol, period=1):
+        return pd.DataFrame(columns=BAR_COLUMNS)
+
+    def load_option_contracts(self, date):
+        return self.instruments
+
+    def load_last_option_contracts(self, date=None):
+        return self.instruments
+
+    def get_last_option_contracts_date(self):
+        # 不写入本地快照
+        return None
+
+    def get_last_tick_frame(self, symbols):
+        rows = [
+            {"symbol": symbol, "lastPrice": self.ticks[symbol]}
+            for symbol in dict.fromkeys(symbols)
+            if symbol in self.ticks
+        ]
+        if not rows:
+            return None
+        return pd.DataFrame(rows).set_index("symbol", drop=False)
+
+    def get_last_tick(self, symbol):
+        price = self.ticks.get(symbol)
+        if price is None:
+            return None
+        return {"symbol": symbol, "lastPrice": price}
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def push_bars(self, symbol, bars: pd.DataFrame, start=None):
+        """按分钟推送K线消息，返回推送的条数"""
+        start = pd.Timestamp(start or datetime.now().replace(second=0, microsecond=0))
+        records = bars.to_dict("records")
+        for i, bar in enumerate(records):
+            self._on_data_arrived(
+                make_stream_message(symbol, start + timedelta(minutes=i), bar)
+            )
+        return len(records)
@@ -1,4 +1,85 @@
-from strategies.manager import monitor_strategies
+import argparse
+import importlib
+import sys
+import time
+
+# 启动分析时检查是否被提前加载的重量级依赖
+HEAVY_MODULES = ["akshare", "pandas_ta", "py_vollib", "scipy", "dolphindb", "pocketbase"]
+
+
+def profile_startup():
+    """
+    依次执行引擎启动的各个阶段并报告耗时
+    只创建策略实例，不启动策略线程、行情和PocketBase订阅
+    """
+    phases = []
+
+    def timed(name, func):
+        start = time.perf_counter()
+        result = func()
+        phases.append((name, time.perf_counter() - start))
+        return result
+
+    timed("import", lambda: importlib.import_module("strategies.manager"))
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    from strategies.dolphindb_datafeed import DolphinDBDataFeed
+    from strategies.factory import StrategyFactory
+    from utils.config import (
+        load_history_db_config,
+        load_market_db_config,
+        load_pocketbase_config,
+    )
+    from utils.pb_client import get_pb_client
+
+    history_config, market_config, _ = timed(
+        "config",
+        lambda: (
+            load_history_db_config(),
+            load_market_db_config(),
+            load_pocketbase_config(),
+        ),
+    )
+    client = timed("pocketbase auth", get_pb_client)
+    datafeed = timed(
+        "datafeed", lambda: DolphinDBDataFeed(history_config, market_config, client)
+    )
+    timed("calendar", lambda: datafeed.trade_calendar)
+    timed("option chain", lambda: datafeed.market_option_chain)
+
+    def create_strategies():
+        StrategyFactory.reload_user_strategies()
+        records = client.collection("strategies").get_full_list(
+            100, {"filter": "active = true"}
+        )
+        return [
+            StrategyFactory.create_strategy(
+                datafeed, record.id, record.name, record.params
+            )
+            for record in records
+        ]
+
+    strategies = timed("strategies", create_strategies)
+
+    print("启动耗时分析")
+    for name, cost in phases:
+        print(f"  {name:<16}{cost * 1000:>10.1f} ms")
+    print(f"  {'total':<16}{sum(cost for _, cost in phases) * 1000:>10.1f} ms")
+    print(f"  导入阶段加载的依赖: {', '.join(loaded) or '无'}")
+    print(f"  活跃策略数: {len(strategies)}")
+
 
 if __name__ == "__main__":
-    monitor_strategies()
+    parser = argparse.ArgumentParser(description="botgo策略引擎")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="分析启动各阶段耗时后退出，不启动策略",
+    )
+    args = parser.parse_args()
+    if args.profile_startup:
+        profile_startup()
+    else:
+        from strategies.manager import monitor_strategies
+
+        monitor_strategies()
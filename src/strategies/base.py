@@ -4,13 +4,41 @@ import time
 import json
 from abc import ABC, abstractmethod
 from datetime import datetime
-from queue import Queue
+from queue import Empty, Queue
 from typing import Any, Dict, Set
 from utils.logger import log
 from utils.common import DataFrameWrapper, record2dataframe, short_uuid, decompose
 from utils.option import OptionCombinationType, MarketOptionChain
-from utils.trade_calendar import TradeCalendar
-import numpy as np
+from utils.greeks_cache import greeks_cache
+from utils.order_trace import order_traces, trace_id_from_remark
+from utils.sampling_profiler import SamplingProfiler, thread_cpu_time
+from utils.option_snapshot import (
+    load_option_snapshot,
+    save_option_snapshot,
+    snapshot_key,
+)
+from utils.trade_calendar import get_trade_calendar
+from utils import metrics
+from .comb_margin import compute_comb_margin
+from .position_book import PositionBook, PositionRecord
+
+BARS_RECEIVED = metrics.counter(
+    "botgo_strategy_bars_received", "策略收到的K线数", ["strategy_id"]
+)
+QUEUE_DEPTH = metrics.gauge(
+    "botgo_strategy_queue_depth", "策略待处理队列长度", ["strategy_id", "queue"]
+)
+HANDLER_SECONDS = metrics.histogram(
+    "botgo_strategy_handler_seconds",
+    "策略on_bar/on_deal的执行耗时（秒）",
+    ["strategy_id", "handler"],
+)
+CPU_SECONDS = metrics.gauge(
+    "botgo_strategy_cpu_seconds", "策略线程累计使用的CPU时间（秒）", ["strategy_id"]
+)
+SET_LAST_ACCOUNT_SECONDS = metrics.histogram(
+    "botgo_set_last_account_seconds", "策略账户重估耗时（秒）"
+)
 
 
 class StateVariable:
@@ -54,18 +82,22 @@ class BaseStrategy(ABC):
         self._running = False
         self._thread = None
         self._deal_thread = None  # 新增交易信息处理线程
+        self._profiler = None  # 正在运行的采样分析
         self._deal_lock = threading.Lock()  # 添加交易信息处理锁
         self._error_count = 10
         self._max_retries = 3  # 最大重试次数
         self._retry_delay = 5  # 重试延迟（秒）
         self._queue = Queue()  # K线的队列
         self._deal_queue = Queue()  # 交易信息的队列
+        self._signal_time = None  # 当前on_bar开始处理的时间，作为下单信号时间
         self.params = params
         self.period = params.get("period", None)
         self.symbol = params.get("symbol", None)
         self.commission = params.get("commission", 1.8)
         self.min_bars_count = params.get("min_bars_count", 300)
         self.account_id = params.get("account_id", None)
+        # 账户重估合并窗口（秒），窗口内的多笔成交只触发一次重估，0表示队列清空即重估
+        self.revaluation_window = params.get("revaluation_window", 0.2)
         self.bars = DataFrameWrapper(
             pd.DataFrame(
                 columns=[
@@ -120,19 +152,36 @@ class BaseStrategy(ABC):
 
         self._running = True
         # 启动主策略线程
-        self._thread = threading.Thread(target=self._run_with_error_handling)
+        self._thread = threading.Thread(
+            target=self._run_with_error_handling, name=f"{self.strategy_id}-bar"
+        )
         self._thread.daemon = True
 
         # 启动交易信息处理线程
-        self._deal_thread = threading.Thread(target=self._run_deal_processor)
+        self._deal_thread = threading.Thread(
+            target=self._run_deal_processor, name=f"{self.strategy_id}-deal"
+        )
         self._deal_thread.daemon = True
 
         self._thread.start()
         self._deal_thread.start()
 
+        QUEUE_DEPTH.set_function(
+            self._queue.qsize, strategy_id=self.strategy_id, queue="bar"
+        )
+        QUEUE_DEPTH.set_function(
+            self._deal_queue.qsize, strategy_id=self.strategy_id, queue="deal"
+        )
+        CPU_SECONDS.set_function(self.cpu_time, strategy_id=self.strategy_id)
+
     def stop(self):
         """停止策略线程"""
         self._running = False
+        QUEUE_DEPTH.remove(strategy_id=self.strategy_id, queue="bar")
+        QUEUE_DEPTH.remove(strategy_id=self.strategy_id, queue="deal")
+        CPU_SECONDS.remove(strategy_id=self.strategy_id)
+        if self._profiler is not None:
+            self._profiler.stop()
 
         # 策略停止时保存最终状态
         if self._strategy_state and self.user_id:
@@ -143,8 +192,39 @@ class BaseStrategy(ABC):
             self._thread.join(timeout=5)
         if self._deal_thread and self._deal_thread.is_alive():
             self._deal_thread.join(timeout=5)
+        # 线程结束后再删除耗时和K线计数序列，避免被正在执行的处理重新创建
+        for handler in ("on_bar", "on_deal"):
+            HANDLER_SECONDS.remove(strategy_id=self.strategy_id, handler=handler)
+        BARS_RECEIVED.remove(strategy_id=self.strategy_id)
+        # 执行尚未完成的账户重估
+        if self.strategy_account is not None:
+            with self._deal_lock:
+                self.strategy_account.flush_revaluation()
         # log(f"策略 {self.name} (ID: {self.strategy_id}) 已停止")
 
+    def cpu_time(self):
+        """策略K线线程和成交处理线程累计使用的CPU时间（秒）"""
+        times = [thread_cpu_time(t) for t in (self._thread, self._deal_thread)]
+        return sum(t for t in times if t is not None)
+
+    def start_profiling(self, duration=30, interval=0.01):
+        """
+        对策略的两个工作线程做采样分析，结束后在logs目录写入collapsed stack文件
+        :param duration: 采样时长（秒）
+        :param interval: 采样间隔（秒）
+        :return: SamplingProfiler，已有分析在运行时返回该分析
+        """
+        if self._profiler is not None and self._profiler.running:
+            return self._profiler
+        self._profiler = SamplingProfiler(
+            {"on_bar": self._thread, "on_deal": self._deal_thread},
+            duration=duration,
+            interval=interval,
+            name=f"profile_{self.strategy_id}",
+        ).start()
+        log(f"策略 {self.name} (ID: {self.strategy_id}) 开始采样分析 {duration} 秒")
+        return self._profiler
+
     def _run_with_error_handling(self):
         """带错误处理的策略运行循环"""
         while self._running:
@@ -177,11 +257,36 @@ class BaseStrategy(ABC):
         """交易信息处理线程"""
         while self._running:
             # try:
-            # 使用get_nowait()避免阻塞，如果队列为空则继续循环
-            deal_info = self._deal_queue.get()
+            # 有待执行的账户重估时，最多等待到合并窗口结束
+            wait_time = None
+            if self.strategy_account is not None:
+                wait_time = self.strategy_account.revaluation_wait_time(
+                    self.revaluation_window
+                )
+            try:
+                deal_info = self._deal_queue.get(timeout=wait_time)
+            except Empty:
+                # 窗口内没有新的成交，执行合并后的账户重估
+                with self._deal_lock:
+                    self.strategy_account.flush_revaluation()
+                continue
             with self._deal_lock:
                 self._update_strategy_info(deal_info)
-                self.on_deal(deal_info)
+                order_traces.mark(
+                    trace_id_from_remark(deal_info.remark), "deal_processed"
+                )
+                with HANDLER_SECONDS.time(
+                    strategy_id=self.strategy_id, handler="on_deal"
+                ):
+                    self.on_deal(deal_info)
+                # 窗口已到期，或不设窗口且队列已清空时，立即重估
+                wait_time = self.strategy_account.revaluation_wait_time(
+                    self.revaluation_window
+                )
+                if wait_time == 0 and (
+                    self.revaluation_window > 0 or self._deal_queue.empty()
+                ):
+                    self.strategy_account.flush_revaluation()
             time.sleep(0.01)
 
         # except Exception as e:
@@ -221,7 +326,14 @@ class BaseStrategy(ABC):
             # 确保状态已加载
             self._ensure_state_loaded()
 
-            self.on_bar(symbol, period, bar)
+            self._signal_time = time.time()
+            try:
+                with HANDLER_SECONDS.time(
+                    strategy_id=self.strategy_id, handler="on_bar"
+                ):
+                    self.on_bar(symbol, period, bar)
+            finally:
+                self._signal_time = None
 
             # # 定期自动保存状态
             # self._auto_save_state()
@@ -261,7 +373,18 @@ class BaseStrategy(ABC):
                 "user": self.user_id,
                 "accountId": self.account_id,
             }
-            self.datafeed.create_trade_command(data)
+            self._send_trade_command(data)
+
+    def _send_trade_command(self, data):
+        """写入交易指令，并以userOrderId中的uuid记录订单链路"""
+        trace_id = trace_id_from_remark(data["userOrderId"])
+        # 只有在策略线程的on_bar中下单时才有信号时间，成交回调中下单以指令创建时间为准
+        signal_time = (
+            self._signal_time if threading.current_thread() is self._thread else None
+        )
+        order_traces.start(trace_id, self.strategy_id, data["orderCode"], signal_time)
+        self.datafeed.create_trade_command(data)
+        order_traces.mark(trace_id, "pb_ack")
 
     def buy_open(self, symbol, volume, follow_trade_info="", max_order_size=-1):
         self._trade(50, symbol, volume, follow_trade_info, max_order_size)
@@ -307,7 +430,7 @@ class BaseStrategy(ABC):
             "user": self.user_id,
             "accountId": self.account_id,
         }
-        self.datafeed.create_trade_command(data)
+        self._send_trade_command(data)
 
     def release_combination(self, comb_id, follow_trade_info=""):
         remark = f"{self.strategy_id}|{short_uuid()}|{follow_trade_info}"
@@ -321,7 +444,7 @@ class BaseStrategy(ABC):
             "user": self.user_id,
             "accountId": self.account_id,
         }
-        self.datafeed.create_trade_command(data)
+        self._send_trade_command(data)
 
     def close_combination(self, code_1, code_2, volume):
         records = self.datafeed.get_comb_records(code_1, code_2, self.user_id)
@@ -455,7 +578,7 @@ class BaseStrategy(ABC):
                     deal_record.instrument_name,
                     deal_record.volume,
                 )
-                self.strategy_account.set_last_account()
+                self.strategy_account.request_revaluation()
 
             elif deal_record.direction == 48:  # 拆分组合
                 self.strategy_combinations.release(
@@ -463,7 +586,7 @@ class BaseStrategy(ABC):
                     deal_record.instrument_name,
                     deal_record.volume,
                 )
-                self.strategy_account.set_last_account()
+                self.strategy_account.request_revaluation()
                 # 根据remark信息，执行拆分组合后的后续操作
                 self.after_release(
                     deal_record.instrument_id,
@@ -487,7 +610,7 @@ class BaseStrategy(ABC):
                     direction,
                     commission,
                 )
-                self.strategy_account.set_last_account()
+                self.strategy_account.request_revaluation()
 
                 # 根据remark信息，执行开仓后的后续操作
                 self.after_open(
@@ -516,7 +639,7 @@ class BaseStrategy(ABC):
                     )
                     multi = self.datafeed.market_option_chain.get_contract_by_id(
                         deal_record.instrument_id
-                    ).data["VolumeMultiple"]
+                    ).volume_multiple
                     profit = profit * multi
                     profit = profit - self.strategy_positions.get_commission(
                         deal_record.instrument_id
@@ -535,7 +658,7 @@ class BaseStrategy(ABC):
                     direction,
                     self.commission,
                 )
-                self.strategy_account.set_last_account()
+                self.strategy_account.request_revaluation()
                 # 根据remark信息，执行平仓后的后续操作
                 self.after_close(deal_record.volume, direction == 1, deal_record.remark)
             else:
@@ -545,6 +668,9 @@ class BaseStrategy(ABC):
 
     def _on_data_arrived(self, symbol, period, bar):
         """处理接收到的数据"""
+        if self._running:
+            # 停止后不再计数，已删除的序列不会被重新创建
+            BARS_RECEIVED.inc(strategy_id=self.strategy_id)
         self._queue.put((symbol, period, bar))
 
     def _on_deal_arrived(self, deal_info):
@@ -556,7 +682,7 @@ class BaseStrategy(ABC):
         if remark == "":
             return {}
         info = remark.split("|")
-        return {"strategy_id": info[0]}
+        return {"strategy_id": info[0], "trace_id": trace_id_from_remark(remark)}
 
     def after_release(self, comb_symbol, volume, exchange_id, remark):
         """
@@ -752,7 +878,9 @@ class BaseStrategy(ABC):
             if success:
                 self._last_state_save_time = current_time
                 log(
-                    f"策略 {self.name} (ID: {self.strategy_id}) 状态已保存，包含 {len(state_data)} 个变量"
+                    f"策略 {self.name} (ID: {self.strategy_id}) 状态已保存，包含 {len(state_data)} 个变量",
+                    interval=60,
+                    key=("state_saved", self.strategy_id),
                 )
 
             return success
@@ -971,32 +1099,128 @@ class BaseDataFeed(ABC):
         self._running = False
         self._subscribed_handlers = {}
         self._bars_cache = {}
-        self.trade_calendar = TradeCalendar()
         self._market_option_chain = None  # 缓存MarketOptionChain实例
+        self._option_chain_date = None  # 当前期权链对应的合约表日期（快照名称）
+        self._option_chain_lock = threading.Lock()
+        self._option_chain_refresher = None  # 期权链后台刷新线程
+        self._option_chain_stop = threading.Event()
+        self.greeks_cache = greeks_cache  # 进程内共享的希腊字母缓存
+        self._contract_info = {}  # get_contract_info的结果缓存
+        self._contract_info_chain = None  # 缓存对应的期权链实例
+
+    @property
+    def trade_calendar(self):
+        """进程内共享的交易日历，首次使用时加载"""
+        return get_trade_calendar()
 
     @property
     def market_option_chain(self):
         """获取市场期权链实例"""
-        if self._market_option_chain is None:
-            self._market_option_chain = MarketOptionChain(
-                self.load_last_option_contracts()
-            )
-        return self._market_option_chain
+        chain = self._market_option_chain
+        if chain is None:
+            with self._option_chain_lock:
+                if self._market_option_chain is None:
+                    self._load_market_option_chain()
+                chain = self._market_option_chain
+        return chain
+
+    def get_last_option_contracts_date(self):
+        """返回最新期权合约表的日期，数据源不支持时返回None"""
+        return None
+
+    def _load_market_option_chain(self, date=None):
+        """
+        构建期权链并整体替换当前实例
+        合约表日期已有本地快照时直接从快照构建，否则从数据库加载并写入快照
+        """
+        if date is None:
+            date = self.get_last_option_contracts_date()
+        df = load_option_snapshot(date) if date is not None else None
+        if df is None:
+            df = self.load_last_option_contracts(date)
+            if date is not None and not df.empty:
+                save_option_snapshot(df, date)
+        chain = MarketOptionChain(df)
+        # 只替换引用，正在使用旧实例的读取方不受影响
+        self._market_option_chain = chain
+        self._option_chain_date = snapshot_key(date) if date is not None else None
+        return chain
+
+    def refresh_market_option_chain(self):
+        """
+        合约表出现新的日期时重建期权链
+        :return: 是否更新了期权链
+        """
+        date = self.get_last_option_contracts_date()
+        if date is None or snapshot_key(date) == self._option_chain_date:
+            return False
+        with self._option_chain_lock:
+            self._load_market_option_chain(date)
+        log(f"期权链已更新，合约表日期: {self._option_chain_date}")
+        return True
+
+    def start_option_chain_refresher(self, interval=300):
+        """
+        启动期权链后台刷新线程，启动后立即预加载一次
+        :param interval: 检查合约表日期的间隔（秒）
+        """
+        if self._option_chain_refresher is not None:
+            return
+        self._option_chain_stop.clear()
+
+        def run():
+            while True:
+                try:
+                    self.refresh_market_option_chain()
+                except Exception as e:
+                    log(f"刷新期权链失败: {str(e)}", "error")
+                if self._option_chain_stop.wait(interval):
+                    break
+
+        self._option_chain_refresher = threading.Thread(target=run, daemon=True)
+        self._option_chain_refresher.start()
+
+    def stop_option_chain_refresher(self):
+        """停止期权链后台刷新线程"""
+        self._option_chain_stop.set()
+        self._option_chain_refresher = None
 
     def get_contract_info(self, symbol):
+        """返回合约的常用信息，结果按期权链缓存，调用方不应修改"""
         symbol = symbol.split(".")[0]
+        chain = self.market_option_chain
+        if self._contract_info_chain is not chain:
+            # 期权链更新后缓存失效
+            self._contract_info = {}
+            self._contract_info_chain = chain
+        info = self._contract_info.get(symbol)
+        if info is not None:
+            return info
         contract_obj = self.get_option_contract_by_id(symbol)
         if contract_obj:
-            return {
+            info = {
                 "strike": contract_obj.strike_price,
                 "expire_date": contract_obj.expire_date,
-                "undl": contract_obj.data["OptUndlCode"],
+                "undl": contract_obj.underlying_code,
                 "opt_type": contract_obj.option_type,
-                "multi": contract_obj.data["VolumeMultiple"],
-                "monthly": contract_obj.data["monthly"],
+                "multi": contract_obj.volume_multiple,
+                "monthly": contract_obj.monthly,
             }
+            self._contract_info[symbol] = info
+            return info
         return None
 
+    def get_days_to_expiry(self, contract, chain=None):
+        """
+        返回合约的剩余自然日数，全部合约的剩余天数每天只计算一次
+        :param contract: OptionContract对象
+        :param chain: 解析contract时使用的MarketOptionChain，默认为当前期权链
+        :return: 剩余天数，到期日当天计为1天
+        """
+        if chain is None:
+            chain = self.market_option_chain
+        return chain.get_days_to_expiry(contract)
+
     def get_option_contract_by_id(self, instrument_id):
         """
         使用MarketOptionChain获取期权合约对象
@@ -1089,7 +1313,7 @@ class BaseDataFeed(ABC):
         使用期权链根据价值度查找期权合约
         :param price: 标的价格
         :param moneyness_range: 价值度范围 [min, max]
-        :param monthly: 月份索引
+        :param monthly: 月份索引，负数从最远月倒数
         :param undl: 标的代码
         :param is_call: 是否为看涨期权
         :param need_higher_strike: 是否需要更高的行权价
@@ -1102,46 +1326,24 @@ class BaseDataFeed(ABC):
         if not option_chain:
             return None
 
-        # 获取所有到期日，按时间排序
-        all_expire_dates = sorted(option_chain.get_all_expire_dates())
-
-        if monthly >= len(all_expire_dates):
+        expire_date = option_chain.get_expire_date(monthly)
+        if expire_date is None:
             return None
-
-        expire_date = all_expire_dates[monthly]
         option_type = "CALL" if is_call else "PUT"
 
-        # 获取指定到期日和期权类型的合约
-        contracts = option_chain.get_contracts_by_expiry(expire_date, option_type)
-
-        if not contracts:
-            return None
-
-        # 计算价值度并筛选
-        valid_contracts = []
-        for contract in contracts:
-            if is_call:
-                moneyness = price / contract.strike_price
-            else:
-                moneyness = contract.strike_price / price
-
-            if moneyness_range[0] <= moneyness <= moneyness_range[1]:
-                valid_contracts.append((contract, moneyness))
-
+        # 按价值度筛选合约，结果已按行权价排序
+        valid_contracts = option_chain.get_contracts_by_moneyness(
+            price, moneyness_range, expire_date, option_type
+        )
         if not valid_contracts:
             return None
 
-        # 按行权价排序
-        valid_contracts.sort(key=lambda x: x[0].strike_price)
-
         # 选择合约
         selected_contract = (
-            valid_contracts[-1][0] if need_higher_strike else valid_contracts[0][0]
+            valid_contracts[-1] if need_higher_strike else valid_contracts[0]
         )
 
-        return (
-            f'{selected_contract.instrument_id}.{selected_contract.data["ExchangeID"]}'
-        )
+        return selected_contract.symbol
 
     @abstractmethod
     def start(self):
@@ -1176,59 +1378,48 @@ class StrategyPosition:
 
         self.strategy = strategy
         self.datafeed = strategy.datafeed
-        self.positions = pd.DataFrame()
+        self.book = PositionBook()
 
-    def refresh(self):
-        def get_last_max_idx(series):
-            """获取分组中最大值对应的最后一个索引"""
-            max_val = series.max()
-            max_positions = series[series == max_val].index
-            return max_positions[-1]  # 返回最后一个最大值的索引
+    @property
+    def positions(self):
+        """持仓的DataFrame视图（只读快照），兼容原有调用方"""
+        return self.book.to_frame()
+
+    def to_frame(self):
+        return self.book.to_frame()
 
+    def refresh(self):
         today = datetime.now().date()
-        # 获取当天的所有持仓记录，如果不存在，则获取最近交易日的持仓记录
-        positions = self.datafeed.get_strategy_positions(
-            self.strategy.strategy_id, today
+        # 获取最近交易日（当天有记录时即为当天）的所有持仓记录
+        positions = self.datafeed.get_latest_strategy_positions(
+            self.strategy.strategy_id
         )
-        if positions == []:
-            last_trade_date = self.datafeed.get_last_strategy_positions_date(
-                self.strategy.strategy_id
-            )
-            if last_trade_date is None:
-                return
-            positions = self.datafeed.get_strategy_positions(
-                self.strategy.strategy_id, last_trade_date
-            )
+        if len(positions) == 0:
+            return
         # 过滤持仓记录，仅仅保留相同标的和持仓方向的最新记录，这就是最新的持仓
+        # 稳定排序后保留每组最后一条，created相同时取读取顺序中靠后的记录
         positions_df = record2dataframe(positions)
-        positions_df = positions_df.sort_values(by="created")
-        # idx = positions_df.groupby(["instrument_id", "direction"])[
-        #     "created"
-        # ].idxmax()  # noqa
-        idx = positions_df.groupby(["instrument_id", "direction"])["created"].apply(
-            get_last_max_idx
-        )
-        df = positions_df.loc[idx]
-        df = df.sort_values(by="created")
+        positions_df = positions_df.sort_values(by="created", kind="stable")
+        df = positions_df.drop_duplicates(["instrument_id", "direction"], keep="last")
         df = df.loc[df["volume"] > 0]
-        self.positions = df.reset_index(drop=True)
+        self.book.load_frame(df)
 
         # 如果当天是交易日，却没有持仓记录，则保存最新持仓
         if self.datafeed.trade_calendar.is_trade_date(today) and (
-            self.positions.empty or self.positions.iloc[0]["created"].date() != today
+            self.book.empty or self.book.first().created.date() != today
         ):
             self.save()
 
     def save(self):
-        for _, row in self.positions.iterrows():
+        for record in self.book:
             self.datafeed.save_strategy_position(
                 self.strategy.strategy_id,
-                row["instrument_id"],
-                row["instrument_name"],
-                row["direction"],
-                row["volume"],
-                row["open_price"],
-                row["commission"],
+                record.instrument_id,
+                record.instrument_name,
+                record.direction,
+                record.volume,
+                record.open_price,
+                record.commission,
                 self.strategy.user_id,
             )
 
@@ -1241,45 +1432,31 @@ class StrategyPosition:
         direction,
         commission,  # noqa
     ):
-        self.positions = self.positions.reset_index(drop=True)
-        if not self.positions.empty:
-            mask = (self.positions["instrument_id"] == instrument_id) & (
-                self.positions["direction"] == direction
-            )
-            idxs = np.where(mask)[0]
-        else:
-            idxs = []
-        if len(idxs) == 0:
+        record = self.book.get(instrument_id, direction)
+        if record is None:
             # 新增持仓
-            new_position = {
-                "instrument_id": instrument_id,
-                "instrument_name": instrument_name,
-                "direction": direction,
-                "volume": volume,
-                "open_price": price,
-                "commission": commission * volume,
-                # "created": now,
-            }
-            if not self.positions.empty:
-                self.positions.loc[len(self.positions)] = new_position
-            else:
-                self.positions = pd.DataFrame([new_position])
+            self.book.add(
+                PositionRecord(
+                    instrument_id,
+                    instrument_name,
+                    direction,
+                    volume,
+                    price,
+                    commission * volume,
+                )
+            )
             save_volume = volume
             save_price = price
             save_commission = commission * volume
         else:
-            idx = idxs[0].item()
-            old_volume = self.positions.at[idx, "volume"].item()
-            old_price = self.positions.at[idx, "open_price"].item()
-            old_commission = self.positions.at[idx, "commission"].item()
+            old_volume = record.volume
+            old_price = record.open_price
+            old_commission = record.commission
             new_volume = old_volume + volume
             new_commission = old_commission + commission * volume
             # 加权均价
             new_price = (old_price * old_volume + price * volume) / new_volume
-            self.positions.at[idx, "volume"] = new_volume
-            self.positions.at[idx, "open_price"] = new_price
-            self.positions.at[idx, "commission"] = new_commission
-            # self.positions.at[idx, "created"] = now
+            self.book.update(record, new_volume, new_price, new_commission)
             save_volume = new_volume
             save_price = new_price
             save_commission = new_commission
@@ -1304,32 +1481,25 @@ class StrategyPosition:
         direction,
         commission,  # noqa
     ):
-        self.positions = self.positions.reset_index(drop=True)
-        mask = (self.positions["instrument_id"] == instrument_id) & (
-            self.positions["direction"] == direction
-        )
-        idxs = np.where(mask)[0]
-        if len(idxs) == 0:
+        record = self.book.get(instrument_id, direction)
+        if record is None:
             # 没有持仓，直接返回或抛异常
             return
-        idx = idxs[0].item()
-        old_volume = self.positions.at[idx, "volume"].item()
-        old_commission = self.positions.at[idx, "commission"].item()
-        old_price = self.positions.at[idx, "open_price"].item()
+        old_volume = record.volume
+        old_commission = record.commission
+        old_price = record.open_price
         new_volume = old_volume - volume
         new_commission = old_commission + commission * volume
         if new_volume > 0:
             # 移动加权平均法调整剩余均价
             new_price = (old_price * old_volume - price * volume) / new_volume
-            self.positions.at[idx, "volume"] = new_volume
-            self.positions.at[idx, "open_price"] = new_price
-            self.positions.at[idx, "commission"] = new_commission
+            self.book.update(record, new_volume, new_price, new_commission)
             save_volume = new_volume
             save_price = new_price
             save_commission = new_commission
         else:
-            # 平完仓，删除该行
-            self.positions = self.positions.drop(idx).reset_index(drop=True)
+            # 平完仓，删除该持仓
+            self.book.remove(instrument_id, direction)
             save_volume = 0
             save_price = (old_price - price) * volume
             save_commission = new_commission
@@ -1347,30 +1517,24 @@ class StrategyPosition:
 
     def get_active_symbols(self):
         """获取当前持仓的标的"""
-        if self.positions.empty:
-            return []
-        return self.positions["instrument_id"].unique().tolist()
+        return self.book.instrument_ids()
 
     def get_open_price(self, symbol):
-
-        return self.positions.loc[self.positions["instrument_id"] == symbol][
-            "open_price"
-        ].item()
+        records = self.book.get_by_instrument(symbol)
+        if len(records) != 1:
+            raise ValueError(f"合约 {symbol} 的持仓数量为 {len(records)}，无法确定开仓价")
+        return records[0].open_price
 
     def get_volume(self, symbol):
-        pos = self.positions.loc[self.positions["instrument_id"] == symbol]
-        if pos.empty:
-            return 0
-        if len(pos) == 1:
-            return pos["volume"].item()
-        else:
-            return pos["volume"].sum().item()
+        return sum(record.volume for record in self.book.get_by_instrument(symbol))
 
     def get_commission(self, symbol):
-        pos = self.positions.loc[self.positions["instrument_id"] == symbol]
-        if pos.empty:
+        records = self.book.get_by_instrument(symbol)
+        if len(records) == 0:
             return 0
-        return pos["commission"].item()
+        if len(records) > 1:
+            raise ValueError(f"合约 {symbol} 存在多个方向的持仓，无法确定手续费")
+        return records[0].commission
 
 
 class StrategyCombination:
@@ -1380,33 +1544,29 @@ class StrategyCombination:
         self.strategy = strategy
         self.datafeed = strategy.datafeed
         self.combinations = pd.DataFrame()
+        self.version = 0  # 组合持仓每次变化后递增
 
     def refresh(self):
         today = datetime.now().date()
-        # 获取当天的所有持仓记录，如果不存在，则获取最近交易日的持仓记录
-        combinations = self.datafeed.get_combinations_positions(
-            self.strategy.strategy_id, today
+        # 获取最近交易日（当天有记录时即为当天）的所有组合持仓记录
+        combinations = self.datafeed.get_latest_combinations_positions(
+            self.strategy.strategy_id
         )
-        if combinations == []:
-            last_trade_date = self.datafeed.get_last_strategy_combinations_date(  # noqa
-                self.strategy.strategy_id
-            )
-            if last_trade_date is None:
-                return
-            combinations = self.datafeed.get_combinations_positions(
-                self.strategy.strategy_id, last_trade_date
-            )
-        # 过滤持仓记录，仅仅保留相同标的和持仓方向的最新记录，这就是最新的持仓
+        if len(combinations) == 0:
+            return
+        # 过滤持仓记录，仅仅保留相同组合的最新记录，这就是最新的持仓
+        # 先取最新记录再去掉volume为0（已解除）的组合，避免解除前的记录重新生效
         combinations_df = record2dataframe(combinations)
-        combinations_df = combinations_df.sort_values(by="created")
-        idx = combinations_df.groupby(["instrument_id"])["created"].idxmax()  # noqa
-        df = combinations_df.loc[idx]
-        df = df.sort_values(by="created")
+        combinations_df = combinations_df.sort_values(by="created", kind="stable")
+        df = combinations_df.drop_duplicates(["instrument_id"], keep="last")
+        df = df.loc[df["volume"] > 0]
         self.combinations = df.reset_index(drop=True)
+        self.version += 1
 
         # 如果当天是交易日，却没有持仓记录，则保存最新持仓
         if (
             self.datafeed.trade_calendar.is_trade_date(today)
+            and not self.combinations.empty
             and self.combinations.iloc[0]["created"].date() != today
         ):
             self.save()
@@ -1437,6 +1597,7 @@ class StrategyCombination:
         self.combinations.loc[existing_combination.index[0], "volume"] = (
             new_volume  # noqa
         )
+        self.version += 1
         self.datafeed.save_strategy_combinations(
             self.strategy.strategy_id,
             instrument_id,
@@ -1446,6 +1607,7 @@ class StrategyCombination:
         )
 
     def combine(self, instrument_id, instrument_name, volume):
+        self.version += 1
         if self.combinations.empty:
             existing_combination = pd.DataFrame()
         else:
@@ -1520,8 +1682,48 @@ class StrategyAccount:
     def __init__(self, strategy):
         self.strategy = strategy
         self.datafeed = strategy.datafeed
-        self.account = {}
-        self.positions = None
+        self._account = {}
+        self._positions = None
+        self._positions_revision = 0  # positions每次赋值后递增
+        self._revaluation_requested_at = None  # 首个待执行重估请求的时间
+        self._revaluation_lock = threading.RLock()
+        self._comb_margin = None  # 组合保证金计算结果的缓存
+        self._comb_margin_key = None
+
+    def _flush_on_read(self):
+        """
+        成交处理线程读取持仓或账户时，先执行合并窗口内待处理的重估
+        其他线程不触发重估，读取到的是最近一次重估的结果，避免与成交处理并发修改持仓
+        """
+        if (
+            self._revaluation_requested_at is not None
+            and threading.current_thread() is self.strategy._deal_thread
+        ):
+            self.flush_revaluation()
+
+    @property
+    def account(self):
+        """账户资金和风险汇总"""
+        self._flush_on_read()
+        return self._account
+
+    @account.setter
+    def account(self, value):
+        self._account = value
+
+    @property
+    def positions(self):
+        """
+        带风险指标的持仓DataFrame，由set_last_account重新生成
+        on_deal和after_*回调中读取时先完成待处理的重估，读取到的总是最新持仓
+        """
+        self._flush_on_read()
+        return self._positions
+
+    @positions.setter
+    def positions(self, value):
+        self._positions = value
+        self._positions_revision += 1
 
     def refresh(self):
         account = self.datafeed.get_strategy_account(self.strategy.strategy_id)
@@ -1539,57 +1741,55 @@ class StrategyAccount:
             }
         self.set_last_account()
 
+    def request_revaluation(self):
+        """
+        登记一次账户重估请求，由交易处理线程合并后统一执行
+        合并窗口内成交处理线程读取positions或account会立即执行重估
+        """
+        with self._revaluation_lock:
+            if self._revaluation_requested_at is None:
+                self._revaluation_requested_at = time.monotonic()
+
+    def revaluation_wait_time(self, window):
+        """
+        返回距离合并窗口结束的剩余秒数
+        :param window: 合并窗口（秒）
+        :return: 剩余秒数，没有待执行的重估时返回None
+        """
+        if self._revaluation_requested_at is None:
+            return None
+        elapsed = time.monotonic() - self._revaluation_requested_at
+        return max(window - elapsed, 0)
+
+    def flush_revaluation(self):
+        """执行待处理的重估请求，一批成交只计算一次风险并保存一次账户快照"""
+        with self._revaluation_lock:
+            if self._revaluation_requested_at is None:
+                return
+            self._revaluation_requested_at = None
+            self.set_last_account()
+
+    def _get_comb_margin(self):
+        """返回当前持仓和组合对应的组合保证金结果，持仓或组合变化后才重新计算"""
+        strategy_combinations = self.strategy.strategy_combinations
+        # 不能用id(self.positions)：旧DataFrame释放后新对象可能复用同一个id
+        key = (self._positions_revision, strategy_combinations.version)
+        if self._comb_margin_key != key:
+            self._comb_margin = compute_comb_margin(
+                self.positions, strategy_combinations.combinations
+            )
+            self._comb_margin_key = key
+        return self._comb_margin
+
     def adjust_margin_by_comb(self, opt_type="BOTH"):
+        """
+        返回考虑组合保证金优惠后的总保证金（float）
+        :param opt_type: "BOTH"/"CALL"/"PUT"
+        :return: float
+        """
         if self.positions is None:
             return 0
-        if opt_type == "BOTH":
-            total_margin = self.positions["margin"].sum()
-        elif opt_type == "CALL":
-            total_margin = self.positions[self.positions["opt_type"] == "CALL"][
-                "margin"
-            ].sum()
-        elif opt_type == "PUT":
-            total_margin = self.positions[self.positions["opt_type"] == "PUT"][
-                "margin"
-            ].sum()
-        else:
-            raise ValueError(f"Invalid option type: {opt_type}")
-        if total_margin is None:
-            total_margin = 0
-        else:
-            total_margin = total_margin.item()
-
-        combinations = self.strategy.strategy_combinations.combinations
-        for _, row in combinations.iterrows():
-            pair = row["instrument_id"].split("/")
-            pos = self.positions[self.positions["instrument_id"].isin(pair)]
-            pos = pos.sort_values(by="direction", ascending=False)
-
-            if len(pos) == 2:
-                if opt_type != "BOTH" and pos["opt_type"].iloc[0] != opt_type:
-                    continue
-                if pos["direction"].prod() < 0:  # 价差组合
-                    diff = abs(pos["strike"].diff().iloc[1]) * pos["vol_mul"].iloc[0]
-                    if (
-                        pos["opt_type"].iloc[0] == "CALL"
-                        and pos["strike"].iloc[0] < pos["strike"].iloc[1]
-                    ) or (
-                        pos["opt_type"].iloc[0] == "PUT"
-                        and pos["strike"].iloc[0] > pos["strike"].iloc[1]
-                    ):
-                        comb_margin = 0
-                    else:
-                        comb_margin = abs(diff * row["volume"] * 1.06)
-                    old_margin = pos["margin"] / pos["volume"] * row["volume"]
-                    old_margin = old_margin.sum()
-                    total_margin = total_margin + comb_margin - old_margin
-                if pos["direction"].prod() > 0:  # 跨式或宽跨式组合
-                    comb_margin = (pos["margin"] / pos["volume"]).max() + (
-                        pos["price"] / pos["volume"]
-                    ).min()
-                    comb_margin = comb_margin * row["volume"]  # noqa
-                    total_margin = total_margin + (comb_margin - pos["margin"].sum())
-        return total_margin
+        return self._get_comb_margin().total(opt_type)
 
     def get_month_margin(self, month, opt_type="BOTH"):
         """
@@ -1598,53 +1798,20 @@ class StrategyAccount:
         :param opt_type: "BOTH"/"CALL"/"PUT"
         :return: float
         """
-        margin_total = 0.0
         if self.positions is None:
-            return margin_total
-        for idx, row in self.positions.iterrows():
-            if opt_type != "BOTH" and row["opt_type"] != opt_type:
-                continue
-            info = self.datafeed.get_contract_info(row["instrument_id"])
-            if info is None or info["monthly"] != month:
-                continue
-            margin = row["margin"] if not pd.isna(row["margin"]) else 0
-            margin_total += margin
-
-        combinations = self.strategy.strategy_combinations.combinations
-        for _, comb_row in combinations.iterrows():
-            pair = comb_row["instrument_id"].split("/")
-            pos = self.positions[self.positions["instrument_id"].isin(pair)]
-            pos = pos.sort_values(by="direction", ascending=False)
-            if len(pos) == 2:
-                info0 = self.datafeed.get_contract_info(pos.iloc[0]["instrument_id"])
-                comb_month = info0["monthly"] if info0 else None
-                if comb_month != month:
-                    continue
-                if opt_type != "BOTH" and pos["opt_type"].iloc[0] != opt_type:
-                    continue
-                if pos["direction"].prod() < 0:  # 价差组合
-                    diff = abs(pos["strike"].diff().iloc[1]) * pos["vol_mul"].iloc[0]
-                    if (
-                        pos["opt_type"].iloc[0] == "CALL"
-                        and pos["strike"].iloc[0] < pos["strike"].iloc[1]
-                    ) or (
-                        pos["opt_type"].iloc[0] == "PUT"
-                        and pos["strike"].iloc[0] > pos["strike"].iloc[1]
-                    ):
-                        comb_margin = 0
-                    else:
-                        comb_margin = abs(diff * comb_row["volume"] * 1.06)
-                    old_margin = pos["margin"] / pos["volume"] * comb_row["volume"]
-                    old_margin = old_margin.sum()
-                    margin_total += comb_margin - old_margin
-                if pos["direction"].prod() > 0:  # 跨式或宽跨式组合
-                    comb_margin = (pos["margin"] / pos["volume"]).max() + (
-                        pos["price"] / pos["volume"]
-                    ).min()
-                    comb_margin = comb_margin * comb_row["volume"]  # noqa
-                    margin_total += comb_margin - pos["margin"].sum()
-        return margin_total
+            return 0.0
+        return self._get_comb_margin().month(month, opt_type)
+
+    def get_margin_by_month(self):
+        """
+        返回按月度汇总的保证金表
+        :return: DataFrame，索引为月度，列为CALL/PUT/BOTH
+        """
+        if self.positions is None:
+            return pd.DataFrame(columns=["CALL", "PUT", "BOTH"])
+        return self._get_comb_margin().by_month()
 
+    @SET_LAST_ACCOUNT_SECONDS.timed()
     def set_last_account(self):
         def reset_account():
             if self.account != {}:
@@ -1668,7 +1835,7 @@ class StrategyAccount:
             positions["per_margin"] = positions["instrument_id"].map(
                 {risk["instrument_id"]: risk["margin"] for risk in risks}
             )
-            positions["margin"] = 0
+            positions["margin"] = 0.0
             positions.loc[positions["direction"] == -1, "margin"] = (
                 positions["per_margin"] * positions["volume"]
             )
@@ -1727,10 +1894,11 @@ class StrategyAccount:
                 if contract is not None:
                     return pd.Series(
                         {
-                            "strike": contract.data["OptExercisePrice"],
-                            "vol_mul": contract.data["VolumeMultiple"],
-                            "opt_type": contract.data["OptType"],
-                            "exchange_id": contract.data["ExchangeID"],
+                            "strike": contract.strike_price,
+                            "vol_mul": contract.volume_multiple,
+                            "opt_type": contract.option_type,
+                            "exchange_id": contract.exchange_id,
+                            "monthly": contract.monthly,
                         }
                     )
                 else:
@@ -1740,6 +1908,7 @@ class StrategyAccount:
                             "vol_mul": None,
                             "opt_type": None,
                             "exchange_id": None,
+                            "monthly": None,
                         }
                     )
             except Exception:
@@ -1749,6 +1918,7 @@ class StrategyAccount:
                         "vol_mul": None,
                         "opt_type": None,
                         "exchange_id": None,
+                        "monthly": None,
                     }
                 )
 
@@ -1757,7 +1927,7 @@ class StrategyAccount:
             risks = self.datafeed.calculate_risk(symbols)
             if risks is None:
                 return
-            positions = self.strategy.strategy_positions.positions.copy()
+            positions = self.strategy.strategy_positions.to_frame().copy()
             if positions.empty:
                 reset_account()
                 return
@@ -1766,9 +1936,9 @@ class StrategyAccount:
                 item["instrument_id"]: item["price"] for item in risks
             }  # noqa
             positions["price"] = positions["instrument_id"].map(price_dict)  # noqa
-            positions[["strike", "vol_mul", "opt_type", "exchange_id"]] = positions[
-                "instrument_id"
-            ].apply(get_option_details)
+            positions[["strike", "vol_mul", "opt_type", "exchange_id", "monthly"]] = (
+                positions["instrument_id"].apply(get_option_details)
+            )
 
             return positions
 
@@ -1833,10 +2003,11 @@ class StrategyAccount:
         )
 
     def add_profit(self, profit):
-        self.account["profit"] = self.account["profit"] + profit
+        # 直接修改_account，不触发重估，由合并后的重估统一计入
+        self._account["profit"] = self._account["profit"] + profit
 
     def adjust_available_margin(self, value):
-        self.account["available_margin"] += value
+        self._account["available_margin"] += value
 
     def get_uncomb_position2(self, opt_type="CALL", is_seller=True):
         direction = -1 if is_seller else 1
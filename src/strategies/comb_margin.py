@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+
+# 价差组合保证金系数
+SPREAD_MARGIN_COEFF = 1.06
+
+
+class CombMarginResult:
+    """组合保证金的计算结果，按(月度, 期权类型)汇总"""
+
+    def __init__(self, contributions: pd.DataFrame):
+        """
+        :param contributions: 每行一条保证金贡献，包含monthly/opt_type/margin列
+        """
+        self.contributions = contributions
+        grouped = contributions.groupby(["monthly", "opt_type"], dropna=False)
+        table = grouped["margin"].sum()
+        # 组合调整中的NaN需要向上传递，与逐行累加的结果保持一致
+        table[grouped["_nan"].any()] = np.nan
+        self.table = table
+
+    def total(self, opt_type="BOTH"):
+        """
+        返回全部月份的保证金
+        :param opt_type: "BOTH"/"CALL"/"PUT"
+        """
+        if opt_type == "BOTH":
+            values = self.table
+        elif opt_type in ("CALL", "PUT"):
+            values = self.table[self.table.index.get_level_values(1) == opt_type]
+        else:
+            raise ValueError(f"Invalid option type: {opt_type}")
+        return float(values.to_numpy().sum())
+
+    def month(self, month, opt_type="BOTH"):
+        """
+        返回指定月度的保证金
+        :param month: 月度索引（int）
+        :param opt_type: "BOTH"/"CALL"/"PUT"
+        """
+        mask = self.table.index.get_level_values(0) == month
+        if opt_type != "BOTH":
+            mask = mask & (self.table.index.get_level_values(1) == opt_type)
+        return float(self.table[mask].to_numpy().sum())
+
+    def by_month(self) -> pd.DataFrame:
+        """返回按月度汇总的保证金表，列为CALL/PUT/BOTH"""
+        table = self.table[self.table.index.get_level_values(0).notna()]
+        frame = table.unstack("opt_type")
+        frame = frame.reindex(columns=["CALL", "PUT"])
+        frame["BOTH"] = table.groupby(level=0).sum()
+        return frame
+
+
+def _pair_legs(positions: pd.DataFrame, combinations: pd.DataFrame) -> pd.DataFrame:
+    """
+    将组合与其两条腿的持仓一次性关联
+    每个组合保留恰好匹配到两条持仓的记录，腿按持仓方向降序排列（买方在前）
+    """
+    pos = positions.reset_index(drop=True)
+    pos = pos.assign(_row=np.arange(len(pos)))
+    combs = pd.DataFrame(
+        {
+            "_comb": np.arange(len(combinations)),
+            "instrument_id": combinations["instrument_id"].str.split("/").to_numpy(),
+            "comb_volume": combinations["volume"].to_numpy(),
+        }
+    )
+    legs = combs.explode("instrument_id").drop_duplicates(["_comb", "instrument_id"])
+    legs = legs.merge(pos, on="instrument_id", how="inner")
+    legs = legs[legs.groupby("_comb")["_comb"].transform("size") == 2]
+    return legs.sort_values(
+        ["_comb", "direction", "_row"],
+        ascending=[True, False, True],
+        kind="mergesort",
+    )
+
+
+def _comb_adjustments(legs: pd.DataFrame) -> pd.DataFrame:
+    """按组合计算相对于单腿保证金的调整额"""
+
+    def column(frame, name):
+        return pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=float)
+
+    first = legs.iloc[0::2]
+    second = legs.iloc[1::2]
+    comb_volume = column(first, "comb_volume")
+    direction = column(first, "direction") * column(second, "direction")
+    strike_0, strike_1 = column(first, "strike"), column(second, "strike")
+    margin_0, margin_1 = column(first, "margin"), column(second, "margin")
+    volume_0, volume_1 = column(first, "volume"), column(second, "volume")
+    price_0, price_1 = column(first, "price"), column(second, "price")
+    opt_type = first["opt_type"].to_numpy()
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # 价差组合：构成即无风险的组合保证金为0，否则按行权价差收取
+        diff = np.abs(strike_1 - strike_0) * column(first, "vol_mul")
+        no_risk = ((opt_type == "CALL") & (strike_0 < strike_1)) | (
+            (opt_type == "PUT") & (strike_0 > strike_1)
+        )
+        spread_margin = np.where(
+            no_risk, 0.0, np.abs(diff * comb_volume * SPREAD_MARGIN_COEFF)
+        )
+        old_margin = np.nansum(
+            [margin_0 / volume_0 * comb_volume, margin_1 / volume_1 * comb_volume],
+            axis=0,
+        )
+        spread_adjust = spread_margin - old_margin
+
+        # 跨式或宽跨式组合：保证金较高一腿 + 权利金较低一腿
+        straddle_margin = (
+            np.fmax(margin_0 / volume_0, margin_1 / volume_1)
+            + np.fmin(price_0 / volume_0, price_1 / volume_1)
+        ) * comb_volume
+        straddle_adjust = straddle_margin - np.nansum([margin_0, margin_1], axis=0)
+
+    adjust = np.where(
+        direction < 0,
+        spread_adjust,
+        np.where(direction > 0, straddle_adjust, 0.0),
+    )
+    return pd.DataFrame(
+        {
+            "monthly": first["monthly"].to_numpy(),
+            "opt_type": opt_type,
+            "margin": adjust,
+        }
+    )
+
+
+def compute_comb_margin(positions: pd.DataFrame, combinations) -> CombMarginResult:
+    """
+    一次性计算考虑组合优惠后的保证金
+    :param positions: 策略账户持仓，需包含instrument_id/direction/volume/margin/
+                      price/strike/vol_mul/opt_type/monthly列
+    :param combinations: 组合持仓，需包含instrument_id("code1/code2")和volume列
+    :return: CombMarginResult
+    """
+    base = pd.DataFrame(
+        {
+            "monthly": positions["monthly"].to_numpy(),
+            "opt_type": positions["opt_type"].to_numpy(),
+            "margin": pd.to_numeric(positions["margin"], errors="coerce")
+            .fillna(0)
+            .to_numpy(dtype=float),
+        }
+    )
+    frames = [base]
+    if (
+        combinations is not None
+        and not combinations.empty
+        and "instrument_id" in combinations
+    ):
+        legs = _pair_legs(positions, combinations)
+        if not legs.empty:
+            frames.append(_comb_adjustments(legs))
+
+    contributions = pd.concat(frames, ignore_index=True)
+    contributions["monthly"] = pd.to_numeric(
+        contributions["monthly"], errors="coerce"
+    )
+    contributions["_nan"] = contributions["margin"].isna()
+    return CombMarginResult(contributions)
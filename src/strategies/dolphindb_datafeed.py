@@ -2,10 +2,37 @@ import dolphindb as ddb
 import pandas as pd
 from datetime import time, datetime, timezone
 from time import sleep
-from dateutil.parser import parse
+import functools
 from .base import BaseDataFeed
+from utils import metrics
 from utils.common import generate_action_name
-from utils.option import calculate_iv_and_greeks, calculate_margin
+from utils.option import calculate_margin_array
+
+STREAM_MESSAGES = metrics.counter(
+    "botgo_datafeed_stream_messages", "行情订阅收到的消息数"
+)
+QUERY_SECONDS = metrics.histogram(
+    "botgo_dolphindb_query_seconds", "DolphinDB查询耗时（秒）", ["method"]
+)
+PB_WRITE_SECONDS = metrics.histogram(
+    "botgo_pocketbase_write_seconds",
+    "PocketBase写入耗时（秒）",
+    ["collection", "operation"],
+)
+CALCULATE_RISK_SECONDS = metrics.histogram(
+    "botgo_calculate_risk_seconds", "calculate_risk耗时（秒）"
+)
+
+
+def _timed_query(func):
+    """按方法名记录DolphinDB查询耗时"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with QUERY_SECONDS.time(method=func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
 
 
 class DolphinDBDataFeed(BaseDataFeed):
@@ -19,6 +46,7 @@ class DolphinDBDataFeed(BaseDataFeed):
         self.handler_id = generate_action_name(6)
         self.client = client
 
+    @_timed_query
     def load_history_minute_bars(self, symbol, count, period=1):
         conn = ddb.session()
         conn.connect(
@@ -52,6 +80,7 @@ class DolphinDBDataFeed(BaseDataFeed):
         conn.close()
         return df
 
+    @_timed_query
     def load_active_minute_bars(self, symbol, period=1):
         conn = ddb.session()
         conn.connect(
@@ -84,6 +113,7 @@ class DolphinDBDataFeed(BaseDataFeed):
         conn.close()
         return df
 
+    @_timed_query
     def load_option_contracts(self, date):
         conn = ddb.session()
         conn.connect(
@@ -100,7 +130,8 @@ class DolphinDBDataFeed(BaseDataFeed):
         conn.close()
         return df
 
-    def load_last_option_contracts(self):
+    @_timed_query
+    def get_last_option_contracts_date(self):
         conn = ddb.session()
         conn.connect(
             self.market_db_config["DB_HOST"],
@@ -109,13 +140,39 @@ class DolphinDBDataFeed(BaseDataFeed):
             self.market_db_config["DB_PASSWORD"],
         )
         sql = f"""
-            select * from loadTable("{self.market_db_config["DB_NAME"]}", "instruments")
-            where date = (select max(date) from loadTable("{self.market_db_config["DB_NAME"]}", "instruments"))
+            select max(date) as date
+            from loadTable("{self.market_db_config["DB_NAME"]}", "instruments")
         """
         df = conn.run(sql)
         conn.close()
+        if len(df) == 0 or pd.isna(df["date"].iloc[0]):
+            return None
+        return df["date"].iloc[0]
+
+    @_timed_query
+    def load_last_option_contracts(self, date=None):
+        conn = ddb.session()
+        conn.connect(
+            self.market_db_config["DB_HOST"],
+            self.market_db_config["DB_PORT"],
+            self.market_db_config["DB_USER"],
+            self.market_db_config["DB_PASSWORD"],
+        )
+        if date is None:
+            sql = f"""
+                select * from loadTable("{self.market_db_config["DB_NAME"]}", "instruments")
+                where date = (select max(date) from loadTable("{self.market_db_config["DB_NAME"]}", "instruments"))
+            """
+        else:
+            sql = f"""
+                select * from loadTable("{self.market_db_config["DB_NAME"]}", "instruments")
+                where date = {pd.Timestamp(date).strftime("%Y.%m.%d")}
+            """
+        df = conn.run(sql)
+        conn.close()
         return df
 
+    @_timed_query
     def get_last_tick(self, symbol):
         conn = ddb.session()
         conn.connect(
@@ -136,7 +193,13 @@ class DolphinDBDataFeed(BaseDataFeed):
             return None
         return df.to_dict("records")[0]
 
-    def get_last_ticks(self, symbols):
+    @_timed_query
+    def get_last_tick_frame(self, symbols):
+        """
+        获取最新tick
+        :param symbols: 代码列表（代码.市场）
+        :return: 以symbol为索引的DataFrame，没有数据时返回None
+        """
         conn = ddb.session()
         conn.connect(
             self.market_db_config["DB_HOST"],
@@ -160,6 +223,13 @@ class DolphinDBDataFeed(BaseDataFeed):
         conn.close()
         if len(df) == 0:
             return None
+        df = df.set_index("symbol", drop=False)
+        return df[~df.index.duplicated()]
+
+    def get_last_ticks(self, symbols):
+        df = self.get_last_tick_frame(symbols)
+        if df is None:
+            return None
         return df.to_dict("records")
 
     def load_bars(self, symbol, count, period=1):
@@ -187,9 +257,12 @@ class DolphinDBDataFeed(BaseDataFeed):
             offset=-1,
             resub=True,
         )
+        # 后台预加载期权链，并在合约表更新后自动替换
+        self.start_option_chain_refresher()
 
     def stop(self):
         self.running = False
+        self.stop_option_chain_refresher()
         if self.conn is None:
             return
         self.conn.unsubscribe(
@@ -200,6 +273,11 @@ class DolphinDBDataFeed(BaseDataFeed):
         )
         self.conn.close()
 
+    def _pb_write(self, collection, operation, *args):
+        """写入PocketBase并按集合记录耗时"""
+        with PB_WRITE_SECONDS.time(collection=collection, operation=operation):
+            return getattr(self.client.collection(collection), operation)(*args)
+
     def get_strategy_account(self, strategy_id):
         records = self.client.collection("strategyAccount").get_list(
             1, 20, {"filter": f'strategy="{strategy_id}"', "sort": "-created"}
@@ -222,18 +300,6 @@ class DolphinDBDataFeed(BaseDataFeed):
             return []
         return records
 
-    def get_combinations_positions(self, strategy_id, query_date=datetime.now().date()):
-        records = self.client.collection("strategyCombinations").get_full_list(
-            -1,
-            {
-                "filter": f'strategy="{strategy_id}" && created >= "{query_date}" && volume>0',
-                "sort": "-created",
-            },
-        )
-        if len(records) == 0:
-            return []
-        return records
-
     def save_strategy_position(
         self,
         strategy_id,
@@ -245,7 +311,9 @@ class DolphinDBDataFeed(BaseDataFeed):
         commission,
         user_id,
     ):
-        self.client.collection("strategyPositions").create(
+        self._pb_write(
+            "strategyPositions",
+            "create",
             {
                 "strategy": strategy_id,
                 "instrumentId": instrument_id,
@@ -256,7 +324,7 @@ class DolphinDBDataFeed(BaseDataFeed):
                 "commission": commission,
                 "created": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f"),
                 "user": user_id,
-            }
+            },
         )
 
     def save_strategy_combinations(
@@ -267,7 +335,9 @@ class DolphinDBDataFeed(BaseDataFeed):
         volume,
         user_id,
     ):
-        self.client.collection("strategyCombinations").create(
+        self._pb_write(
+            "strategyCombinations",
+            "create",
             {
                 "strategy": strategy_id,
                 "instrumentId": instrument_id,
@@ -275,7 +345,7 @@ class DolphinDBDataFeed(BaseDataFeed):
                 "volume": volume,
                 "created": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f"),
                 "user": user_id,
-            }
+            },
         )
 
     def save_strategy_account(
@@ -292,7 +362,9 @@ class DolphinDBDataFeed(BaseDataFeed):
         rho,
         user_id,
     ):
-        self.client.collection("strategyAccount").create(
+        self._pb_write(
+            "strategyAccount",
+            "create",
             {
                 "strategy": strategy_id,
                 "margin": margin,
@@ -306,29 +378,55 @@ class DolphinDBDataFeed(BaseDataFeed):
                 "rho": rho,
                 "created": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f"),
                 "user": user_id,
-            }
+            },
         )
 
     def create_trade_command(self, data):
         data["created"] = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
-        self.client.collection("tradeCommands").create(data)
+        self._pb_write("tradeCommands", "create", data)
         sleep(0.0001)
 
-    def get_last_strategy_positions_date(self, strategy_id):
-        records = self.client.collection("strategyPositions").get_list(
-            1, 1, {"filter": f'strategy="{strategy_id}"', "sort": "-created"}
+    def _get_latest_day_records(self, collection, filter, per_page=500):
+        """
+        获取最近一个有记录的日期（created的日期）当天及之后的全部记录
+        按created降序分页读取，读到更早日期的记录即停止，记录数不超过per_page时只需一次请求
+        :return: 按created升序的记录列表，没有记录时返回空列表
+        """
+        records = []
+        latest_date = None
+        page = 1
+        while True:
+            result = self.client.collection(collection).get_list(
+                page, per_page, {"filter": filter, "sort": "-created"}
+            )
+            for record in result.items:
+                # created是PocketBase保存的UTC时间，SDK解析为不带时区的datetime，
+                # 这里按UTC日期分日，与原先 created >= "{最近日期}" 的字符串比较一致
+                created_date = record.created.date()
+                if latest_date is None:
+                    latest_date = created_date
+                elif created_date < latest_date:
+                    return records[::-1]
+                records.append(record)
+            if page >= result.total_pages:
+                return records[::-1]
+            page += 1
+
+    def get_latest_strategy_positions(self, strategy_id):
+        """获取策略最近一个交易日的全部持仓记录，替代先查当天、为空再查最近日期的两次查询"""
+        return self._get_latest_day_records(
+            "strategyPositions", f'strategy="{strategy_id}"'
         )
-        if len(records.items) == 0:
-            return None
-        return records.items[-1].created.date()
 
-    def get_last_strategy_combinations_date(self, strategy_id):
-        records = self.client.collection("strategyCombinations").get_list(
-            1, 1, {"filter": f'strategy="{strategy_id}"', "sort": "-created"}
+    def get_latest_combinations_positions(self, strategy_id):
+        """
+        获取策略最近一个交易日的全部组合持仓记录，包括volume为0的记录
+        已解除的组合以volume为0的记录表示，需要在取各组合的最新记录之后再过滤，
+        否则当天全部解除时会退回到更早日期仍持有的组合
+        """
+        return self._get_latest_day_records(
+            "strategyCombinations", f'strategy="{strategy_id}"'
         )
-        if len(records.items) == 0:
-            return None
-        return records.items[-1].created.date()
 
     def get_available_volume(self, user_id, symbol):
         records = self.client.collection("positions").get_list(
@@ -345,6 +443,7 @@ class DolphinDBDataFeed(BaseDataFeed):
         return 0
 
     def _on_data_arrived(self, bar_data):
+        STREAM_MESSAGES.inc()
         symbol = bar_data[1]
         if symbol in self._subscribed_handlers:
             bar_data = {
@@ -376,75 +475,72 @@ class DolphinDBDataFeed(BaseDataFeed):
                         handler(symbol, period, last_bar)
                     self._bars_cache[symbol][period] = []
 
+    @CALCULATE_RISK_SECONDS.timed()
     def calculate_risk(self, symbols):
         symbols = [symbol.split(".")[0] for symbol in symbols]
+        # 整个计算只读取一次期权链，后台刷新替换期权链不影响本次计算
+        chain = self.market_option_chain
 
         # 从instruments中获取所有相关合约和标的的信息
         contracts = {}
         underlying_symbols = set()
 
         for symbol in symbols:
-            contract = self.get_option_contract_by_id(symbol)
+            contract = chain.get_contract_by_id(symbol)
             if contract is None:
                 continue
-            contracts[f'{symbol}.{contract.data["ExchangeID"]}'] = contract
-            underlying_symbols.add(
-                f"{contract.data['OptUndlCode']}.{contract.data['OptUndlMarket']}"
-            )
+            contracts[contract.symbol] = contract
+            underlying_symbols.add(contract.underlying_symbol)
 
         if not contracts:
             return None
 
         # 获取所有合约和标的最新价格
         all_symbols = list(contracts.keys()) + list(underlying_symbols)
-        ticks = self.get_last_ticks(all_symbols)
-        if not ticks:
+        ticks = self.get_last_tick_frame(all_symbols)
+        if ticks is None:
             return None
 
-        results = []
-        for symbol, contract in contracts.items():
-            # 获取合约和标的最新价格
-            contract_tick = next((t for t in ticks if t["symbol"] == symbol), None)
-            underlying_tick = next(
-                (
-                    t
-                    for t in ticks
-                    if t["symbol"]
-                    == f"{contract.data['OptUndlCode']}.{contract.data['OptUndlMarket']}"
-                ),
-                None,
-            )
-
-            if not contract_tick or not underlying_tick:
-                continue
-
-            # 计算保证金
-            margin = calculate_margin(
-                option_type=contract.data["OptType"][0].lower(),
-                market_price=contract_tick["lastPrice"],
-                underlying_price=underlying_tick["lastPrice"],
-                strike_price=contract.data["OptExercisePrice"],
-                contract_multiplier=contract.data["VolumeMultiple"],
-            )
+        # 按代码一次性关联合约和标的的最新价
+        contract_list = list(contracts.values())
+        option_symbols = pd.Index(contracts.keys())
+        underlying_of = pd.Index([c.underlying_symbol for c in contract_list])
+        last_price = ticks["lastPrice"]
+        found = option_symbols.isin(ticks.index) & underlying_of.isin(ticks.index)
+        if not found.any():
+            return []
+        contract_list = [c for c, ok in zip(contract_list, found.tolist()) if ok]
+        option_prices = last_price.reindex(option_symbols[found]).tolist()
+        underlying_prices = last_price.reindex(underlying_of[found]).tolist()
+        option_types = [c.option_type[0].lower() for c in contract_list]
+
+        # 批量计算保证金
+        margins = calculate_margin_array(
+            option_type=option_types,
+            market_price=option_prices,
+            underlying_price=underlying_prices,
+            strike_price=[c.strike_price for c in contract_list],
+            contract_multiplier=[c.volume_multiple for c in contract_list],
+        ).tolist()
 
-            # 计算剩余天数
-            days_to_expiry = (
-                parse(str(contract.data["ExpireDate"])).date() - datetime.now().date()
-            ).days + 1
-
-            # 计算希腊字母值
-            greeks = calculate_iv_and_greeks(
-                market_price=contract_tick["lastPrice"],
-                underlying_price=underlying_tick["lastPrice"],
-                strike_price=contract.data["OptExercisePrice"],
-                t_days=days_to_expiry,
+        results = []
+        for contract, option_type, price, undl_price, margin in zip(
+            contract_list, option_types, option_prices, underlying_prices, margins
+        ):
+            # 计算希腊字母值，价格和剩余天数未变时直接使用缓存
+            greeks = self.greeks_cache.get(
+                contract.instrument_id,
+                option_type=option_type,
+                strike_price=contract.strike_price,
+                option_price=price,
+                underlying_price=undl_price,
+                t_days=self.get_days_to_expiry(contract, chain),
                 r=0.0,  # 假设无风险利率为3%
-                option_type=contract.data["OptType"][0].lower(),
             )
 
             results.append(
                 {
-                    "instrument_id": symbol.split(".")[0],
+                    "instrument_id": contract.instrument_id,
                     "margin": margin * 1.2,  # 券商默认提高保证金20%
                     "delta": greeks["delta"],
                     "gamma": greeks["gamma"],
@@ -452,8 +548,8 @@ class DolphinDBDataFeed(BaseDataFeed):
                     "vega": greeks["vega"],
                     "rho": greeks["rho"],
                     "sigma": greeks["sigma"],
-                    "undl_price": underlying_tick["lastPrice"],
-                    "price": contract_tick["lastPrice"],
+                    "undl_price": undl_price,
+                    "price": price,
                 }
             )
 
@@ -496,7 +592,7 @@ class DolphinDBDataFeed(BaseDataFeed):
     def get_strike(self, instrument_id):
         contract = self.get_option_contract_by_id(instrument_id.split(".")[0])
         if contract is not None:
-            return contract.data["OptExercisePrice"], contract.data["OptType"]
+            return contract.strike_price, contract.option_type
         return None, None
 
     # 策略状态持久化相关方法
@@ -526,7 +622,7 @@ class DolphinDBDataFeed(BaseDataFeed):
             }
 
             # 使用PocketBase客户端保存数据
-            self.client.collection("strategyStates").create(save_data)
+            self._pb_write("strategyStates", "create", save_data)
             return True
 
         except Exception as e:
@@ -589,7 +685,7 @@ class DolphinDBDataFeed(BaseDataFeed):
             )
 
             for record in records.items:
-                self.client.collection("strategyStates").delete(record.id)
+                self._pb_write("strategyStates", "delete", record.id)
 
             return True
 
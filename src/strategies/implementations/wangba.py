@@ -1,4 +1,3 @@
-from pandas_ta import macd, atr
 from indicators.dsrt import DSRT
 from ..base import BaseStrategy, StateVariable
 from utils.logger import log
@@ -47,18 +46,20 @@ class WangBaStrategy(BaseStrategy):
 
     def on_bar(self, symbol, period, bar):
         """处理接收到的K线数据"""
-        print(
-            symbol,
-            period == self.period,
-            self.bars[-1].datetime,
-            self.bars[-1].close,  # noqa
-        )
+        from pandas_ta import macd, atr
+
         dsrt = list(DSRT(self.bars.close, self.bars.high, self.bars.low))
         macd_hist = list(macd(self.bars.close)["MACDh_12_26_9"])
         atr_value = list(
             atr(self.bars.high, self.bars.low, self.bars.close, length=14)
         )  # noqa
-        print(dsrt[-1], macd_hist[-1], atr_value[-1])
+        # 每根K线都会执行，每个策略每分钟最多输出一条
+        log(
+            f"{symbol} {period == self.period} {self.bars[-1].datetime} "
+            f"{self.bars[-1].close} {dsrt[-1]} {macd_hist[-1]} {atr_value[-1]}",
+            interval=60,
+            key=("on_bar", self.strategy_id),
+        )
 
     def on_deal(self, deal_info):
         # print(deal_info)
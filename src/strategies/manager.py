@@ -5,8 +5,15 @@ from pocketbase.services.realtime_service import MessageData
 from utils.logger import log
 from .factory import StrategyFactory
 from .dolphindb_datafeed import DolphinDBDataFeed
-from utils.config import load_market_db_config, load_history_db_config
+from utils.config import (
+    load_market_db_config,
+    load_history_db_config,
+    load_metrics_config,
+)
+from utils.metrics import register_endpoint, start_metrics_server
+from utils.order_trace import order_traces
 from .base import BaseStrategy
+from .risk_aggregator import RISK_SCOPES, RiskAggregator
 
 warnings.filterwarnings("ignore")
 
@@ -16,6 +23,10 @@ running_strategies = {}
 _strategies_lock = threading.Lock()
 # 数据源
 datafeed = None
+# 跨策略风险汇总
+risk_aggregator = None
+# 单次采样分析的最长时间（秒）
+MAX_PROFILE_SECONDS = 600
 
 
 def get_user_name(user_id):
@@ -68,6 +79,93 @@ def stop_strategy(strategy):
         log(f"停止策略失败: {str(e)}", "error")
 
 
+def profile_strategy(strategy_id, duration=30, interval=0.01):
+    """
+    对运行中的策略做采样分析，不需要重启引擎
+    :return: SamplingProfiler，策略未运行时返回None
+    """
+    with _strategies_lock:
+        strategy_instance = running_strategies.get(strategy_id)
+    if strategy_instance is None:
+        log(f"策略 {strategy_id} 未运行，无法采样分析", "warning")
+        return None
+    return strategy_instance.start_profiling(duration, interval)
+
+
+def _parse_profile_seconds(value):
+    """
+    校验采样时长
+    :return: float，范围为(0, MAX_PROFILE_SECONDS]
+    """
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"采样时长必须是数字: {value}")
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise ValueError(f"采样时长必须在0到{MAX_PROFILE_SECONDS}秒之间: {value}")
+    return seconds
+
+
+def _check_profile_request(record):
+    """
+    strategies记录的profile_seconds（数字字段，单位秒）不为0时开始采样分析，
+    无论时长是否有效都将该字段清零
+    """
+    value = getattr(record, "profile_seconds", 0) or 0
+    if value == 0:
+        return
+    try:
+        seconds = _parse_profile_seconds(value)
+    except ValueError as e:
+        log(f"策略 {record.id} 的采样请求无效: {str(e)}", "warning")
+    else:
+        profile_strategy(record.id, seconds)
+    try:
+        get_pb_client().collection("strategies").update(
+            record.id, {"profile_seconds": 0}
+        )
+    except Exception as e:
+        log(f"清除策略 {record.id} 的采样请求失败: {str(e)}", "error")
+
+
+def _profile_endpoint(params):
+    """POST /profile?strategy_id=xxx&seconds=30 开始采样分析，返回结果文件路径"""
+    strategy_id = params.get("strategy_id")
+    if not strategy_id:
+        raise ValueError("缺少strategy_id")
+    seconds = _parse_profile_seconds(params.get("seconds", 30))
+    profiler = profile_strategy(strategy_id, seconds)
+    if profiler is None:
+        return f"策略 {strategy_id} 未运行\n"
+    return f"{profiler.output}\n"
+
+
+def _cpu_endpoint(params):
+    """GET /cpu 查看各策略累计CPU时间，按从高到低排列"""
+    with _strategies_lock:
+        strategies = list(running_strategies.values())
+    rows = sorted(
+        ((s.cpu_time(), s.strategy_id, s.name) for s in strategies), reverse=True
+    )
+    return "".join(f"{cpu:.3f}\t{sid}\t{name}\n" for cpu, sid, name in rows)
+
+
+def _risk_endpoint(params):
+    """GET /risk?by=strategy|user|underlying 查看最近一次跨策略风险汇总"""
+    report = risk_aggregator.report if risk_aggregator is not None else None
+    if report is None:
+        return "风险汇总尚未完成\n"
+    by = params.get("by", "strategy")
+    if by not in RISK_SCOPES:
+        return f"by只能是 {'/'.join(RISK_SCOPES)}\n"
+    return report.to_text(by)
+
+
+register_endpoint("/profile", _profile_endpoint, method="POST")
+register_endpoint("/cpu", _cpu_endpoint)
+register_endpoint("/risk", _risk_endpoint)
+
+
 def on_strategy_event(e: MessageData):
     record = e.record
     if e.action not in ["create", "update"]:
@@ -75,6 +173,7 @@ def on_strategy_event(e: MessageData):
     if record.active:
         if record.id not in running_strategies:
             start_strategy(record, datafeed)
+        _check_profile_request(record)
     else:
         if record.id in running_strategies:
             stop_strategy(record)
@@ -87,13 +186,19 @@ def on_deal_event(e: MessageData):
     info = BaseStrategy.parse_deal_remark(record.remark)
     if info == {}:
         return
+    order_traces.mark(info["trace_id"], "deal_received")
 
     with _strategies_lock:
         strategy_instance = running_strategies.get(info["strategy_id"])
         if strategy_instance is not None:
             # 假设策略实例有 on_remark_update 方法
             strategy_instance._on_deal_arrived(record)
-            log(f"策略 {info['strategy_id']} 收到新的交易信息")
+            # 成交可能成批到达，每个策略每秒最多输出一条
+            log(
+                f"策略 {info['strategy_id']} 收到新的交易信息",
+                interval=1,
+                key=("deal_received", info["strategy_id"]),
+            )
 
 
 def start_active_strategies(datafeed):
@@ -134,9 +239,17 @@ def monitor_strategies():
     # 首先启动所有活跃的策略
     start_active_strategies(datafeed)
 
+    metrics_config = load_metrics_config()
+    start_metrics_server(metrics_config["METRICS_PORT"], metrics_config["METRICS_HOST"])
+
     log("开始启动数据源...")
     datafeed.start()
 
+    log("开始汇总策略风险...")
+    global risk_aggregator
+    risk_aggregator = RiskAggregator(datafeed, running_strategies, _strategies_lock)
+    risk_aggregator.start()
+
     log("开始监听策略的运行状态...")
     service.subscribe(on_strategy_event)
 
@@ -151,6 +264,7 @@ def monitor_strategies():
             time.sleep(1)
     except KeyboardInterrupt:
         log("退出监听")
+        risk_aggregator.stop()
         datafeed.stop()
         service.unsubscribe()
         deal_service.unsubscribe()
@@ -0,0 +1,139 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+# 导出DataFrame时的列顺序
+POSITION_COLUMNS = [
+    "instrument_id",
+    "instrument_name",
+    "direction",
+    "volume",
+    "open_price",
+    "commission",
+    "created",
+]
+
+
+class PositionRecord:
+    """单条持仓记录，(合约代码, 持仓方向)唯一"""
+
+    __slots__ = POSITION_COLUMNS
+
+    def __init__(
+        self,
+        instrument_id: str,
+        instrument_name: str,
+        direction: int,
+        volume: int,
+        open_price: float,
+        commission: float,
+        created=None,
+    ):
+        self.instrument_id = instrument_id
+        self.instrument_name = instrument_name
+        self.direction = direction  # 1: 权利仓, -1: 义务仓
+        self.volume = volume
+        self.open_price = open_price
+        self.commission = commission
+        self.created = created
+
+    def __repr__(self):
+        return (
+            f"PositionRecord({self.instrument_id}, direction={self.direction}, "
+            f"volume={self.volume}, open_price={self.open_price})"
+        )
+
+
+class PositionBook:
+    """
+    内存持仓簿，以(合约代码, 持仓方向)为键
+    开平仓和按合约查询均为O(1)操作，仅在导出时才生成DataFrame
+    """
+
+    def __init__(self):
+        self._records: Dict[Tuple[str, int], PositionRecord] = {}
+        self._frame: Optional[pd.DataFrame] = None  # to_frame()的缓存
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[PositionRecord]:
+        return iter(self._records.values())
+
+    @property
+    def empty(self):
+        return len(self._records) == 0
+
+    def get(self, instrument_id: str, direction: int) -> Optional[PositionRecord]:
+        """获取指定合约和方向的持仓"""
+        return self._records.get((instrument_id, direction))
+
+    def get_by_instrument(self, instrument_id: str) -> List[PositionRecord]:
+        """获取指定合约所有方向的持仓"""
+        records = []
+        for direction in (1, -1):
+            record = self._records.get((instrument_id, direction))
+            if record is not None:
+                records.append(record)
+        return records
+
+    def add(self, record: PositionRecord):
+        """新增持仓（已存在时覆盖）"""
+        self._records[(record.instrument_id, record.direction)] = record
+        self._frame = None
+
+    def update(self, record: PositionRecord, volume, open_price, commission):
+        """更新持仓的数量、均价和手续费"""
+        record.volume = volume
+        record.open_price = open_price
+        record.commission = commission
+        self._frame = None
+
+    def remove(self, instrument_id: str, direction: int):
+        """删除持仓"""
+        self._records.pop((instrument_id, direction), None)
+        self._frame = None
+
+    def clear(self):
+        self._records.clear()
+        self._frame = None
+
+    def instrument_ids(self) -> List[str]:
+        """按持仓顺序返回不重复的合约代码"""
+        return list(dict.fromkeys(key[0] for key in self._records))
+
+    def first(self) -> Optional[PositionRecord]:
+        """返回最早加入的持仓"""
+        return next(iter(self._records.values()), None)
+
+    def load_frame(self, df: pd.DataFrame):
+        """
+        从持仓DataFrame加载持仓簿，原有持仓会被清空
+        :param df: 至少包含instrument_id/instrument_name/direction/volume/open_price/commission列
+        """
+        self.clear()
+        if df is None or df.empty:
+            return
+        columns = {
+            name: (df[name].tolist() if name in df else [None] * len(df))
+            for name in POSITION_COLUMNS
+        }
+        for values in zip(*(columns[name] for name in POSITION_COLUMNS)):
+            record = PositionRecord(*values)
+            record.direction = int(record.direction)
+            self._records[(record.instrument_id, record.direction)] = record
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        导出为DataFrame，结果会被缓存到下一次修改，调用方不应原地修改
+        """
+        if self._frame is None:
+            records = list(self._records.values())
+            self._frame = pd.DataFrame(
+                {
+                    name: [getattr(record, name) for record in records]
+                    for name in POSITION_COLUMNS
+                },
+                columns=POSITION_COLUMNS,
+            )
+        return self._frame
@@ -0,0 +1,178 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils import metrics
+from utils.logger import log
+
+# 汇总的风险指标
+RISK_COLUMNS = ["delta", "gamma", "vega", "theta", "margin"]
+# 汇总维度 -> (RiskReport的属性, 标签名)
+RISK_SCOPES = {
+    "strategy": ("by_strategy", "strategy_id"),
+    "user": ("by_user", "user_id"),
+    "underlying": ("by_underlying", "underlying"),
+}
+RISK_GAUGES = {
+    scope: metrics.gauge(
+        f"botgo_{scope}_risk", f"按{label}汇总的风险指标", [label, "metric"]
+    )
+    for scope, (_, label) in RISK_SCOPES.items()
+}
+
+
+class RiskReport:
+    """一次汇总的结果，按策略、用户和标的分别给出风险指标合计"""
+
+    def __init__(self, positions: pd.DataFrame, created: datetime):
+        """
+        :param positions: 全部策略的持仓明细，包含strategy_id/user_id/underlying及风险列
+        :param created: 汇总时间
+        """
+        self.positions = positions
+        self.created = created
+        self.by_strategy = self._group("strategy_id")
+        self.by_user = self._group("user_id")
+        self.by_underlying = self._group("underlying")
+
+    def _group(self, key):
+        if self.positions.empty:
+            return pd.DataFrame(columns=RISK_COLUMNS)
+        return self.positions.groupby(key, dropna=False)[RISK_COLUMNS].sum()
+
+    def total(self) -> pd.Series:
+        """全部策略的风险指标合计"""
+        return self.positions[RISK_COLUMNS].sum()
+
+    def to_text(self, by="strategy") -> str:
+        """
+        导出为文本表格
+        :param by: 汇总维度，strategy/user/underlying
+        """
+        frame = getattr(self, RISK_SCOPES[by][0])
+        header = f"# {self.created.isoformat(timespec='seconds')} by {by}\n"
+        total = self.total().to_frame("total").T
+        return header + pd.concat([frame, total]).to_string(float_format="%.4f") + "\n"
+
+
+class RiskAggregator:
+    """
+    跨策略的风险汇总
+    取所有运行中策略持仓合约的并集，只计算一次价格和希腊字母，
+    再按策略、用户和标的汇总delta/gamma/vega/theta/保证金
+    """
+
+    def __init__(self, datafeed, strategies: dict, lock=None, interval=5):
+        """
+        :param datafeed: 数据源，提供calculate_risk和get_option_contract_by_id
+        :param strategies: 运行中的策略实例，strategy_id -> BaseStrategy
+        :param lock: 保护strategies的锁
+        :param interval: 汇总间隔（秒）
+        """
+        self.datafeed = datafeed
+        self.strategies = strategies
+        self.lock = lock if lock is not None else threading.Lock()
+        self.interval = interval
+        self.report = None  # 最近一次的汇总结果
+        self._published = {scope: set() for scope in RISK_SCOPES}  # 已导出的标签
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def collect_positions(self) -> pd.DataFrame:
+        """收集所有策略的持仓，附加策略和用户信息"""
+        with self.lock:
+            strategies = list(self.strategies.values())
+        frames = []
+        for strategy in strategies:
+            if strategy.strategy_positions is None:
+                continue
+            frame = strategy.strategy_positions.to_frame()
+            if frame.empty:
+                continue
+            frames.append(
+                frame[["instrument_id", "direction", "volume"]].assign(
+                    strategy_id=strategy.strategy_id, user_id=strategy.user_id
+                )
+            )
+        if not frames:
+            return pd.DataFrame(
+                columns=["instrument_id", "direction", "volume", "strategy_id", "user_id"]
+            )
+        return pd.concat(frames, ignore_index=True)
+
+    def compute(self) -> RiskReport:
+        """汇总一次全部策略的风险"""
+        positions = self.collect_positions()
+        symbols = positions["instrument_id"].unique().tolist()
+        risks = self.datafeed.calculate_risk(symbols) if symbols else None
+        if risks:
+            risks = pd.DataFrame(risks).set_index("instrument_id")
+        else:
+            risks = pd.DataFrame(columns=RISK_COLUMNS)
+        risks = risks.reindex(symbols)
+
+        underlying = {}
+        for symbol in symbols:
+            contract = self.datafeed.get_option_contract_by_id(symbol)
+            underlying[symbol] = (
+                contract.underlying_code if contract is not None else None
+            )
+
+        per_unit = risks.loc[positions["instrument_id"], RISK_COLUMNS].to_numpy(
+            dtype=float
+        )
+        volume = positions["volume"].to_numpy(dtype=float)
+        direction = positions["direction"].to_numpy(dtype=float)
+        signed = (volume * direction)[:, None]
+        values = per_unit[:, :4] * signed
+        # 只有义务仓收取保证金，未计组合保证金优惠
+        margin = np.where(direction == -1, per_unit[:, 4] * volume, 0.0)
+
+        positions = positions.assign(
+            underlying=positions["instrument_id"].map(underlying),
+            **{name: values[:, i] for i, name in enumerate(RISK_COLUMNS[:4])},
+            margin=margin,
+        )
+        self.report = RiskReport(positions, datetime.now())
+        self.publish(self.report)
+        return self.report
+
+    def publish(self, report: RiskReport):
+        """将汇总结果写入指标，已不存在的策略/用户/标的的序列会被删除"""
+        for scope, (attr, label) in RISK_SCOPES.items():
+            gauge = RISK_GAUGES[scope]
+            frame = getattr(report, attr)
+            keys = {str(key) for key in frame.index}
+            for key, row in zip(frame.index, frame.itertuples(index=False)):
+                for name, value in zip(RISK_COLUMNS, row):
+                    gauge.set(float(value), **{label: str(key), "metric": name})
+            for key in self._published[scope] - keys:
+                for name in RISK_COLUMNS:
+                    gauge.remove(**{label: key, "metric": name})
+            self._published[scope] = keys
+
+    def start(self):
+        """启动定时汇总线程"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            start = time.monotonic()
+            try:
+                self.compute()
+            except Exception as e:
+                log(f"汇总策略风险失败: {str(e)}", "error")
+            self._stop_event.wait(max(self.interval - (time.monotonic() - start), 0))
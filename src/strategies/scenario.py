@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+from utils.option import black_scholes_price_array, calculate_margin_array
+
+# 情景计算需要的持仓腿字段
+LEG_COLUMNS = [
+    "instrument_id",
+    "direction",
+    "volume",
+    "is_call",
+    "strike",
+    "vol_mul",
+    "underlying_price",
+    "price",
+    "sigma",
+    "t_days",
+]
+
+# 券商在交易所保证金基础上上浮的比例，与calculate_risk保持一致
+MARGIN_RATIO = 1.2
+
+
+class ScenarioGrid:
+    """情景分析结果，pnl和margin的形状均为(标的涨跌, 波动率变化, 经过天数)"""
+
+    def __init__(self, underlying_moves, vol_shifts, days_forward, pnl, margin):
+        self.underlying_moves = underlying_moves
+        self.vol_shifts = vol_shifts
+        self.days_forward = days_forward
+        self.pnl = pnl
+        self.margin = margin
+
+    def to_frame(self) -> pd.DataFrame:
+        """展开为长表，每行一个情景"""
+        index = pd.MultiIndex.from_product(
+            [self.underlying_moves, self.vol_shifts, self.days_forward],
+            names=["underlying_move", "vol_shift", "days_forward"],
+        )
+        return pd.DataFrame(
+            {"pnl": self.pnl.ravel(), "margin": self.margin.ravel()}, index=index
+        )
+
+    def worst(self) -> pd.Series:
+        """亏损最大的情景"""
+        frame = self.to_frame()
+        return frame.iloc[frame["pnl"].to_numpy().argmin()]
+
+
+def build_scenario_legs(datafeed, positions: pd.DataFrame) -> pd.DataFrame:
+    """
+    为持仓补充情景计算所需的合约信息、最新价格和隐含波动率
+    :param datafeed: 数据源，提供calculate_risk和get_option_contract_by_id
+    :param positions: 持仓，需包含instrument_id/direction/volume列
+    :return: 包含LEG_COLUMNS的DataFrame，缺少行情或合约信息的持仓会被剔除
+    """
+    symbols = positions["instrument_id"].unique().tolist()
+    risks = datafeed.calculate_risk(symbols) if symbols else None
+    if not risks:
+        return pd.DataFrame(columns=LEG_COLUMNS)
+    risks = pd.DataFrame(risks).set_index("instrument_id")
+
+    contracts = []
+    for symbol in risks.index:
+        contract = datafeed.get_option_contract_by_id(symbol)
+        if contract is None:
+            continue
+        contracts.append(
+            {
+                "instrument_id": symbol,
+                "is_call": contract.option_type == "CALL",
+                "strike": contract.strike_price,
+                "vol_mul": contract.volume_multiple,
+                "t_days": datafeed.get_days_to_expiry(contract),
+            }
+        )
+    if not contracts:
+        return pd.DataFrame(columns=LEG_COLUMNS)
+    contracts = pd.DataFrame(contracts).set_index("instrument_id")
+    info = contracts.join(
+        risks[["undl_price", "price", "sigma"]].rename(
+            columns={"undl_price": "underlying_price"}
+        ),
+        how="inner",
+    )
+    legs = positions[["instrument_id", "direction", "volume"]].join(
+        info, on="instrument_id", how="inner"
+    )
+    return legs[LEG_COLUMNS].reset_index(drop=True)
+
+
+def compute_scenario_grid(
+    legs: pd.DataFrame,
+    underlying_moves=np.linspace(-0.1, 0.1, 21),
+    vol_shifts=np.linspace(-0.1, 0.1, 5),
+    days_forward=(0, 1, 5),
+    r: float = 0.0,
+) -> ScenarioGrid:
+    """
+    在(标的涨跌 x 波动率变化 x 经过天数)的网格上对全部持仓重新定价
+    :param legs: build_scenario_legs的结果
+    :param underlying_moves: 标的价格相对变动，例如-0.05表示下跌5%，所有标的同向变动
+    :param vol_shifts: 隐含波动率的绝对变化，例如0.02表示上升2个百分点
+    :param days_forward: 经过的自然日数
+    :param r: 无风险利率
+    :return: ScenarioGrid，pnl为相对当前价格的持仓盈亏，margin为义务仓保证金合计
+    """
+    moves = np.asarray(underlying_moves, dtype=float)
+    shifts = np.asarray(vol_shifts, dtype=float)
+    days = np.asarray(days_forward, dtype=float)
+    shape = (len(moves), len(shifts), len(days))
+    if legs.empty:
+        return ScenarioGrid(moves, shifts, days, np.zeros(shape), np.zeros(shape))
+
+    def column(name):
+        # 形状为(持仓, 1, 1, 1)，与网格广播
+        return legs[name].to_numpy(dtype=float)[:, None, None, None]
+
+    is_call = legs["is_call"].to_numpy(dtype=bool)[:, None, None, None]
+    strike = column("strike")
+    vol_mul = column("vol_mul")
+    price = column("price")
+    underlying = column("underlying_price") * (1 + moves[None, :, None, None])
+    sigma = np.maximum(column("sigma") + shifts[None, None, :, None], 1e-4)
+    t = (column("t_days") - days[None, None, None, :]) / 365.0
+
+    new_price = black_scholes_price_array(is_call, underlying, strike, t, r, sigma)
+    position = column("volume") * column("direction")
+    pnl = ((new_price - price) * vol_mul * position).sum(axis=0)
+
+    short = column("direction") < 0
+    option_type = np.where(is_call, "c", "p")
+    margin = calculate_margin_array(option_type, new_price, underlying, strike, vol_mul)
+    margin = np.where(short, margin * column("volume") * MARGIN_RATIO, 0.0)
+    return ScenarioGrid(moves, shifts, days, pnl, margin.sum(axis=0))
@@ -3,6 +3,7 @@ import string
 import pandas as pd
 import uuid
 import base64
+from operator import itemgetter
 
 
 def short_uuid():
@@ -27,31 +28,65 @@ def generate_action_name(length=12):
     return first_char + rest_chars
 
 
+# Record中不作为数据列的属性
+RECORD_EXCLUDED_FIELDS = frozenset(["collection_id", "collection_name", "expand"])
+RECORD_DATETIME_FIELDS = ("created", "updated")
+# 集合名 -> (Record属性个数, 数据列)，同一集合的记录字段相同，只需解析一次
+_record_schemas = {}
+
+
+def _record_schema(records, attrs):
+    """
+    返回数据列，列按字段名排序（与原先按dir()取属性的顺序一致）
+    同一批记录的属性个数不一致（如集合新增了字段）时，取所有记录字段的并集且不缓存
+    :return: (数据列, 各记录的字段是否一致)
+    """
+    collection = getattr(records[0], "collection_name", None)
+    size = len(attrs[0])
+    uniform = all(len(item) == size for item in attrs)
+    cached = _record_schemas.get(collection)
+    if (
+        uniform
+        and cached is not None
+        and cached[0] == size
+        and all(name in attrs[0] for name in cached[1])
+    ):
+        return cached[1], True
+
+    # 与原实现一致：各记录的字段排序后按首次出现的顺序合并
+    items = attrs[:1] if uniform else attrs
+    names = dict.fromkeys(name for item in items for name in sorted(item))
+    fields = tuple(
+        name
+        for name in names
+        if not name.startswith("_") and name not in RECORD_EXCLUDED_FIELDS
+    )
+    if uniform:
+        _record_schemas[collection] = (size, fields)
+    return fields, uniform
+
+
 def record2dataframe(records):
-    values = []
-    for record in records:
-        record_dict = {
-            name: getattr(record, name)
-            for name in dir(record)
-            if (
-                not name.startswith("_")
-                and name
-                not in [
-                    "collection_id",
-                    "collection_name",
-                    "is_new",
-                    "load",
-                    "load_expanded",
-                    "parse_expanded",
-                    "expand",
-                ]
-            )
-        }
-        values.append(record_dict)
-    if len(values) == 0:
+    """
+    PocketBase记录列表转换为DataFrame
+    字段按集合解析一次，按列批量取值，created/updated整列转换为datetime64
+    :param records: pocketbase Record列表
+    :return: 每条记录一行的DataFrame，没有记录时返回空DataFrame
+    """
+    if len(records) == 0:
         return pd.DataFrame()
 
-    return pd.DataFrame(values)
+    attrs = [vars(record) for record in records]
+    fields, uniform = _record_schema(records, attrs)
+    if uniform and len(fields) > 1:
+        # 字段一致时按行整体取值再转置，比逐列遍历快
+        columns = dict(zip(fields, map(list, zip(*map(itemgetter(*fields), attrs)))))
+    else:
+        columns = {name: [item.get(name) for item in attrs] for name in fields}
+    for name in RECORD_DATETIME_FIELDS:
+        if name in columns:
+            columns[name] = pd.to_datetime(columns[name], errors="coerce")
+    return pd.DataFrame(columns)
 
 
 def decompose(n, m):
@@ -35,3 +35,11 @@ def load_market_db_config():
         "STREAM_BAR_TABLE": os.getenv("MARKET_STREAM_BAR_NAME"),
         "TICK_TABLE": os.getenv("MARKET_STREAM_TICK_NAME"),
     }
+
+
+def load_metrics_config():
+    load_dotenv()
+    return {
+        "METRICS_HOST": os.getenv("METRICS_HOST", "127.0.0.1"),
+        "METRICS_PORT": int(os.getenv("METRICS_PORT", "9108")),
+    }
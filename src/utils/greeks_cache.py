@@ -0,0 +1,147 @@
+import threading
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .option import calculate_iv_and_greeks
+
+# 缓存的希腊字母，顺序与calculate_iv_and_greeks的返回值一致
+GREEKS_COLUMNS = ["sigma", "delta", "gamma", "theta", "vega", "rho"]
+
+
+class GreeksEntry:
+    """单个合约的希腊字母及求解时的输入"""
+
+    __slots__ = (
+        "option_price",
+        "underlying_price",
+        "strike_price",
+        "t_days",
+        "r",
+        "greeks",
+    )
+
+    def __init__(self, option_price, underlying_price, strike_price, t_days, r, greeks):
+        self.option_price = option_price
+        self.underlying_price = underlying_price
+        self.strike_price = strike_price
+        self.t_days = t_days
+        self.r = r
+        self.greeks = greeks
+
+    def is_fresh(
+        self, option_price, underlying_price, strike_price, t_days, r, epsilon
+    ):
+        """输入变动均未超过阈值时缓存仍然有效"""
+        return (
+            self.t_days == t_days
+            and self.r == r
+            and self.strike_price == strike_price
+            and abs(self.option_price - option_price) <= epsilon
+            and abs(self.underlying_price - underlying_price) <= epsilon
+        )
+
+
+class GreeksCache:
+    """
+    进程级的希腊字母缓存，以合约代码为键，供所有策略共享
+    只有期权价格或标的价格变动超过阈值、或剩余天数、无风险利率变化时才重新求解隐含波动率
+    """
+
+    def __init__(self, price_epsilon: float = 1e-6):
+        """
+        :param price_epsilon: 价格变动阈值，小于等于该值视为价格未变
+        """
+        self.price_epsilon = price_epsilon
+        self._entries: Dict[str, GreeksEntry] = {}
+        self._lock = threading.Lock()
+        # 命中计数按线程分别累加，命中路径不需要加锁
+        self._local = threading.local()
+        self._hit_counts = []
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hits(self) -> int:
+        return sum(counts[0] for counts in self._hit_counts)
+
+    def _count_hit(self):
+        counts = getattr(self._local, "hits", None)
+        if counts is None:
+            counts = self._local.hits = [0]
+            with self._lock:
+                self._hit_counts.append(counts)
+        counts[0] += 1
+
+    def get(
+        self,
+        instrument_id: str,
+        option_type: str,
+        strike_price: float,
+        option_price: float,
+        underlying_price: float,
+        t_days: float,
+        r: float = 0.0,
+    ) -> dict:
+        """
+        返回合约的隐含波动率和希腊字母，必要时重新求解
+        :param instrument_id: 合约代码
+        :param option_type: 'c'（认购）或'p'（认沽）
+        :return: 与calculate_iv_and_greeks相同的dict，调用方不应修改
+        """
+        entry = self._entries.get(instrument_id)
+        if entry is not None and entry.is_fresh(
+            option_price, underlying_price, strike_price, t_days, r, self.price_epsilon
+        ):
+            self._count_hit()
+            return entry.greeks
+
+        # 求解失败时与calculate_iv_and_greeks一样抛出ValueError，不写入缓存
+        greeks = calculate_iv_and_greeks(
+            market_price=option_price,
+            underlying_price=underlying_price,
+            strike_price=strike_price,
+            t_days=t_days,
+            r=r,
+            option_type=option_type,
+        )
+        with self._lock:
+            self._entries[instrument_id] = GreeksEntry(
+                option_price, underlying_price, strike_price, t_days, r, greeks
+            )
+            self.misses += 1
+        return greeks
+
+    def lookup(self, instrument_ids: Iterable[str]) -> pd.DataFrame:
+        """
+        批量读取缓存的希腊字母
+        :param instrument_ids: 合约代码列表
+        :return: 以合约代码为索引的DataFrame，未缓存的合约为NaN
+        """
+        instrument_ids = list(instrument_ids)
+        values = np.full((len(instrument_ids), len(GREEKS_COLUMNS)), np.nan)
+        entries = self._entries
+        for i, instrument_id in enumerate(instrument_ids):
+            entry = entries.get(instrument_id)
+            if entry is not None:
+                values[i] = [entry.greeks[name] for name in GREEKS_COLUMNS]
+        return pd.DataFrame(
+            values,
+            index=pd.Index(instrument_ids, name="instrument_id"),
+            columns=GREEKS_COLUMNS,
+        )
+
+    def invalidate(self, instrument_id: Optional[str] = None):
+        """清除指定合约的缓存，不指定时清空全部"""
+        with self._lock:
+            if instrument_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(instrument_id, None)
+
+
+# 进程内共享的缓存实例
+greeks_cache = GreeksCache()
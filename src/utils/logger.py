@@ -1,6 +1,14 @@
+import atexit
+import json
 import logging
 import os
+import queue
+import random
+import sys
+import threading
+import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 
 # 创建logs目录（如果不存在）
 logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
@@ -10,54 +18,164 @@ os.makedirs(logs_dir, exist_ok=True)
 log_format = "%(asctime)s - %(levelname)s - %(message)s"
 date_format = "%Y-%m-%d %H:%M:%S"
 
+# 设置环境变量LOG_FORMAT=json时，日志文件按行输出JSON
+LOG_JSON = os.getenv("LOG_FORMAT", "").lower() == "json"
+
+_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "critical": logging.CRITICAL,
+}
+
+_logger = None
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class DailyFileHandler(logging.FileHandler):
+    """按日期写入logs/YYYY-MM-DD.log，跨天后自动切换到新文件"""
+
+    def __init__(self, directory, encoding="utf-8"):
+        self.directory = directory
+        self.current_date = datetime.now().strftime("%Y-%m-%d")
+        super().__init__(self._path(), encoding=encoding, delay=True)
+
+    def _path(self):
+        return os.path.join(self.directory, f"{self.current_date}.log")
+
+    def emit(self, record):
+        record_date = datetime.fromtimestamp(record.created).strftime("%Y-%m-%d")
+        if record_date != self.current_date:
+            self.current_date = record_date
+            self.baseFilename = os.path.abspath(self._path())
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+        super().emit(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON"""
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record, date_format),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
 
 def get_logger():
-    # 获取当前日期作为日志文件名
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    log_file = os.path.join(logs_dir, f"{current_date}.log")
+    """
+    返回全局logger
+    调用线程只把日志放入队列，由后台的QueueListener线程写入文件和控制台
+    """
+    global _logger, _listener
+    if _logger is not None:
+        return _logger
+    with _setup_lock:
+        if _logger is not None:
+            return _logger
+
+        logger = logging.getLogger("botgo")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+        # 创建文件处理器和控制台处理器
+        file_handler = DailyFileHandler(logs_dir)
+        console_handler = logging.StreamHandler()
+
+        # 创建格式化器
+        formatter = logging.Formatter(log_format, date_format)
+        file_handler.setFormatter(JsonFormatter() if LOG_JSON else formatter)
+        console_handler.setFormatter(formatter)
+
+        # 无界队列，写日志的线程不会因为磁盘或控制台IO阻塞
+        log_queue = queue.SimpleQueue()
+        logger.handlers.clear()
+        logger.addHandler(QueueHandler(log_queue))
+        _listener = QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(shutdown_logging)
+        _logger = logger
+    return _logger
+
+
+def shutdown_logging():
+    """写完队列中剩余的日志并停止后台线程"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
-    # 创建logger
-    logger = logging.getLogger("botgo")
-    logger.setLevel(logging.INFO)
+class _SiteState:
+    """单个调用位置的限流状态"""
 
-    # 如果logger已经有处理器，说明已经配置过，直接返回
-    if logger.handlers:
-        return logger
+    __slots__ = ("last_time", "suppressed")
 
-    # 创建文件处理器
-    file_handler = logging.FileHandler(log_file, encoding="utf-8")
-    file_handler.setLevel(logging.INFO)
+    def __init__(self):
+        self.last_time = None
+        self.suppressed = 0
 
-    # 创建控制台处理器
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
 
-    # 创建格式化器
-    formatter = logging.Formatter(log_format, date_format)
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
+_sites = {}
+_sites_lock = threading.Lock()
 
-    # 添加处理器到logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
 
-    return logger
+def _allow(site, interval, sample):
+    """
+    判断调用位置的本次日志是否输出
+    :return: (是否输出, 此前被省略的条数)
+    """
+    with _sites_lock:
+        state = _sites.get(site)
+        if state is None:
+            state = _sites[site] = _SiteState()
+        now = time.monotonic()
+        allowed = True
+        if sample is not None and random.random() >= sample:
+            allowed = False
+        elif (
+            interval is not None
+            and state.last_time is not None
+            and now - state.last_time < interval
+        ):
+            allowed = False
+        if not allowed:
+            state.suppressed += 1
+            return False, 0
+        suppressed = state.suppressed
+        state.last_time = now
+        state.suppressed = 0
+        return True, suppressed
 
 
 # 全局日志函数
-def log(message, level="info"):
-    logger = get_logger()
-    level = level.lower()
-
-    if level == "debug":
-        logger.debug(message)
-    elif level == "info":
-        logger.info(message)
-    elif level == "warning":
-        logger.warning(message)
-    elif level == "error":
-        logger.error(message)
-    elif level == "critical":
-        logger.critical(message)
-    else:
-        logger.info(message)
+def log(message, level="info", interval=None, sample=None, key=None):
+    """
+    写日志
+    :param message: 日志内容
+    :param level: debug/info/warning/error/critical，无法识别时按info处理
+    :param interval: 同一调用位置两次输出的最小间隔（秒），间隔内的日志被省略
+    :param sample: 采样比例（0~1），只输出该比例的日志
+    :param key: 限流的分组键，默认为调用位置（文件名和行号）
+    """
+    if interval is not None or sample is not None:
+        if key is None:
+            frame = sys._getframe(1)
+            key = (frame.f_code.co_filename, frame.f_lineno)
+        allowed, suppressed = _allow(key, interval, sample)
+        if not allowed:
+            return
+        if suppressed:
+            message = f"{message} (省略了{suppressed}条相同位置的日志)"
+    get_logger().log(_LEVELS.get(level.lower(), logging.INFO), message)
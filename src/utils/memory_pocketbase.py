@@ -0,0 +1,590 @@
+import bisect
+import functools
+import itertools
+import json
+import queue
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from pocketbase.errors import ClientResponseError
+from pocketbase.models import Record
+from pocketbase.models.list_result import ListResult
+from pocketbase.services.realtime_service import MessageData
+from pocketbase.utils import camel_to_snake
+
+# 建立等值索引的字段
+INDEXED_FIELDS = ("strategy", "user")
+# json类型的字段，与PocketBase一样把合法的JSON字符串解析后保存
+JSON_FIELDS = {"strategyStates": {"state_data"}}
+# 关联字段 -> 关联的集合，用于expand
+RELATIONS = {"user": "users", "strategy": "strategies"}
+
+_TOKEN_RE = re.compile(
+    r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<number>-?\d+(?:\.\d+)?(?![\w.]))
+      | (?P<op>&&|\|\||!=|>=|<=|!~|=|>|<|~|\(|\))
+      | (?P<name>[A-Za-z_@][\w.@:]*)
+    )""",
+    re.VERBOSE,
+)
+_LITERALS = {"true": True, "false": False, "null": None}
+_RANGE_OPS = (">", ">=", "<", "<=")
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3] + "Z"
+
+
+def _normalize_datetime(value):
+    """统一为PocketBase的时间格式 YYYY-MM-DD HH:MM:SS.mmmZ，保证按字符串排序即按时间排序"""
+    if isinstance(value, datetime):
+        value = value.strftime("%Y-%m-%d %H:%M:%S.%f")
+    value = str(value).replace("T", " ").rstrip("Z")
+    if "." in value:
+        head, fraction = value.split(".", 1)
+        value = f"{head}.{fraction[:3].ljust(3, '0')}"
+    elif len(value) == 19:
+        value = f"{value}.000"
+    return value + "Z"
+
+
+@functools.lru_cache(maxsize=1024)
+def _snake_key(key):
+    return camel_to_snake(key).replace("@", "")
+
+
+def _parse_datetime(value):
+    # 与SDK的to_datetime一致：去掉毫秒，无法解析时返回原字符串
+    try:
+        return datetime.fromisoformat(value[:19])
+    except (TypeError, ValueError):
+        return value
+
+
+def _to_record(data) -> Record:
+    """
+    与Record(data)结果相同，但跳过SDK中重复的load和逐条的strptime/正则，
+    写入和查询的大部分时间原本都花在这里
+    """
+    record = Record.__new__(Record)
+    record.id = data.get("id", "")
+    record.created = _parse_datetime(data.get("created", ""))
+    record.updated = _parse_datetime(data.get("updated", ""))
+    record.expand = {}
+    attrs = record.__dict__
+    for key, value in data.items():
+        if key not in ("id", "created", "updated"):
+            attrs[_snake_key(key)] = value
+    return record
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None or match.end() == pos:
+            raise ValueError(f"无法解析的过滤条件: {text[pos:]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            value = re.sub(r"\\(.)", r"\1", value[1:-1])
+        elif kind == "number":
+            value = float(value) if "." in value else int(value)
+        elif kind == "name" and value in _LITERALS:
+            kind, value = "literal", _LITERALS[value]
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    """
+    PocketBase过滤语法的子集：
+    字段 (= != > >= < <= ~ !~) 字符串/数字/true/false/null，用 && || 和括号组合
+    解析结果为嵌套元组：("and"|"or", [子节点]) 或 ("cmp", 字段, 运算符, 值)
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"过滤条件有多余的内容: {self.tokens[self.pos:]}")
+        return node
+
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self.peek() == ("op", "||"):
+            self.take()
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def parse_and(self):
+        nodes = [self.parse_term()]
+        while self.peek() == ("op", "&&"):
+            self.take()
+            nodes.append(self.parse_term())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def parse_term(self):
+        if self.peek() == ("op", "("):
+            self.take()
+            node = self.parse_or()
+            if self.take() != ("op", ")"):
+                raise ValueError("过滤条件的括号不匹配")
+            return node
+        kind, field = self.take()
+        if kind != "name":
+            raise ValueError(f"过滤条件应以字段名开头: {field!r}")
+        kind, op = self.take()
+        if kind != "op" or op in ("&&", "||", "(", ")"):
+            raise ValueError(f"字段 {field} 后缺少比较运算符")
+        kind, value = self.take()
+        if kind not in ("string", "number", "literal"):
+            raise ValueError(f"字段 {field} 只能与常量比较")
+        return ("cmp", field, op, value)
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_filter(text: str):
+    """解析过滤条件，结果按字符串缓存"""
+    if not text or not text.strip():
+        return None
+    return _Parser(_tokenize(text)).parse()
+
+
+def _coerce(left, right):
+    """按常量的类型转换字段值，缺失字段按PocketBase的零值处理"""
+    if isinstance(right, bool):
+        return bool(left), right
+    if isinstance(right, (int, float)):
+        if left is None or left == "":
+            return 0, right
+        try:
+            return float(left), right
+        except (TypeError, ValueError):
+            return str(left), str(right)
+    if right is None:
+        return (None if left == "" else left), None
+    if left is None:
+        return "", right
+    if isinstance(left, bool):
+        return str(left).lower(), right
+    return (left if isinstance(left, str) else str(left)), right
+
+
+def _index_key(value):
+    """
+    等值索引的键，与字符串常量比较时_coerce对字段值的转换一致
+    只有字符串常量的等值条件使用索引，其他类型的常量逐条比较
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value).lower()
+    return value if isinstance(value, str) else str(value)
+
+
+def _like(value, pattern):
+    value = "" if value is None else str(value)
+    if "%" not in pattern:
+        return pattern.lower() in value.lower()
+    regex = ".*".join(re.escape(part) for part in pattern.split("%"))
+    return re.fullmatch(regex, value, re.IGNORECASE | re.DOTALL) is not None
+
+
+_COMPARE = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+}
+
+
+def _compile(node):
+    """把语法树编译为接收记录dict、返回bool的函数"""
+    if node is None:
+        return lambda data: True
+    kind = node[0]
+    if kind in ("and", "or"):
+        predicates = [_compile(child) for child in node[1]]
+        if kind == "and":
+            return lambda data: all(p(data) for p in predicates)
+        return lambda data: any(p(data) for p in predicates)
+    _, field, op, value = node
+    if op in ("~", "!~"):
+        pattern = str(value)
+        if op == "~":
+            return lambda data: _like(data.get(field), pattern)
+        return lambda data: not _like(data.get(field), pattern)
+    compare = _COMPARE[op]
+    value_type = type(value)
+
+    def predicate(data):
+        left = data.get(field)
+        if type(left) is value_type:
+            # 类型相同时无需转换，绝大多数比较走这里
+            return compare(left, value)
+        left, right = _coerce(left, value)
+        try:
+            return compare(left, right)
+        except TypeError:
+            return False
+
+    return predicate
+
+
+@functools.lru_cache(maxsize=4096)
+def _residual_filter(text: str, satisfied):
+    """
+    去掉已由索引保证的等值条件后的过滤函数
+    :param satisfied: 索引使用的条件节点，为None时返回完整的过滤函数
+    :return: 过滤函数，没有剩余条件时返回None
+    """
+    node = parse_filter(text)
+    if satisfied is None:
+        return _compile(node)
+    if node == satisfied:
+        return None
+    rest = list(node[1])
+    rest.remove(satisfied)
+    return _compile(rest[0] if len(rest) == 1 else ("and", rest))
+
+
+def _sort_key(value):
+    # None排在最前，数字和字符串分开比较，避免类型不同无法比较
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (bool, int, float)):
+        return (1, value)
+    return (2, str(value))
+
+
+class MemoryCollection:
+    """
+    线程安全的内存集合
+    记录按(created, 写入序号)有序保存，并按INDEXED_FIELDS建立等值索引，
+    过滤条件中的等值和created范围条件先用索引缩小范围，再逐条校验完整条件
+    """
+
+    def __init__(self, client: "MemoryPocketBase", name: str):
+        self.client = client
+        self.name = name
+        self.json_fields = JSON_FIELDS.get(name, set())
+        self._records: Dict[str, dict] = {}
+        self._keys: Dict[str, tuple] = {}  # id -> (created, 序号)
+        self._order: List[tuple] = []  # (created, 序号, id)，升序
+        self._indexes: Dict[str, Dict[object, List[tuple]]] = {
+            field: {} for field in INDEXED_FIELDS
+        }
+        self._subscribers: Dict[str, List[Callable]] = {}
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+
+    # ---- 写入 ----
+
+    def _new_id(self):
+        return f"{next(self.client._ids):015d}"
+
+    def _prepare(self, body_params):
+        data = dict(body_params or {})
+        for field in self.json_fields & data.keys():
+            if isinstance(data[field], str):
+                try:
+                    data[field] = json.loads(data[field])
+                except ValueError:
+                    pass
+        return data
+
+    def _insert(self, data):
+        key = (data["created"], next(self._seq), data["id"])
+        self._records[data["id"]] = data
+        self._keys[data["id"]] = key
+        bisect.insort(self._order, key)
+        for field, index in self._indexes.items():
+            bisect.insort(index.setdefault(_index_key(data.get(field)), []), key)
+
+    def _remove(self, record_id):
+        data = self._records.pop(record_id)
+        key = self._keys.pop(record_id)
+        del self._order[bisect.bisect_left(self._order, key)]
+        for field, index in self._indexes.items():
+            value = _index_key(data.get(field))
+            keys = index[value]
+            del keys[bisect.bisect_left(keys, key)]
+            if not keys:
+                del index[value]
+        return data
+
+    def create(self, body_params=None, query_params=None) -> Record:
+        data = self._prepare(body_params)
+        now = _now()
+        data["created"] = _normalize_datetime(data.get("created") or now)
+        data["updated"] = _normalize_datetime(data.get("updated") or now)
+        data["collectionName"] = self.name
+        data["collectionId"] = self.name
+        with self._lock:
+            if not data.get("id"):
+                data["id"] = self._new_id()
+            elif data["id"] in self._records:
+                raise ClientResponseError("记录ID已存在", status=400)
+            self._insert(data)
+        self._publish("create", data)
+        return self._decode(data, query_params)
+
+    def update(self, id, body_params=None, query_params=None) -> Record:
+        changes = self._prepare(body_params)
+        changes.pop("id", None)
+        with self._lock:
+            if id not in self._records:
+                raise ClientResponseError("记录不存在", status=404)
+            data = dict(self._records[id])
+            data.update(changes)
+            if "created" in changes:
+                data["created"] = _normalize_datetime(data["created"])
+            data["updated"] = _now()
+            self._remove(id)
+            self._insert(data)
+        self._publish("update", data)
+        return self._decode(data, query_params)
+
+    def delete(self, id, query_params=None) -> bool:
+        with self._lock:
+            if id not in self._records:
+                raise ClientResponseError("记录不存在", status=404)
+            data = self._remove(id)
+        self._publish("delete", data)
+        return True
+
+    # ---- 查询 ----
+
+    def _get(self, record_id):
+        with self._lock:
+            return self._records.get(record_id)
+
+    def _decode(self, data, query_params=None):
+        record = _to_record(data)
+        expand = (query_params or {}).get("expand")
+        if expand:
+            for field in (name.strip() for name in expand.split(",")):
+                target = RELATIONS.get(field)
+                value = data.get(field)
+                if target is None or not value:
+                    continue
+                related = self.client.collection(target)._get(value)
+                if related is not None:
+                    record.expand[field] = _to_record(related)
+        return record
+
+    def _candidates(self, node):
+        """
+        根据过滤条件中的索引字段和created范围，返回按created升序的候选键
+        :return: (候选键, 使用的索引等值条件)，未使用等值索引时条件为None
+        """
+        conditions = node[1] if node is not None and node[0] == "and" else [node]
+        best = None
+        satisfied = None
+        low, high = None, None
+        for condition in conditions:
+            if condition is None or condition[0] != "cmp":
+                continue
+            _, field, op, value = condition
+            if field in self._indexes and op == "=" and isinstance(value, str):
+                keys = self._indexes[field].get(value, [])
+                if best is None or len(keys) < len(best):
+                    best = keys
+                    satisfied = condition
+            elif field == "created" and op in _RANGE_OPS and isinstance(value, str):
+                if op in (">", ">="):
+                    low = value if low is None else max(low, value)
+                else:
+                    high = value if high is None else min(high, value)
+        if best is not None:
+            return best, satisfied
+        best = self._order
+        if low is not None or high is not None:
+            # created按字符串比较，范围可以直接二分
+            start = 0 if low is None else bisect.bisect_left(self._order, (low,))
+            end = (
+                len(self._order)
+                if high is None
+                else bisect.bisect_right(self._order, (high, float("inf")))
+            )
+            best = self._order[start:end]
+        return best, satisfied
+
+    def _query(self, query_params) -> List[dict]:
+        query_params = query_params or {}
+        text = query_params.get("filter") or ""
+        with self._lock:
+            keys, satisfied = self._candidates(parse_filter(text))
+            records = self._records
+            items = [records[key[2]] for key in keys]
+        predicate = _residual_filter(text, satisfied)
+        if predicate is not None:
+            items = [data for data in items if predicate(data)]
+        return self._sort(items, query_params.get("sort") or "")
+
+    @staticmethod
+    def _sort(items, sort):
+        fields = [field.strip() for field in sort.split(",") if field.strip()]
+        if not fields:
+            return items
+        if fields == ["created"]:
+            return items
+        if fields == ["-created"]:
+            items.reverse()
+            return items
+        # 多字段排序：从最后一个字段开始做稳定排序
+        for field in reversed(fields):
+            descending = field.startswith("-")
+            name = field.lstrip("-+")
+            items.sort(key=lambda data: _sort_key(data.get(name)), reverse=descending)
+        return items
+
+    def get_list(self, page=1, per_page=30, query_params=None) -> ListResult:
+        items = self._query(query_params)
+        total = len(items)
+        if per_page is None or per_page <= 0:
+            per_page = max(total, 1)
+        start = (page - 1) * per_page
+        pages = (total + per_page - 1) // per_page
+        return ListResult(
+            page,
+            per_page,
+            total,
+            pages,
+            [
+                self._decode(data, query_params)
+                for data in items[start : start + per_page]
+            ],
+        )
+
+    def get_full_list(self, batch=100, query_params=None) -> List[Record]:
+        return [self._decode(data, query_params) for data in self._query(query_params)]
+
+    def get_one(self, id, query_params=None) -> Record:
+        data = self._get(id)
+        if data is None:
+            raise ClientResponseError("记录不存在", status=404)
+        return self._decode(data, query_params)
+
+    def get_first_list_item(self, filter, query_params=None) -> Record:
+        query_params = dict(query_params or {})
+        query_params["filter"] = filter
+        result = self.get_list(1, 1, query_params)
+        if not result.items:
+            raise ClientResponseError("记录不存在", status=404)
+        return result.items[0]
+
+    def count(self, filter: str = "") -> int:
+        return len(self._query({"filter": filter}))
+
+    # ---- 实时订阅 ----
+
+    def subscribe(self, callback):
+        self._add_subscriber("*", callback)
+
+    def subscribe_one(self, record_id, callback):
+        self._add_subscriber(record_id, callback)
+
+    def _add_subscriber(self, topic, callback):
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(callback)
+
+    def unsubscribe(self, *record_ids):
+        with self._lock:
+            if record_ids:
+                for record_id in record_ids:
+                    self._subscribers.pop(record_id, None)
+            else:
+                self._subscribers.clear()
+
+    def _publish(self, action, data):
+        with self._lock:
+            callbacks = self._subscribers.get("*", []) + self._subscribers.get(
+                data["id"], []
+            )
+        if callbacks:
+            self.client._dispatch(callbacks, MessageData(action, _to_record(data)))
+
+
+class MemoryPocketBase:
+    """
+    进程内的PocketBase替身，client.collection(name)的接口与pocketbase SDK一致
+    支持过滤条件子集、排序、分页、expand和实时订阅，可用于压测、回放和基准测试
+    """
+
+    def __init__(self, async_events: bool = True):
+        """
+        :param async_events: 实时事件是否由后台线程按顺序推送（与SDK一致），
+            为False时在写入线程中同步回调
+        """
+        self.async_events = async_events
+        self._collections: Dict[str, MemoryCollection] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._events: Optional[queue.Queue] = None
+        self._dispatcher: Optional[threading.Thread] = None
+
+    def collection(self, name: str) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            with self._lock:
+                collection = self._collections.get(name)
+                if collection is None:
+                    collection = self._collections[name] = MemoryCollection(self, name)
+        return collection
+
+    def _dispatch(self, callbacks, message):
+        if not self.async_events:
+            for callback in callbacks:
+                callback(message)
+            return
+        if self._dispatcher is None:
+            with self._lock:
+                if self._dispatcher is None:
+                    self._events = queue.Queue()
+                    self._dispatcher = threading.Thread(
+                        target=self._run_dispatcher,
+                        name="memory-pb-events",
+                        daemon=True,
+                    )
+                    self._dispatcher.start()
+        self._events.put((callbacks, message))
+
+    def _run_dispatcher(self):
+        while True:
+            callbacks, message = self._events.get()
+            try:
+                for callback in callbacks:
+                    try:
+                        callback(message)
+                    except Exception:
+                        # 与SDK一样，回调异常不影响后续事件
+                        pass
+            finally:
+                self._events.task_done()
+
+    def wait_for_events(self):
+        """阻塞到已产生的实时事件全部推送完成"""
+        if self._events is not None:
+            self._events.join()
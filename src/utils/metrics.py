@@ -0,0 +1,361 @@
+import functools
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from .logger import log
+
+# 直方图每个2的幂区间划分的子桶数，相对误差约为1/(2*SUB_BUCKETS)
+SUB_BUCKETS = 8
+# 直方图记录的最小精度（秒），更小的值计入第一个桶
+HISTOGRAM_UNIT = 1e-6
+# 导出的分位数
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def _escape_label(value):
+    """按Prometheus文本格式转义标签值中的反斜杠、双引号和换行"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    labels = ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs)
+    return "{" + labels + "}"
+
+
+def _format_value(value):
+    if value is None or math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Metric(ABC):
+    """指标基类，按标签值保存子序列"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.labelnames}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def remove(self, **labels):
+        """删除指定标签的子序列"""
+        with self._lock:
+            self._children.pop(self._key(labels), None)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    @abstractmethod
+    def _render_child(self, key, child):
+        """渲染单个子序列的指标行"""
+
+
+class Counter(Metric):
+    """只增不减的计数器"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._children.get(self._key(labels), 0)
+
+    def _render_child(self, key, child):
+        labels = _format_labels(self.labelnames, key)
+        return [f"{self.name}_total{labels} {_format_value(child)}"]
+
+
+class Gauge(Metric):
+    """可增可减的瞬时值，也可以注册在导出时才计算的函数"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._children[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, func: Callable[[], float], **labels):
+        """导出时调用func获取当前值，例如队列长度"""
+        with self._lock:
+            self._children[self._key(labels)] = func
+
+    def value(self, **labels) -> Optional[float]:
+        child = self._children.get(self._key(labels))
+        return child() if callable(child) else child
+
+    def _render_child(self, key, child):
+        try:
+            value = child() if callable(child) else child
+        except Exception:
+            value = float("nan")
+        labels = _format_labels(self.labelnames, key)
+        return [f"{self.name}{labels} {_format_value(value)}"]
+
+
+class _HistogramSeries:
+    """
+    对数线性分桶的直方图（HDR风格）
+    每个2的幂区间等分为SUB_BUCKETS个桶，记录为O(1)，分位数的相对误差有界
+    """
+
+    __slots__ = ("buckets", "count", "sum", "max")
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def bucket_index(value: float) -> int:
+        scaled = value / HISTOGRAM_UNIT
+        if scaled < 1:
+            return 0
+        mantissa, exponent = math.frexp(scaled)  # scaled = mantissa * 2**exponent
+        return exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+
+    @staticmethod
+    def bucket_upper(index: int) -> float:
+        exponent, sub = divmod(index, SUB_BUCKETS)
+        if exponent == 0:
+            return HISTOGRAM_UNIT
+        return (0.5 + (sub + 1) / (2 * SUB_BUCKETS)) * 2.0**exponent * HISTOGRAM_UNIT
+
+    def observe(self, value: float):
+        index = self.bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return float("nan")
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.bucket_upper(index), self.max)
+        return self.max
+
+
+class Histogram(Metric):
+    """耗时等分布型指标，导出为Prometheus summary（分位数、总和、次数）"""
+
+    kind = "summary"
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._children.get(key)
+            if series is None:
+                series = self._children[key] = _HistogramSeries()
+            series.observe(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """记录with块的耗时（秒）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, **labels):
+        """记录函数耗时的装饰器"""
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def quantile(self, q: float, **labels) -> float:
+        series = self._children.get(self._key(labels))
+        return series.quantile(q) if series is not None else float("nan")
+
+    def count(self, **labels) -> int:
+        series = self._children.get(self._key(labels))
+        return series.count if series is not None else 0
+
+    def _render_child(self, key, series):
+        with self._lock:
+            quantiles = [(q, series.quantile(q)) for q in QUANTILES]
+            total, count = series.sum, series.count
+        lines = [
+            f"{self.name}"
+            f"{_format_labels(self.labelnames, key, ('quantile', q))} "
+            f"{_format_value(value)}"
+            for q, value in quantiles
+        ]
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，同名指标只创建一次"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=()) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames)
+
+    def render(self) -> str:
+        """导出为Prometheus文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 进程内共享的指标注册表
+REGISTRY = MetricsRegistry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+# 指标服务上的附加接口，请求方法 -> 路径 -> 接收查询参数dict、返回文本的函数
+_ENDPOINTS: Dict[str, Dict[str, Callable[[dict], str]]] = {"GET": {}, "POST": {}}
+
+
+def register_endpoint(path: str, func: Callable[[dict], str], method: str = "GET"):
+    """
+    在指标服务上注册附加的文本接口，例如 /traces
+    :param method: GET用于只读查询，会写文件或启动任务的接口用POST
+    """
+    _ENDPOINTS[method][path] = func
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        if path in ("/", "/metrics"):
+            self._send_text(
+                self.registry.render(), "text/plain; version=0.0.4; charset=utf-8"
+            )
+            return
+        self._call_endpoint("GET", path, query)
+
+    def do_POST(self):
+        path, _, query = self.path.partition("?")
+        # 参数可以放在查询字符串或表单请求体中
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        self._call_endpoint("POST", path, "&".join(filter(None, [query, body])))
+
+    def _call_endpoint(self, method, path, query):
+        func = _ENDPOINTS[method].get(path)
+        if func is None:
+            if any(path in endpoints for endpoints in _ENDPOINTS.values()):
+                self.send_error(405)
+            else:
+                self.send_error(404)
+            return
+        try:
+            text = func(dict(parse_qsl(query)))
+        except ValueError as e:
+            # 参数错误，消息放在响应体中（状态行只能使用latin-1）
+            self._send_text(f"{e}\n", "text/plain; charset=utf-8", 400)
+            return
+        except Exception as e:
+            self._send_text(f"{e}\n", "text/plain; charset=utf-8", 500)
+            return
+        self._send_text(text, "text/plain; charset=utf-8")
+
+    def _send_text(self, text, content_type, status=200):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = 9108, host: str = "127.0.0.1"):
+    """
+    在后台线程启动Prometheus指标的HTTP服务，访问 http://host:port/metrics
+    :return: HTTP服务实例，启动失败时返回None
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        log(f"指标服务启动失败 {host}:{port}: {str(e)}", "error")
+        return None
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    log(f"指标服务已启动: http://{host}:{port}/metrics")
+    return server
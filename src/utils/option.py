@@ -1,9 +1,10 @@
+import sys
+from decimal import ROUND_HALF_EVEN, Decimal
 from enum import IntEnum
-from py_vollib.black_scholes import implied_volatility
-from py_vollib.black_scholes.greeks import analytical
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Tuple
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+from datetime import date, datetime
 
 
 def calculate_margin(
@@ -45,6 +46,62 @@ def calculate_margin(
     return round(total_margin, 2)
 
 
+_CENT = Decimal("0.01")
+
+
+def calculate_margin_array(
+    option_type,
+    market_price,
+    underlying_price,
+    strike_price,
+    contract_multiplier=10000,
+    margin_coeff: float = 0.12,
+    min_coeff: float = 0.07,
+) -> np.ndarray:
+    """
+    calculate_margin的数组版本，参数按numpy规则广播
+    :param option_type: 期权类型数组，'c'（认购）或'p'（认沽）
+    :param market_price: 合约前结算价（元/份）
+    :param underlying_price: 标的收盘价（元）
+    :param strike_price: 行权价格（元）
+    :param contract_multiplier: 合约单位，默认10000
+    :param margin_coeff: 保证金系数，默认0.12（12%）
+    :param min_coeff: 最低保障系数，默认0.07（7%）
+    :return: 保证金金额数组（元）
+    """
+    option_type = np.char.lower(np.asarray(option_type, dtype=str))
+    is_call = option_type == "c"
+    if not np.all(is_call | (option_type == "p")):
+        raise ValueError("无效的期权类型，请使用'c'或'p'")
+    market_price = np.asarray(market_price, dtype=float)
+    underlying_price = np.asarray(underlying_price, dtype=float)
+    strike_price = np.asarray(strike_price, dtype=float)
+    contract_multiplier = np.asarray(contract_multiplier, dtype=float)
+
+    # 认购期权按标的价格、认沽期权按行权价计算
+    out_value = np.where(
+        is_call,
+        np.maximum(strike_price - underlying_price, 0),
+        np.maximum(underlying_price - strike_price, 0),
+    )
+    base = np.where(is_call, underlying_price, strike_price) * contract_multiplier
+    part_a = base * margin_coeff - out_value * contract_multiplier
+    part_b = base * min_coeff
+    total_margin = market_price * contract_multiplier + np.maximum(part_a, part_b)
+    rounded = np.array(np.round(total_margin, 2))
+    # np.round是先乘100再取整，乘法本身有舍入误差：二进制下略小于半分的值（如1467.895）
+    # 乘100后可能恰好变成xx.5再向上取整，而round()按浮点数的精确值取整得到1467.89。
+    # 只有落在半分附近的值会受影响，这部分用Decimal按精确值以银行家舍入重算，与round()一致
+    scaled = total_margin * 100
+    tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if tie.any():
+        rounded[tie] = [
+            float(Decimal(value).quantize(_CENT, ROUND_HALF_EVEN))
+            for value in total_margin[tie].tolist()
+        ]
+    return rounded
+
+
 def calculate_iv_and_greeks(
     market_price: float,
     underlying_price: float,
@@ -79,6 +136,10 @@ def calculate_iv_and_greeks(
         or market_price <= 0
     ):
         raise ValueError("标的价格、行权价、剩余时间、利率和市场价必须为正数")
+    # py_vollib导入较慢，首次计算时才加载
+    from py_vollib.black_scholes import implied_volatility
+    from py_vollib.black_scholes.greeks import analytical
+
     # 2. 计算隐含波动率
     try:
         t = t_days / 365.0  # 将天数转为年化数值
@@ -104,6 +165,38 @@ def calculate_iv_and_greeks(
     }
 
 
+def black_scholes_price_array(is_call, underlying_price, strike_price, t, r, sigma):
+    """
+    Black-Scholes期权理论价格的数组版本，参数按numpy规则广播
+    :param is_call: 是否为认购期权（bool数组）
+    :param underlying_price: 标的价格
+    :param strike_price: 行权价
+    :param t: 剩余时间（年化），小于等于0时返回内在价值
+    :param r: 无风险利率
+    :param sigma: 波动率
+    :return: 期权理论价格数组
+    """
+    from scipy.special import ndtr
+
+    is_call = np.asarray(is_call, dtype=bool)
+    s = np.asarray(underlying_price, dtype=float)
+    k = np.asarray(strike_price, dtype=float)
+    t = np.asarray(t, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
+    expired = t <= 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        safe_t = np.where(expired, 1.0, t)
+        vol = sigma * np.sqrt(safe_t)
+        d1 = (np.log(s / k) + (r + 0.5 * sigma**2) * safe_t) / vol
+        d2 = d1 - vol
+        discount = k * np.exp(-r * safe_t)
+        call = s * ndtr(d1) - discount * ndtr(d2)
+        put = discount * ndtr(-d2) - s * ndtr(-d1)
+    price = np.where(is_call, call, put)
+    intrinsic = np.where(is_call, np.maximum(s - k, 0), np.maximum(k - s, 0))
+    return np.where(expired, intrinsic, price)
+
+
 class OptionCombinationType(IntEnum):
     """期权交易策略枚举"""
 
@@ -133,14 +226,83 @@ class OptionCombinationType(IntEnum):
 
 
 class OptionContract:
-    """期权合约节点"""
+    """
+    期权合约节点
+    常用字段保存为类型化属性，完整的合约信息通过data按需从期权链的列数组生成
+    兼容原有用法，也可以直接传入合约信息字典：OptionContract(contract_data)
+    """
 
-    def __init__(self, contract_data: dict):
-        self.data = contract_data
-        self.instrument_id = contract_data["InstrumentID"]
-        self.strike_price = contract_data["OptExercisePrice"]
-        self.expire_date = contract_data["ExpireDate"]
-        self.option_type = contract_data["OptType"]  # 'CALL' 或 'PUT'
+    __slots__ = (
+        "instrument_id",
+        "strike_price",
+        "expire_date",
+        "option_type",
+        "exchange_id",
+        "underlying_code",
+        "underlying_market",
+        "volume_multiple",
+        "monthly",
+        "expire_day",
+        "underlying_symbol",
+        "index",
+        "prev_strike",
+        "next_strike",
+        "prev_expiry",
+        "next_expiry",
+        "counterpart",
+        "_columns",
+        "_row",
+        "_data",
+    )
+
+    def __init__(
+        self,
+        instrument_id: Union[str, dict],
+        strike_price: Optional[float] = None,
+        expire_date=None,
+        option_type: Optional[str] = None,
+        exchange_id: Optional[str] = None,
+        underlying_code: Optional[str] = None,
+        underlying_market: Optional[str] = None,
+        volume_multiple: Optional[int] = None,
+        monthly: Optional[int] = None,
+        columns: Optional[Dict[str, np.ndarray]] = None,
+        row: Optional[int] = None,
+        expire_day: Optional[date] = None,
+    ):
+        contract_data = None
+        if isinstance(instrument_id, dict):
+            contract_data = instrument_id
+            instrument_id = contract_data["InstrumentID"]
+            strike_price = contract_data["OptExercisePrice"]
+            expire_date = contract_data["ExpireDate"]
+            option_type = contract_data["OptType"]
+            exchange_id = contract_data.get("ExchangeID")
+            underlying_code = contract_data.get("OptUndlCode")
+            underlying_market = contract_data.get("OptUndlMarket")
+            volume_multiple = contract_data.get("VolumeMultiple")
+            monthly = contract_data.get("monthly")
+        self.instrument_id = instrument_id
+        self.strike_price = strike_price
+        self.expire_date = expire_date
+        self.option_type = option_type  # 'CALL' 或 'PUT'
+        self.exchange_id = exchange_id
+        self.underlying_code = underlying_code
+        self.underlying_market = underlying_market
+        self.volume_multiple = volume_multiple
+        self.monthly = monthly  # 到期月份的序号，0为最近月
+        # 解析后的到期日
+        self.expire_day = (
+            expire_day
+            if expire_day is not None
+            else pd.Timestamp(str(expire_date)).date()
+        )
+        # 标的代码.市场，全部合约共享同一个字符串对象
+        self.underlying_symbol = sys.intern(f"{underlying_code}.{underlying_market}")
+        self.index: Optional[int] = None  # 在MarketOptionChain.contracts中的位置
+        self._columns = columns  # 所属期权链的列数组
+        self._row = row  # 在列数组中的行号
+        self._data = contract_data
 
         # 链式结构指针
         self.prev_strike: Optional["OptionContract"] = None  # 前一个行权价合约
@@ -149,9 +311,31 @@ class OptionContract:
         self.next_expiry: Optional["OptionContract"] = None  # 后一个到期时间合约
         self.counterpart: Optional["OptionContract"] = None  # 对手合约
 
+    @classmethod
+    def from_dict(cls, contract_data: dict) -> "OptionContract":
+        """由合约信息字典创建合约，等同于OptionContract(contract_data)"""
+        return cls(contract_data)
+
+    @property
+    def data(self) -> dict:
+        """完整的合约信息（首次访问时生成），包含monthly键"""
+        if self._data is None:
+            data = {}
+            if self._columns is not None:
+                for name, values in self._columns.items():
+                    value = values[self._row]
+                    if isinstance(value, np.datetime64):
+                        value = pd.Timestamp(value)
+                    elif isinstance(value, np.generic):
+                        value = value.item()
+                    data[name] = value
+            data["monthly"] = self.monthly
+            self._data = data
+        return self._data
+
     @property
     def symbol(self):
-        return f"{self.instrument_id}.{self.data['ExchangeID']}"
+        return f"{self.instrument_id}.{self.exchange_id}"
 
     @property
     def is_call(self):
@@ -170,9 +354,20 @@ class MarketOptionChain:
         初始化市场期权链
         :param df: 包含所有期权合约信息的DataFrame
         """
-        self.df = df.copy()
+        self.df = df
         self.option_chains: Dict[str, Dict[str, "OptionChain"]] = {}
+        # 全市场合约索引：合约代码及"合约代码.交易所"均可直接查找
+        self.contract_index: Dict[str, OptionContract] = {}
+        # 全市场合约列表，与到期日及剩余天数数组按位置对齐
+        self.contracts: List[OptionContract] = []
+        self._expire_days = np.array([], dtype="datetime64[D]")
+        # (计算日期, 剩余自然日数组)
+        self._time_to_expiry = None
         self._build_chains()
+        self._expire_days = np.array(
+            [contract.expire_day for contract in self.contracts],
+            dtype="datetime64[D]",
+        )
 
     def _build_chains(self):
         """构建所有品种的期权链"""
@@ -199,6 +394,17 @@ class MarketOptionChain:
                     non_standard_df, underlying_code, "non_standard"
                 )
 
+            for option_chain in self.option_chains[underlying_code].values():
+                self._index_contracts(option_chain)
+
+    def _index_contracts(self, option_chain: "OptionChain"):
+        """将期权链中的合约加入全市场索引"""
+        for instrument_id, contract in option_chain.contracts.items():
+            self.contract_index[instrument_id] = contract
+            self.contract_index[contract.symbol] = contract
+            contract.index = len(self.contracts)
+            self.contracts.append(contract)
+
     def get_option_chain(
         self, underlying_code: str, chain_type: str = "standard"
     ) -> Optional["OptionChain"]:
@@ -217,15 +423,59 @@ class MarketOptionChain:
         return list(self.option_chains.keys())
 
     def get_contract_by_id(self, instrument_id: str) -> Optional[OptionContract]:
-        """根据合约代码获取合约对象"""
-        # 首先在各个品种的期权链中查找
-        for underlying_code in self.option_chains:
-            for chain_type in self.option_chains[underlying_code]:
-                option_chain = self.option_chains[underlying_code][chain_type]
-                contract = option_chain.get_contract(instrument_id)
-                if contract:
-                    return contract
-        return None
+        """根据合约代码（或"合约代码.交易所"）获取合约对象"""
+        return self.contract_index.get(instrument_id)
+
+    def time_to_expiry(self, today: Optional[date] = None) -> np.ndarray:
+        """
+        返回全部合约的剩余自然日数，与contracts按位置对齐，同一天只计算一次
+        到期日当天计为1天
+        :param today: 计算日期，默认为当天
+        """
+        today = np.datetime64(today or date.today(), "D")
+        cached = self._time_to_expiry
+        if cached is not None and cached[0] == today:
+            return cached[1]
+
+        calendar_days = (self._expire_days - today).astype(int) + 1
+        self._time_to_expiry = (today, calendar_days)
+        return calendar_days
+
+    def get_days_to_expiry(
+        self, contract: OptionContract, today: Optional[date] = None
+    ) -> int:
+        """
+        返回合约的剩余自然日数，到期日当天计为1天
+        合约不属于本期权链时（期权链已被后台刷新替换）按合约自身的到期日计算，
+        不会按位置读到其他合约的数据
+        """
+        i = contract.index
+        if i is not None and i < len(self.contracts) and self.contracts[i] is contract:
+            return int(self.time_to_expiry(today)[i])
+        return (contract.expire_day - (today or date.today())).days + 1
+
+
+def _parse_expire_dates(values: np.ndarray) -> np.ndarray:
+    """将到期日列（日期、整数或字符串，如20250625）解析为datetime64[D]数组"""
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[D]")
+    return pd.to_datetime(values.astype(str)).to_numpy().astype("datetime64[D]")
+
+
+def _expire_date_list(values: np.ndarray) -> list:
+    """到期日数组转为列表，日期类型的元素转为pd.Timestamp，与DataFrame中取出的值一致"""
+    if np.issubdtype(values.dtype, np.datetime64):
+        return list(pd.DatetimeIndex(values))
+    return values.tolist()
+
+
+def _group_starts(*keys) -> np.ndarray:
+    """返回已排序键数组中每个分组的起始位置"""
+    changed = np.zeros(len(keys[0]), dtype=bool)
+    changed[0] = True
+    for key in keys:
+        changed[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(changed)
 
 
 class OptionChain:
@@ -238,7 +488,10 @@ class OptionChain:
         :param underlying_code: 标的代码
         :param chain_type: 链类型 ('standard' 或 'non_standard')
         """
-        self.df = df.copy()
+        # 按列保存合约信息，合约对象通过行号引用
+        self.columns: Dict[str, np.ndarray] = {
+            name: df[name].to_numpy() for name in df.columns
+        }
         self.underlying_code = underlying_code
         self.chain_type = chain_type
 
@@ -251,109 +504,148 @@ class OptionChain:
             {}
         )  # (strike_price, option_type) -> contracts
 
+        # 查询用的有序索引
+        self._expire_dates: List = []  # 按时间排序的到期日
+        self._expiry_position: Dict = {}  # 到期日 -> monthly索引
+        self._strike_prices: List[float] = []  # 排序后的全部行权价
+        self._strike_arrays: Dict[Tuple[str, str], np.ndarray] = (
+            {}
+        )  # (expire_date, option_type) -> 与strike_chains对齐的行权价数组
+        self._expiry_strikes: Dict[str, np.ndarray] = {}  # 到期日 -> 去重后的行权价
+
         self._build_chain_structure()
 
+    @property
+    def df(self) -> pd.DataFrame:
+        """该品种的期权合约DataFrame"""
+        return pd.DataFrame(self.columns)
+
     def _build_chain_structure(self):
         """构建链式结构"""
-        # 获取所有到期日，按时间排序（用于计算monthly索引）
-        all_expire_dates = sorted(set(self.df["ExpireDate"]))
+        columns = self.columns
+        count = len(columns["InstrumentID"])
+        if count == 0:
+            return
+        rows = np.arange(count)
+        strikes = columns["OptExercisePrice"].astype(float)
+        option_types = columns["OptType"]
+        # 到期日按时间排序后的序号即为monthly索引
+        all_expire_dates, expiry_idx = np.unique(
+            columns["ExpireDate"], return_inverse=True
+        )
+        all_expire_dates = _expire_date_list(all_expire_dates)
+        expire_days = _parse_expire_dates(columns["ExpireDate"]).tolist()
+        _, type_idx = np.unique(option_types, return_inverse=True)
+        self._expire_dates = all_expire_dates
+        self._expiry_position = {
+            expire_date: i for i, expire_date in enumerate(all_expire_dates)
+        }
+        self._strike_prices = np.unique(strikes).tolist()
 
         # 1. 创建所有合约节点
-        for _, row in self.df.iterrows():
-            contract_data = row.to_dict()
-            # 添加monthly键，保存月度索引号
-            expire_date = contract_data["ExpireDate"]
-            contract_data["monthly"] = all_expire_dates.index(expire_date)
-            contract = OptionContract(contract_data)
+        contracts = []
+        fields = zip(
+            columns["InstrumentID"].tolist(),
+            strikes.tolist(),
+            _expire_date_list(columns["ExpireDate"]),
+            option_types.tolist(),
+            columns["ExchangeID"].tolist(),
+            columns["OptUndlCode"].tolist(),
+            columns["OptUndlMarket"].tolist(),
+            columns["VolumeMultiple"].astype(int).tolist(),
+            expiry_idx.tolist(),
+        )
+        for row, values in enumerate(fields):
+            contract = OptionContract(
+                *values, columns=columns, row=row, expire_day=expire_days[row]
+            )
+            contracts.append(contract)
             self.contracts[contract.instrument_id] = contract
-
-        # 2. 按到期日和期权类型分组，构建行权价链
-        grouped_by_expiry = self.df.groupby(["ExpireDate", "OptType"])
-        for (expire_date, option_type), group_df in grouped_by_expiry:
-            # 按行权价排序
-            sorted_contracts = []
-            for _, row in group_df.sort_values("OptExercisePrice").iterrows():
-                contract = self.contracts[row["InstrumentID"]]
-                sorted_contracts.append(contract)
-
-            self.strike_chains[(expire_date, option_type)] = sorted_contracts
-
+        # 同一合约代码重复出现时，以最后一个为准
+        contracts = [self.contracts[contract.instrument_id] for contract in contracts]
+
+        # 2. 按到期日、期权类型、行权价排序，构建行权价链
+        order = np.lexsort((rows, strikes, type_idx, expiry_idx))
+        starts = _group_starts(expiry_idx[order], type_idx[order])
+        for group in np.split(order, starts[1:]):
+            sorted_contracts = [contracts[i] for i in group.tolist()]
+            first = sorted_contracts[0]
+            self.strike_chains[(first.expire_date, first.option_type)] = (
+                sorted_contracts
+            )
+            self._strike_arrays[(first.expire_date, first.option_type)] = strikes[
+                group
+            ]
             # 建立行权价链的前后关系
-            for i in range(len(sorted_contracts)):
-                if i > 0:
-                    sorted_contracts[i].prev_strike = sorted_contracts[i - 1]
-                if i < len(sorted_contracts) - 1:
-                    sorted_contracts[i].next_strike = sorted_contracts[i + 1]
-
-        # 3. 构建到期时间链 - 修改后的逻辑，只连接紧邻月份的合约
-        # 获取所有到期日，按时间排序
-        all_expire_dates = sorted(set(self.df["ExpireDate"]))
-
-        # 为每个行权价和期权类型组合创建到期日映射
-        grouped_by_strike = self.df.groupby(["OptExercisePrice", "OptType"])
-        for (strike_price, option_type), group_df in grouped_by_strike:
-            # 创建到期日到合约的映射
-            expire_to_contract = {}
-            for _, row in group_df.iterrows():
-                contract = self.contracts[row["InstrumentID"]]
-                expire_to_contract[contract.expire_date] = contract
-
-            # 按到期日排序存储（只存储实际存在的合约）
-            sorted_contracts = []
-            for expire_date in all_expire_dates:
-                if expire_date in expire_to_contract:
-                    sorted_contracts.append(expire_to_contract[expire_date])
-
-            self.expiry_chains[(strike_price, option_type)] = sorted_contracts
-
-            # 建立到期时间链的前后关系 - 只连接紧邻的合约
-            for expire_date in all_expire_dates:
-                if expire_date not in expire_to_contract:
-                    continue
-
-                current_contract = expire_to_contract[expire_date]
-                current_idx = all_expire_dates.index(expire_date)
-
-                # 查找紧接着的前一个到期日的合约
-                if current_idx > 0:
-                    prev_expire_date = all_expire_dates[current_idx - 1]
-                    if prev_expire_date in expire_to_contract:
-                        current_contract.prev_expiry = expire_to_contract[
-                            prev_expire_date
-                        ]
-
-                # 查找紧接着的下一个到期日的合约
-                if current_idx < len(all_expire_dates) - 1:
-                    next_expire_date = all_expire_dates[current_idx + 1]
-                    if next_expire_date in expire_to_contract:
-                        current_contract.next_expiry = expire_to_contract[
-                            next_expire_date
-                        ]
+            for prev, current in zip(sorted_contracts, sorted_contracts[1:]):
+                current.prev_strike = prev
+                prev.next_strike = current
+
+        # 3. 按行权价、期权类型、到期日排序，构建到期时间链
+        order = np.lexsort((rows, expiry_idx, type_idx, strikes))
+        # 同一行权价、类型和到期日有多个合约时只保留最后一个
+        sorted_expiry = expiry_idx[order]
+        sorted_strikes = strikes[order]
+        sorted_types = type_idx[order]
+        keep = np.ones(count, dtype=bool)
+        keep[:-1] = (
+            (sorted_expiry[1:] != sorted_expiry[:-1])
+            | (sorted_strikes[1:] != sorted_strikes[:-1])
+            | (sorted_types[1:] != sorted_types[:-1])
+        )
+        order = order[keep]
+        starts = _group_starts(strikes[order], type_idx[order])
+        for group in np.split(order, starts[1:]):
+            sorted_contracts = [contracts[i] for i in group.tolist()]
+            first = sorted_contracts[0]
+            self.expiry_chains[(first.strike_price, first.option_type)] = (
+                sorted_contracts
+            )
+            # 建立到期时间链的前后关系 - 只连接紧邻月份的合约
+            group_expiry = expiry_idx[group]
+            adjacent = np.flatnonzero(np.diff(group_expiry) == 1).tolist()
+            for i in adjacent:
+                sorted_contracts[i + 1].prev_expiry = sorted_contracts[i]
+                sorted_contracts[i].next_expiry = sorted_contracts[i + 1]
+
+        for expire_date, monthly in self._expiry_position.items():
+            self._expiry_strikes[expire_date] = np.unique(
+                strikes[expiry_idx == monthly]
+            )
 
         # 4. 建立对手合约关系
-        self._build_counterpart_relationships()
+        self._build_counterpart_relationships(contracts, strikes, expiry_idx)
 
-    def _build_counterpart_relationships(self):
+    def _build_counterpart_relationships(self, contracts, strikes, expiry_idx):
         """建立对手合约（CALL-PUT）关系"""
-        # 按到期日和行权价分组
-        grouped = self.df.groupby(["ExpireDate", "OptExercisePrice"])
-
-        for (expire_date, strike_price), group_df in grouped:
-            call_contracts = []
-            put_contracts = []
-
-            for _, row in group_df.iterrows():
-                contract = self.contracts[row["InstrumentID"]]
-                if row["OptType"] == "CALL":
-                    call_contracts.append(contract)
-                elif row["OptType"] == "PUT":
-                    put_contracts.append(contract)
-
-            # 建立CALL和PUT的对手关系
-            for call_contract in call_contracts:
-                for put_contract in put_contracts:
-                    call_contract.counterpart = put_contract
-                    put_contract.counterpart = call_contract
+        # 按到期日和行权价分组，组内保持原有顺序
+        count = len(contracts)
+        order = np.lexsort((np.arange(count), strikes, expiry_idx))
+        starts = _group_starts(expiry_idx[order], strikes[order])
+        option_types = self.columns["OptType"][order]
+        positions = np.arange(count)
+
+        # 每组中最后一个CALL和最后一个PUT的位置，不存在时为-1
+        last_call = np.maximum.reduceat(
+            np.where(option_types == "CALL", positions, -1), starts
+        )
+        last_put = np.maximum.reduceat(
+            np.where(option_types == "PUT", positions, -1), starts
+        )
+        group_sizes = np.diff(np.append(starts, count))
+        call_match = np.repeat(last_put, group_sizes)
+        put_match = np.repeat(last_call, group_sizes)
+
+        # 建立CALL和PUT的对手关系
+        for position, row in enumerate(order.tolist()):
+            if option_types[position] == "CALL":
+                match = call_match[position]
+            elif option_types[position] == "PUT":
+                match = put_match[position]
+            else:
+                continue
+            if match >= 0:
+                contracts[row].counterpart = contracts[order[match]]
 
     def get_contract(self, instrument_id: str) -> Optional[OptionContract]:
         """根据合约代码获取合约"""
@@ -383,51 +675,162 @@ class OptionChain:
             put_contracts = self.expiry_chains.get((strike_price, "PUT"), [])
             return call_contracts + put_contracts
 
+    def get_atm_strike(
+        self, underlying_price: float, expire_date: str = None
+    ) -> Optional[float]:
+        """获取最接近标的价格的行权价，距离相同时取较低的行权价"""
+        if expire_date is None:
+            expire_date = self.get_expire_date(0)
+        strikes = self._expiry_strikes.get(expire_date)
+        if strikes is None or len(strikes) == 0:
+            return None
+        i = int(np.searchsorted(strikes, underlying_price))
+        if i == 0:
+            return strikes[0].item()
+        if i == len(strikes):
+            return strikes[-1].item()
+        lower, upper = strikes[i - 1], strikes[i]
+        if underlying_price - lower <= upper - underlying_price:
+            return lower.item()
+        return upper.item()
+
+    def get_contract_by_strike(
+        self, expire_date: str, option_type: str, strike_price: float
+    ) -> Optional[OptionContract]:
+        """获取指定到期日、期权类型和行权价的合约"""
+        strikes = self._strike_arrays.get((expire_date, option_type))
+        if strikes is None:
+            return None
+        i = int(np.searchsorted(strikes, strike_price, side="right")) - 1
+        if i < 0 or strikes[i] != strike_price:
+            return None
+        return self.strike_chains[(expire_date, option_type)][i]
+
     def get_atm_contracts(
         self, underlying_price: float, expire_date: str = None
     ) -> Dict[str, OptionContract]:
         """获取平值期权合约"""
         # 如果没有指定到期日，选择最近的到期日
         if expire_date is None:
-            expire_dates = sorted(set(self.df["ExpireDate"]))
-            if expire_dates:
-                expire_date = expire_dates[0]
-            else:
+            expire_date = self.get_expire_date(0)
+            if expire_date is None:
                 return {}
 
         # 找到最接近标的价格的行权价
-        strikes = sorted(
-            set(self.df[self.df["ExpireDate"] == expire_date]["OptExercisePrice"])
-        )
-        if not strikes:
+        atm_strike = self.get_atm_strike(underlying_price, expire_date)
+        if atm_strike is None:
             return {}
 
-        atm_strike = min(strikes, key=lambda x: abs(x - underlying_price))
-
         # 返回该行权价的CALL和PUT合约
         result = {}
-        call_contracts = self.get_contracts_by_strike(atm_strike, "CALL")
-        put_contracts = self.get_contracts_by_strike(atm_strike, "PUT")
-
-        for contract in call_contracts:
-            if contract.expire_date == expire_date:
-                result["CALL"] = contract
-                break
+        for option_type in ("CALL", "PUT"):
+            contract = self.get_contract_by_strike(expire_date, option_type, atm_strike)
+            if contract is not None:
+                result[option_type] = contract
+        return result
 
-        for contract in put_contracts:
-            if contract.expire_date == expire_date:
-                result["PUT"] = contract
-                break
+    def get_nearest_contracts(
+        self,
+        underlying_price: float,
+        expire_date: str,
+        option_type: str,
+        count: int = 1,
+    ) -> List[OptionContract]:
+        """
+        获取行权价最接近标的价格的count个合约
+        :return: 按行权价升序排列的合约列表
+        """
+        strikes = self._strike_arrays.get((expire_date, option_type))
+        if strikes is None or count <= 0:
+            return []
+        # 从插入位置向两侧扩展，距离相同时优先取较低的行权价
+        right = int(np.searchsorted(strikes, underlying_price))
+        left = right
+        while right - left < count and (left > 0 or right < len(strikes)):
+            if left == 0:
+                right += 1
+            elif right == len(strikes):
+                left -= 1
+            elif (
+                underlying_price - strikes[left - 1]
+                <= strikes[right] - underlying_price
+            ):
+                left -= 1
+            else:
+                right += 1
+        return self.strike_chains[(expire_date, option_type)][left:right]
+
+    def get_contracts_by_strike_range(
+        self,
+        expire_date: str,
+        option_type: str,
+        min_strike: float = None,
+        max_strike: float = None,
+    ) -> List[OptionContract]:
+        """
+        获取行权价在[min_strike, max_strike]区间内的合约
+        :return: 按行权价升序排列的合约列表
+        """
+        strikes = self._strike_arrays.get((expire_date, option_type))
+        if strikes is None:
+            return []
+        left = 0 if min_strike is None else np.searchsorted(strikes, min_strike)
+        right = (
+            len(strikes)
+            if max_strike is None
+            else np.searchsorted(strikes, max_strike, side="right")
+        )
+        return self.strike_chains[(expire_date, option_type)][int(left) : int(right)]
+
+    def get_contracts_by_moneyness(
+        self,
+        underlying_price: float,
+        moneyness_range,
+        expire_date: str,
+        option_type: str,
+    ) -> List[OptionContract]:
+        """
+        获取价值度在[min, max]区间内的合约
+        认购价值度 = 标的价格 / 行权价，认沽价值度 = 行权价 / 标的价格
+        :return: 按行权价升序排列的合约列表
+        """
+        strikes = self._strike_arrays.get((expire_date, option_type))
+        if strikes is None or underlying_price <= 0:
+            return []
+        low, high = moneyness_range
+        if option_type == "CALL":
+            min_strike = underlying_price / high if high > 0 else 0.0
+            max_strike = underlying_price / low if low > 0 else np.inf
+        else:
+            min_strike, max_strike = low * underlying_price, high * underlying_price
+        # 边界各放宽一个位置，再按原始公式精确过滤，避免浮点误差
+        left = max(int(np.searchsorted(strikes, min_strike)) - 1, 0)
+        right = int(np.searchsorted(strikes, max_strike, side="right")) + 1
+        band = strikes[left:right]
+        if option_type == "CALL":
+            moneyness = underlying_price / band
+        else:
+            moneyness = band / underlying_price
+        mask = (moneyness >= low) & (moneyness <= high)
+        contracts = self.strike_chains[(expire_date, option_type)][left:right]
+        return [contract for contract, ok in zip(contracts, mask.tolist()) if ok]
 
-        return result
+    def get_expire_date(self, monthly: int):
+        """
+        根据月度索引获取到期日，负数索引从最远月倒数（-1为最远月）
+        索引越界时返回None
+        """
+        if -len(self._expire_dates) <= monthly < len(self._expire_dates):
+            return self._expire_dates[monthly]
+        return None
 
     def get_all_expire_dates(self) -> List[str]:
         """获取所有到期日"""
-        return sorted(set(self.df["ExpireDate"]))
+        return list(self._expire_dates)
 
     def get_all_strike_prices(self) -> List[float]:
         """获取所有行权价"""
-        return sorted(set(self.df["OptExercisePrice"]))
+        return list(self._strike_prices)
 
     def get_next_month_contract(
         self, contract: OptionContract
@@ -437,9 +840,9 @@ class OptionChain:
         :param contract: 当前合约
         :return: 下一个月份的对应合约，如果不存在则返回None
         """
-        all_expire_dates = self.get_all_expire_dates()
+        all_expire_dates = self._expire_dates
         try:
-            current_idx = all_expire_dates.index(contract.expire_date)
+            current_idx = self._expiry_position[contract.expire_date]
             if current_idx < len(all_expire_dates) - 1:
                 next_expire_date = all_expire_dates[current_idx + 1]
                 # 查找同一行权价和期权类型的下一个月份合约
@@ -450,7 +853,7 @@ class OptionChain:
                     if next_contract.strike_price == contract.strike_price:
                         return next_contract
             return None
-        except ValueError:
+        except KeyError:
             return None
 
     def get_prev_month_contract(
@@ -461,9 +864,9 @@ class OptionChain:
         :param contract: 当前合约
         :return: 上一个月份的对应合约，如果不存在则返回None
         """
-        all_expire_dates = self.get_all_expire_dates()
+        all_expire_dates = self._expire_dates
         try:
-            current_idx = all_expire_dates.index(contract.expire_date)
+            current_idx = self._expiry_position[contract.expire_date]
             if current_idx > 0:
                 prev_expire_date = all_expire_dates[current_idx - 1]
                 # 查找同一行权价和期权类型的上一个月份合约
@@ -474,7 +877,7 @@ class OptionChain:
                     if prev_contract.strike_price == contract.strike_price:
                         return prev_contract
             return None
-        except ValueError:
+        except KeyError:
             return None
 
 
@@ -561,7 +964,7 @@ if __name__ == "__main__":
     sample_contract = market_chain.get_contract_by_id("90004697")  # 假设的合约代码
     if sample_contract:
         print(f"\n合约信息: {sample_contract.instrument_id}")
-        print(f"标的代码: {sample_contract.data['OptUndlCode']}")
+        print(f"标的代码: {sample_contract.underlying_code}")
         print(f"行权价: {sample_contract.strike_price}")
         print(f"到期日: {sample_contract.expire_date}")
         print(f"期权类型: {sample_contract.option_type}")
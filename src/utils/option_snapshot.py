@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .logger import log
+
+# 期权合约快照目录，每个合约表日期一个子目录，每列一个.npy文件
+SNAPSHOT_DIR = Path(__file__).parent.parent / "data" / "option_chain"
+# 保留的快照数量
+KEEP_SNAPSHOTS = 3
+
+
+def snapshot_key(date) -> str:
+    """合约表日期对应的快照名称，例如20250606"""
+    return pd.Timestamp(date).strftime("%Y%m%d")
+
+
+def save_option_snapshot(df: pd.DataFrame, date, snapshot_dir=SNAPSHOT_DIR):
+    """
+    将期权合约表按列保存为快照
+    字符串列保存为定长字符串数组以便内存映射，先写临时目录再原子重命名
+    :param df: 期权合约表
+    :param date: 合约表日期
+    """
+    snapshot_dir = Path(snapshot_dir)
+    key = snapshot_key(date)
+    target = snapshot_dir / key
+    if target.exists():
+        return
+    tmp = snapshot_dir / f".{key}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    meta = {"columns": [], "pickled": []}
+    for i, name in enumerate(df.columns):
+        values = df[name].to_numpy()
+        pickled = False
+        if values.dtype == object:
+            if all(isinstance(value, str) for value in values):
+                values = values.astype(str)
+            else:
+                # 混合类型的列无法内存映射，只能序列化保存
+                pickled = True
+                meta["pickled"].append(i)
+        np.save(tmp / f"{i}.npy", values, allow_pickle=pickled)
+        meta["columns"].append(str(name))
+    with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # 其他进程已经写入了同一日期的快照
+        shutil.rmtree(tmp, ignore_errors=True)
+        return
+    _remove_old_snapshots(snapshot_dir)
+
+
+def load_option_snapshot(
+    date, snapshot_dir=SNAPSHOT_DIR, copy_columns: Iterable[str] = ()
+) -> Optional[pd.DataFrame]:
+    """
+    以内存映射方式加载指定日期的期权合约快照
+    映射的列是只读的，原地修改会抛出ValueError，需要修改的列通过copy_columns读入内存
+    :param date: 合约表日期
+    :param copy_columns: 读入内存、可以原地修改的列名
+    :return: 期权合约表，快照不存在或损坏时返回None
+    """
+    path = Path(snapshot_dir) / snapshot_key(date)
+    meta_path = path / "meta.json"
+    if not meta_path.exists():
+        return None
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        copy_columns = set(copy_columns)
+        columns = {}
+        for i, name in enumerate(meta["columns"]):
+            if i in meta["pickled"]:
+                columns[name] = np.load(path / f"{i}.npy", allow_pickle=True)
+            elif name in copy_columns:
+                columns[name] = np.load(path / f"{i}.npy")
+            else:
+                # 转为普通ndarray视图，仍然映射文件但不把memmap子类带入DataFrame
+                columns[name] = np.asarray(np.load(path / f"{i}.npy", mmap_mode="r"))
+        return pd.DataFrame(columns, copy=False)
+    except Exception as e:
+        log(f"加载期权合约快照 {path} 失败: {str(e)}", "error")
+        return None
+
+
+def _remove_old_snapshots(snapshot_dir: Path):
+    """只保留最近的KEEP_SNAPSHOTS个快照"""
+    snapshots = sorted(
+        p for p in snapshot_dir.iterdir() if p.is_dir() and not p.name.startswith(".")
+    )
+    for path in snapshots[:-KEEP_SNAPSHOTS]:
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,230 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .logger import log, logs_dir
+
+# 订单生命周期的各个阶段，按发生顺序排列
+STAGES = ("signal", "command_created", "pb_ack", "deal_received", "deal_processed")
+
+STAGE_SECONDS = metrics.histogram(
+    "botgo_order_stage_seconds",
+    "订单从上一阶段到本阶段的耗时（秒）",
+    ["strategy_id", "stage"],
+)
+
+
+def trace_id_from_remark(remark) -> Optional[str]:
+    """
+    从userOrderId/成交备注中取出追踪ID，格式为 strategy_id|uuid|...
+    :return: 追踪ID，备注格式不符时返回None
+    """
+    if not remark:
+        return None
+    info = remark.split("|")
+    if len(info) < 2 or info[1] == "":
+        return None
+    return info[1]
+
+
+class OrderTrace:
+    """单个指令的各阶段时间戳（time.time()），同一阶段只记录第一次"""
+
+    __slots__ = ("trace_id", "strategy_id", "instrument_id", "times", "deals")
+
+    def __init__(self, trace_id, strategy_id, instrument_id):
+        self.trace_id = trace_id
+        self.strategy_id = strategy_id
+        self.instrument_id = instrument_id
+        self.times: Dict[str, float] = {}
+        self.deals = 0  # 收到的成交笔数，部分成交时大于1
+
+    def latencies(self) -> Dict[str, float]:
+        """相邻已记录阶段之间的耗时（毫秒），键为后一阶段"""
+        result = {}
+        previous = None
+        for stage in STAGES:
+            timestamp = self.times.get(stage)
+            if timestamp is None:
+                continue
+            if previous is not None:
+                result[stage] = (timestamp - previous) * 1000
+            previous = timestamp
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "strategy_id": self.strategy_id,
+            "instrument_id": self.instrument_id,
+            "deals": self.deals,
+            "times": dict(self.times),
+            "latency_ms": self.latencies(),
+        }
+
+
+class OrderTraceStore:
+    """
+    订单链路追踪，以userOrderId中的uuid为追踪ID
+    记录信号、指令创建、PocketBase写入确认、收到成交、成交处理完成的时间，
+    只保留最近max_traces条，超出后淘汰最早的记录
+    """
+
+    def __init__(self, max_traces: int = 10000):
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, OrderTrace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(
+        self,
+        trace_id,
+        strategy_id,
+        instrument_id,
+        signal_time: Optional[float] = None,
+    ) -> OrderTrace:
+        """
+        新建追踪并记录signal和command_created阶段
+        :param signal_time: 产生信号的时间，为None时与指令创建时间相同
+        """
+        now = time.time()
+        trace = OrderTrace(trace_id, strategy_id, instrument_id)
+        trace.times["signal"] = signal_time if signal_time is not None else now
+        trace.times["command_created"] = now
+        with self._lock:
+            self._traces[trace_id] = trace
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        self._observe(trace, "command_created")
+        return trace
+
+    def mark(self, trace_id, stage, timestamp: Optional[float] = None):
+        """
+        记录阶段时间，未知的追踪ID（例如重启前下的单）直接忽略
+        :return: 对应的OrderTrace，未找到时返回None
+        """
+        if trace_id is None:
+            return None
+        if stage not in STAGES:
+            raise ValueError(f"未知的订单阶段: {stage}")
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                return None
+            if stage == "deal_received":
+                trace.deals += 1
+            if stage in trace.times:
+                return trace
+            trace.times[stage] = timestamp if timestamp is not None else time.time()
+        self._observe(trace, stage)
+        return trace
+
+    @staticmethod
+    def _observe(trace, stage):
+        latency = trace.latencies().get(stage)
+        if latency is not None:
+            STAGE_SECONDS.observe(
+                latency / 1000, strategy_id=trace.strategy_id, stage=stage
+            )
+
+    def get(self, trace_id) -> Optional[OrderTrace]:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def __len__(self):
+        return len(self._traces)
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+    def to_frame(self) -> pd.DataFrame:
+        """每个追踪一行，各阶段列为与上一已记录阶段的耗时（毫秒）"""
+        with self._lock:
+            traces = list(self._traces.values())
+        rows = []
+        for trace in traces:
+            row = {
+                "trace_id": trace.trace_id,
+                "strategy_id": trace.strategy_id,
+                "instrument_id": trace.instrument_id,
+                "deals": trace.deals,
+            }
+            row.update(trace.latencies())
+            times = trace.times.values()
+            row["total"] = (max(times) - min(times)) * 1000
+            rows.append(row)
+        columns = ["trace_id", "strategy_id", "instrument_id", "deals"]
+        columns += list(STAGES[1:]) + ["total"]
+        return pd.DataFrame(rows, columns=columns)
+
+    def summary(self, by="strategy_id") -> pd.DataFrame:
+        """
+        按策略或合约汇总各阶段耗时（毫秒）
+        :param by: strategy_id或instrument_id，也可以是二者组成的列表
+        :return: 行为(分组, 阶段)，列为count/mean/p50/p90/p99/max
+        """
+        frame = self.to_frame()
+        keys = [by] if isinstance(by, str) else list(by)
+        stages = list(STAGES[1:]) + ["total"]
+        long = frame.melt(
+            id_vars=keys, value_vars=stages, var_name="stage", value_name="ms"
+        ).dropna(subset=["ms"])
+        grouped = long.groupby(keys + ["stage"], sort=False)["ms"]
+        result = grouped.agg(
+            count="count",
+            mean="mean",
+            p50=lambda x: np.percentile(x, 50),
+            p90=lambda x: np.percentile(x, 90),
+            p99=lambda x: np.percentile(x, 99),
+            max="max",
+        )
+        order = {stage: i for i, stage in enumerate(stages)}
+        return result.sort_index(
+            key=lambda index: (index.map(order) if index.name == "stage" else index)
+        )
+
+    def dump(self, path=None) -> str:
+        """
+        将全部追踪记录写入JSON文件
+        :param path: 文件路径，默认为logs/order_traces_时间.json
+        :return: 写入的文件路径
+        """
+        if path is None:
+            name = f"order_traces_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            path = os.path.join(logs_dir, name)
+        with self._lock:
+            data = [trace.to_dict() for trace in self._traces.values()]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        log(f"已导出 {len(data)} 条订单链路记录: {path}")
+        return path
+
+
+# 进程内共享的订单链路追踪
+order_traces = OrderTraceStore()
+
+
+def _traces_endpoint(params):
+    """GET /traces?by=instrument_id 查看耗时汇总"""
+    by = params.get("by", "strategy_id").split(",")
+    for key in by:
+        if key not in ("strategy_id", "instrument_id"):
+            raise ValueError("by只能是 strategy_id/instrument_id")
+    return order_traces.summary(by).to_string() + "\n"
+
+
+def _traces_dump_endpoint(params):
+    """POST /traces/dump 将追踪明细导出到logs目录，返回文件路径"""
+    return order_traces.dump() + "\n"
+
+
+metrics.register_endpoint("/traces", _traces_endpoint)
+metrics.register_endpoint("/traces/dump", _traces_dump_endpoint, method="POST")
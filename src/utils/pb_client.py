@@ -1,11 +1,30 @@
+import threading
+
 from pocketbase import PocketBase
 from .config import load_pocketbase_config
 
+# POCKETBASE_URL以memory://开头时使用进程内的PocketBase替身，同一进程共享一个实例
+MEMORY_SCHEME = "memory://"
+_memory_client = None
+_memory_lock = threading.Lock()
+
 
 def get_pb_client():
     config = load_pocketbase_config()
+    if (config["POCKETBASE_URL"] or "").startswith(MEMORY_SCHEME):
+        return _get_memory_client()
     client = PocketBase(config["POCKETBASE_URL"])
     client.admins.auth_with_password(
         config["SUPERUSER_EMAIL"], config["SUPERUSER_PASSWORD"]
     )
     return client
+
+
+def _get_memory_client():
+    global _memory_client
+    with _memory_lock:
+        if _memory_client is None:
+            from .memory_pocketbase import MemoryPocketBase
+
+            _memory_client = MemoryPocketBase()
+        return _memory_client
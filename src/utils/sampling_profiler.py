@@ -0,0 +1,153 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+from .logger import log, logs_dir
+
+
+def thread_cpu_time(thread: threading.Thread) -> Optional[float]:
+    """
+    返回线程已使用的CPU时间（秒），可在其他线程中调用
+    :return: 线程未启动、已结束或平台不支持时返回None
+    """
+    if thread is None or thread.ident is None or not thread.is_alive():
+        return None
+    try:
+        clock_id = time.pthread_getcpuclockid(thread.ident)
+        return time.clock_gettime(clock_id)
+    except (AttributeError, OSError):
+        return None
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    低开销的采样分析器
+    定时通过sys._current_frames()读取目标线程的调用栈，不需要在目标线程中插桩，
+    结束后按collapsed stack格式写文件，可直接用flamegraph.pl或speedscope查看
+    """
+
+    def __init__(
+        self,
+        threads: Dict[str, threading.Thread],
+        duration: float = 30,
+        interval: float = 0.01,
+        output: Optional[str] = None,
+        name: str = "profile",
+        cpu_only: bool = True,
+    ):
+        """
+        :param threads: 采样的线程，名称 -> 线程，名称作为调用栈的根节点
+        :param duration: 采样时长（秒）
+        :param interval: 采样间隔（秒）
+        :param output: 输出文件路径，默认为logs/{name}_时间.folded
+        :param name: 分析任务名称，用于日志和默认文件名
+        :param cpu_only: 只记录两次采样间消耗了CPU的线程，忽略阻塞在队列上的空闲线程
+        """
+        self.threads = threads
+        self.duration = duration
+        self.interval = interval
+        self.name = name
+        self.cpu_only = cpu_only
+        if output is None:
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output = os.path.join(logs_dir, f"{name}_{stamp}.folded")
+        self.output = output
+        self.stacks = Counter()
+        self.samples = 0
+        self.cpu_seconds = None  # 采样期间目标线程的CPU时间合计
+        self._last_cpu: Dict[str, float] = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(
+            target=self._run, name=f"profiler-{self.name}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """提前结束采样，已采集的结果照常写入文件"""
+        self._stop_event.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _cpu_time(self):
+        times = [thread_cpu_time(thread) for thread in self.threads.values()]
+        times = [t for t in times if t is not None]
+        return sum(times) if times else None
+
+    def sample(self):
+        """采集一次目标线程的调用栈"""
+        frames = sys._current_frames()
+        for name, thread in self.threads.items():
+            if thread is None or thread.ident is None:
+                continue
+            frame = frames.get(thread.ident)
+            if frame is None:
+                continue
+            if self.cpu_only:
+                cpu = thread_cpu_time(thread)
+                last = self._last_cpu.get(name)
+                if cpu is not None:
+                    self._last_cpu[name] = cpu
+                    if last is None or cpu <= last:
+                        continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(name)
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        cpu_start = self._cpu_time()
+        start = time.monotonic()
+        deadline = start + self.duration
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            self.sample()
+            self._stop_event.wait(self.interval)
+        cpu_end = self._cpu_time()
+        if cpu_start is not None and cpu_end is not None:
+            self.cpu_seconds = cpu_end - cpu_start
+        elapsed = time.monotonic() - start
+        try:
+            self.write()
+        except OSError as e:
+            log(f"写入采样结果失败 {self.output}: {str(e)}", "error")
+            return
+        cpu = f"{self.cpu_seconds:.3f}s" if self.cpu_seconds is not None else "未知"
+        log(
+            f"采样分析 {self.name} 完成: {self.samples} 次采样，耗时 {elapsed:.1f}s，"
+            f"CPU {cpu}，结果已写入 {self.output}"
+        )
+
+    def write(self, path=None):
+        """按collapsed stack格式写文件，每行为 '根;...;栈顶 次数'"""
+        path = path or self.output
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
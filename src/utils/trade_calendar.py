@@ -1,35 +1,234 @@
-import akshare as ak
+import argparse
+import threading
+import numpy as np
 import pandas as pd
 from datetime import datetime, date, timedelta
 from pathlib import Path
+from typing import Optional
+
+from .logger import log
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+# 可读的交易日历，由refresh_trade_calendar生成
+CALENDAR_CSV_PATH = DATA_DIR / "trade_calendar.csv"
+# 随代码发布的二进制交易日历，由CSV生成
+CALENDAR_BINARY_PATH = DATA_DIR / "trade_calendar.npz"
+# 二进制交易日历的格式版本，格式变化时递增
+CALENDAR_FORMAT_VERSION = 1
+# 交易日历的起始日期
+CALENDAR_START = date(2025, 1, 1)
+# 交易所公布的休市安排中落在周一至周五的日期，无法联网时用于推算交易日
+# 来源：上交所/深交所年度休市安排，每年12月公布次年安排后补充
+EXCHANGE_HOLIDAYS = {
+    2025: [
+        "2025-01-01",
+        "2025-01-28",
+        "2025-01-29",
+        "2025-01-30",
+        "2025-01-31",
+        "2025-02-03",
+        "2025-02-04",
+        "2025-04-04",
+        "2025-05-01",
+        "2025-05-02",
+        "2025-05-05",
+        "2025-06-02",
+        "2025-10-01",
+        "2025-10-02",
+        "2025-10-03",
+        "2025-10-06",
+        "2025-10-07",
+        "2025-10-08",
+    ],
+    2026: [
+        "2026-01-01",
+        "2026-01-02",
+        "2026-02-16",
+        "2026-02-17",
+        "2026-02-18",
+        "2026-02-19",
+        "2026-02-20",
+        "2026-02-23",
+        "2026-04-06",
+        "2026-05-01",
+        "2026-05-04",
+        "2026-05-05",
+        "2026-06-19",
+        "2026-09-25",
+        "2026-10-01",
+        "2026-10-02",
+        "2026-10-05",
+        "2026-10-06",
+        "2026-10-07",
+    ],
+}
+# 交易日历的列
+CALENDAR_COLUMNS = [
+    "trade_date",
+    "expired_date",
+    "next_month_expired_index",
+    "month_trade_days",
+    "group",
+    "day_index_in_month",
+]
+
+
+def _to_date(value) -> date:
+    """将date/datetime/Timestamp/字符串等统一转为date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def _to_day_array(values) -> np.ndarray:
+    """将日期数组统一转为datetime64[D]数组"""
+    return pd.to_datetime(np.asarray(values).ravel()).to_numpy().astype(
+        "datetime64[D]"
+    )
+
+
+def save_calendar_binary(dates: pd.DataFrame, path=CALENDAR_BINARY_PATH):
+    """将交易日历保存为二进制格式"""
+    arrays = {
+        name: dates[name].to_numpy()
+        for name in CALENDAR_COLUMNS
+        if name != "trade_date"
+    }
+    np.savez_compressed(
+        path,
+        version=np.array(CALENDAR_FORMAT_VERSION),
+        trade_date=dates["trade_date"].to_numpy().astype("datetime64[D]"),
+        **arrays,
+    )
+
+
+def load_calendar_binary(path=CALENDAR_BINARY_PATH) -> Optional[pd.DataFrame]:
+    """读取二进制交易日历，文件不存在或版本不符时返回None"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        if data["version"].item() != CALENDAR_FORMAT_VERSION:
+            return None
+        columns = {name: data[name] for name in CALENDAR_COLUMNS}
+    columns["trade_date"] = columns["trade_date"].astype("datetime64[ns]")
+    return pd.DataFrame(columns)
+
+
+def load_calendar_csv(path=CALENDAR_CSV_PATH) -> Optional[pd.DataFrame]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    dates = pd.read_csv(path)
+    dates["trade_date"] = pd.to_datetime(dates["trade_date"])
+    return dates
 
 
 class TradeCalendar:
 
-    def __init__(self):
-        self.trade_calendar_path = (
-            Path(__file__).parent.parent / "data" / "trade_calendar.csv"
+    def __init__(self, trade_dates: Optional[pd.DataFrame] = None):
+        """
+        :param trade_dates: 交易日历，默认读取随代码发布的交易日历，不访问网络
+        """
+        if trade_dates is None:
+            trade_dates = load_calendar_binary()
+        if trade_dates is None:
+            trade_dates = load_calendar_csv()
+        if trade_dates is None:
+            raise FileNotFoundError(
+                "交易日历不存在，请先执行 python -m utils.trade_calendar --refresh"
+            )
+        self.trade_dates = trade_dates
+        self._build_index()
+        if not self.covers(date.today()):
+            log(
+                "交易日历已过期，请执行 python -m utils.trade_calendar --refresh 更新",
+                "warning",
+            )
+
+    def _build_index(self):
+        """建立查询用的有序日期数组和日期到行号的索引"""
+        dates = self.trade_dates
+        # 升序的交易日数组，日期查询均基于该数组二分查找
+        self.dates = dates["trade_date"].to_numpy().astype("datetime64[D]")
+        self._rows = {day: i for i, day in enumerate(self.dates.tolist())}
+        self._expired = (dates["expired_date"] == 1).to_numpy()
+        self._month_trade_days = dates["month_trade_days"].to_numpy()
+        self._day_index_in_month = dates["day_index_in_month"].to_numpy()
+        self.last_date = self.dates[-1].item() if len(self.dates) else None
+        self._out_of_range_logged = False
+
+    def covers(self, date) -> bool:
+        """交易日历是否包含指定日期（不晚于最后一个交易日）"""
+        return self.last_date is not None and _to_date(date) <= self.last_date
+
+    def _check_date(self, date) -> date:
+        """
+        转为date并检查是否超出交易日历范围，超出时抛出ValueError，
+        避免导航类查询（前后交易日、偏移、计数）按过期的交易日历返回错误的结果；
+        空交易日历不检查
+        """
+        day = _to_date(date)
+        if self.last_date is not None and day > self.last_date:
+            raise ValueError(self._expired_message(day))
+        return day
+
+    def _check_days(self, days: np.ndarray) -> np.ndarray:
+        """_check_date的数组版本"""
+        if self.last_date is not None and len(days):
+            latest = days.max()
+            if latest > self.dates[-1]:
+                raise ValueError(self._expired_message(latest.item()))
+        return days
+
+    def _warn_out_of_range(self, day):
+        """判断类查询遇到超出范围的日期时只记录一次警告"""
+        if not self._out_of_range_logged:
+            self._out_of_range_logged = True
+            log(self._expired_message(day), "warning")
+
+    def _expired_message(self, day):
+        return (
+            f"{day} 超出交易日历范围（最后交易日 {self.last_date}），"
+            "请执行 python -m utils.trade_calendar --refresh 更新"
         )
-        if not self.trade_calendar_path.exists():
-            dates = self._get_online_dates()
-            dates.to_csv(self.trade_calendar_path, index=False)
-        else:
-            dates = pd.read_csv(self.trade_calendar_path)
-            dates["trade_date"] = pd.to_datetime(dates["trade_date"])
-            if (
-                len(dates.loc[dates["trade_date"].dt.date >= datetime.now().date()])
-                == 0
-            ):
-                dates = self._get_online_dates()
-                dates.to_csv(self.trade_calendar_path, index=False)
-        self.trade_dates = dates
-
-    def _get_online_dates(self):
+
+    @classmethod
+    def _get_online_dates(cls):
+        import akshare as ak
+
         dates = ak.tool_trade_date_hist_sina()
-        dates = dates.loc[dates["trade_date"] >= date(2025, 1, 1)].copy()
-        dates = dates.reset_index(drop=True)
-        # 确保 trade_date 是 datetime 类型
-        dates["trade_date"] = pd.to_datetime(dates["trade_date"])
+        dates = dates.loc[dates["trade_date"] >= CALENDAR_START]
+        return cls._build_trade_dates(dates["trade_date"])
+
+    @classmethod
+    def _get_offline_dates(cls, year: int):
+        """
+        无法联网时，由周一至周五去掉EXCHANGE_HOLIDAYS推算CALENDAR_START至year年底的交易日
+        """
+        missing = [
+            y
+            for y in range(CALENDAR_START.year, year + 1)
+            if y not in EXCHANGE_HOLIDAYS
+        ]
+        if missing:
+            raise ValueError(f"缺少{missing}年的休市安排，请先补充EXCHANGE_HOLIDAYS")
+        holidays = pd.to_datetime(
+            [
+                day
+                for y in range(CALENDAR_START.year, year + 1)
+                for day in EXCHANGE_HOLIDAYS[y]
+            ]
+        )
+        days = pd.bdate_range(CALENDAR_START, date(year, 12, 31))
+        return cls._build_trade_dates(days[~days.isin(holidays)])
+
+    @classmethod
+    def _build_trade_dates(cls, trade_dates):
+        """由交易日序列标注到期日并生成交易日历的其余列"""
+        dates = pd.DataFrame({"trade_date": pd.to_datetime(list(trade_dates))})
 
         # 标注每月第4个星期三
         # dates["is_4th_wed"] = False
@@ -37,15 +236,16 @@ class TradeCalendar:
         for (year, month), group in dates.groupby(
             [dates["trade_date"].dt.year, dates["trade_date"].dt.month]
         ):
-            target_date = self._get_4th_wed(year, month)
+            target_date = cls._get_4th_wed(year, month)
             d = dates.loc[dates["trade_date"].dt.date >= target_date]  # noqa
             target_index = d.index[0]
             dates.loc[target_index, "expired_date"] = 1
 
-        dates = self._add_trade_dates_groups(dates)
+        dates = cls._add_trade_dates_groups(dates)
         return dates
 
-    def _add_trade_dates_groups(self, trade_dates):
+    @staticmethod
+    def _add_trade_dates_groups(trade_dates):
         trade_dates.loc[
             trade_dates["expired_date"] == 1, "next_month_expired_index"
         ] = trade_dates.loc[trade_dates["expired_date"] == 1, "trade_date"].index
@@ -74,7 +274,8 @@ class TradeCalendar:
         trade_dates["day_index_in_month"] = trade_dates.groupby("group").cumcount() + 1
         return trade_dates
 
-    def _get_4th_wed(self, year, month):
+    @staticmethod
+    def _get_4th_wed(year, month):
         # 确定该月第一天是星期几
         first_day = date(year, month, 1)
         # 计算到第一个星期三需要加多少天
@@ -86,30 +287,165 @@ class TradeCalendar:
         fourth_wed = first_wed + timedelta(days=21)
         return date(year, month, fourth_wed.day)
 
-    def get_pre_trade_date(self, date):
-        return (
-            self.trade_dates.loc[
-                self.trade_dates["trade_date"].dt.date < date, "trade_date"
-            ]
-            .max()
-            .date()
-        )
+    def get_pre_trade_date(self, date) -> Optional[date]:
+        """返回指定日期之前（不含当天）的最近交易日"""
+        i = np.searchsorted(self.dates, np.datetime64(self._check_date(date), "D")) - 1
+        return self.dates[i].item() if i >= 0 else None
+
+    def get_next_trade_date(self, date) -> Optional[date]:
+        """返回指定日期之后（不含当天）的最近交易日"""
+        day = np.datetime64(self._check_date(date), "D")
+        i = np.searchsorted(self.dates, day, side="right")
+        return self.dates[i].item() if i < len(self.dates) else None
 
     def is_trade_date(self, date):
-        return date in self.trade_dates["trade_date"].dt.date.tolist()
+        """是否为交易日，超出交易日历范围的日期返回False"""
+        day = _to_date(date)
+        if self.last_date is not None and day > self.last_date:
+            self._warn_out_of_range(day)
+            return False
+        return day in self._rows
+
+    def offset_trade_date(self, date, n: int) -> Optional[date]:
+        """
+        返回相对指定日期偏移n个交易日的日期
+        指定日期不是交易日时以其之前的最近交易日为基准
+        :param n: 偏移的交易日数，负数表示向前
+        :return: 偏移后超出交易日历范围时返回None
+        """
+        day = np.datetime64(self._check_date(date), "D")
+        i = np.searchsorted(self.dates, day, side="right") - 1 + n
+        if i < 0 or i >= len(self.dates):
+            return None
+        return self.dates[i].item()
+
+    def count_trade_dates(self, start, end) -> int:
+        """返回[start, end]区间内（含两端）的交易日数"""
+        start = np.datetime64(_to_date(start), "D")
+        end = np.datetime64(self._check_date(end), "D")
+        count = np.searchsorted(self.dates, end, side="right") - np.searchsorted(
+            self.dates, start
+        )
+        return max(int(count), 0)
+
+    def is_trade_dates(self, dates) -> np.ndarray:
+        """is_trade_date的数组版本"""
+        days = _to_day_array(dates)
+        if len(self.dates) == 0:
+            return np.zeros(len(days), dtype=bool)
+        if len(days) and days.max() > self.dates[-1]:
+            self._warn_out_of_range(days.max().item())
+        # 超出范围的日期被截到最后一个交易日，比较结果为False
+        i = np.minimum(np.searchsorted(self.dates, days), len(self.dates) - 1)
+        return self.dates[i] == days
+
+    def get_pre_trade_dates(self, dates) -> np.ndarray:
+        """get_pre_trade_date的数组版本，不存在时为NaT"""
+        i = np.searchsorted(self.dates, self._check_days(_to_day_array(dates))) - 1
+        return self._take(i)
+
+    def get_next_trade_dates(self, dates) -> np.ndarray:
+        """get_next_trade_date的数组版本，不存在时为NaT"""
+        days = self._check_days(_to_day_array(dates))
+        i = np.searchsorted(self.dates, days, side="right")
+        return self._take(i)
+
+    def offset_trade_dates(self, dates, n) -> np.ndarray:
+        """offset_trade_date的数组版本，n可以是整数或与dates等长的数组"""
+        days = self._check_days(_to_day_array(dates))
+        i = np.searchsorted(self.dates, days, side="right") - 1
+        return self._take(i + np.asarray(n))
+
+    def count_trade_dates_between(self, starts, ends) -> np.ndarray:
+        """count_trade_dates的数组版本"""
+        count = np.searchsorted(
+            self.dates, self._check_days(_to_day_array(ends)), side="right"
+        ) - np.searchsorted(self.dates, _to_day_array(starts))
+        return np.maximum(count, 0)
+
+    def _take(self, i: np.ndarray) -> np.ndarray:
+        """按行号取交易日，越界的位置为NaT"""
+        valid = (i >= 0) & (i < len(self.dates))
+        result = np.full(len(i), np.datetime64("NaT"), dtype="datetime64[D]")
+        result[valid] = self.dates[i[valid]]
+        return result
 
     def get_day_info(self, date):
-        info = self.trade_dates.loc[self.trade_dates["trade_date"].dt.date == date]
-        if not info.empty:
+        """交易日的到期日标记和月内序号，非交易日或超出范围时返回None"""
+        day = _to_date(date)
+        if self.last_date is not None and day > self.last_date:
+            self._warn_out_of_range(day)
+            return None
+        i = self._rows.get(day)
+        if i is not None:
             return {
-                "is_expired_date": (info.iloc[0]["expired_date"] == 1).item(),
-                "trading_days_in_month": info.iloc[0]["month_trade_days"],
-                "day_index_in_month": info.iloc[0]["day_index_in_month"],
+                "is_expired_date": self._expired[i].item(),
+                "trading_days_in_month": self._month_trade_days[i],
+                "day_index_in_month": self._day_index_in_month[i],
             }
 
 
+_trade_calendar = None
+_trade_calendar_lock = threading.Lock()
+
+
+def get_trade_calendar() -> TradeCalendar:
+    """
+    返回进程内共享的交易日历，首次调用时加载
+    只读取随代码发布的交易日历，不访问网络也不写文件；交易日历过期时仅记录警告，
+    超出范围的日期判断是否交易日时返回False，导航类查询抛出ValueError，需单独执行 python -m utils.trade_calendar --refresh 或 --extend 更新
+    """
+    global _trade_calendar
+    if _trade_calendar is None:
+        with _trade_calendar_lock:
+            if _trade_calendar is None:
+                _trade_calendar = TradeCalendar()
+    return _trade_calendar
+
+
+def _save_dates(dates: pd.DataFrame) -> TradeCalendar:
+    dates.to_csv(CALENDAR_CSV_PATH, index=False)
+    save_calendar_binary(dates)
+    return TradeCalendar(dates)
+
+
+def refresh_trade_calendar() -> TradeCalendar:
+    """
+    从网络获取最新交易日历，更新CSV和二进制文件
+    仅供命令行维护使用，不替换运行中进程内的实例，运行中的策略重启后生效
+    """
+    return _save_dates(TradeCalendar._get_online_dates())
+
+
+def extend_trade_calendar(year: int) -> TradeCalendar:
+    """
+    无法联网时按EXCHANGE_HOLIDAYS推算截至year年底的交易日历，更新CSV和二进制文件
+    仅供命令行维护使用，不替换运行中进程内的实例，运行中的策略重启后生效
+    """
+    return _save_dates(TradeCalendar._get_offline_dates(year))
+
+
 if __name__ == "__main__":
-    trade_calendar = TradeCalendar()
-    trade_calendar._get_online_dates()
+    # 在src目录下执行: python -m utils.trade_calendar --refresh
+    parser = argparse.ArgumentParser(description="交易日历维护")
+    parser.add_argument("--refresh", action="store_true", help="从网络更新交易日历")
+    parser.add_argument(
+        "--from-csv", action="store_true", help="由CSV重新生成二进制交易日历"
+    )
+    parser.add_argument(
+        "--extend",
+        type=int,
+        metavar="YEAR",
+        help="按休市安排离线生成截至指定年份的交易日历",
+    )
+    args = parser.parse_args()
+    if args.refresh:
+        trade_calendar = refresh_trade_calendar()
+    elif args.extend:
+        trade_calendar = extend_trade_calendar(args.extend)
+    else:
+        if args.from_csv:
+            save_calendar_binary(load_calendar_csv())
+        trade_calendar = get_trade_calendar()
     print(trade_calendar.trade_dates)
     print(trade_calendar.get_pre_trade_date(datetime.now().date()))
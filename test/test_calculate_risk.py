@@ -0,0 +1,155 @@
+# test_calculate_risk.py
+# calculate_risk按代码索引关联最新价与原逐条查找实现的一致性测试
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.stand_ins import UNDERLYINGS, MemoryDataFeed
+from strategies import dolphindb_datafeed
+from strategies.dolphindb_datafeed import DolphinDBDataFeed
+from utils.option import calculate_margin_array
+
+UNDERLYING_SYMBOLS = [
+    f"{code}.{market}" for code, (market, _, _) in UNDERLYINGS.items()
+]
+
+
+class FakeSession:
+    """返回固定tick结果的DolphinDB会话"""
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    def connect(self, *args):
+        pass
+
+    def run(self, sql):
+        return self.frame.copy()
+
+    def close(self):
+        pass
+
+
+class RawTickDataFeed(MemoryDataFeed):
+    """使用DolphinDBDataFeed原有的tick查询，查询结果由FakeSession提供"""
+
+    get_last_tick_frame = DolphinDBDataFeed.get_last_tick_frame
+
+    def __init__(self):
+        super().__init__(seed=0)
+        self.market_db_config = dict.fromkeys(
+            ["DB_HOST", "DB_PORT", "DB_USER", "DB_PASSWORD"]
+        )
+
+
+def legacy_calculate_risk(datafeed, symbols, ticks):
+    """原calculate_risk：逐合约在tick列表中查找合约和标的的最新价"""
+    symbols = [symbol.split(".")[0] for symbol in symbols]
+    contracts = {}
+    for symbol in symbols:
+        contract = datafeed.get_option_contract_by_id(symbol)
+        if contract is None:
+            continue
+        contracts[contract.symbol] = contract
+    if not contracts:
+        return None
+    if not ticks:
+        return None
+
+    results = []
+    margin_inputs = []
+    for symbol, contract in contracts.items():
+        contract_tick = next((t for t in ticks if t["symbol"] == symbol), None)
+        underlying_tick = next(
+            (t for t in ticks if t["symbol"] == contract.underlying_symbol), None
+        )
+        if not contract_tick or not underlying_tick:
+            continue
+        greeks = datafeed.greeks_cache.get(
+            contract.instrument_id,
+            option_type=contract.option_type[0].lower(),
+            strike_price=contract.strike_price,
+            option_price=contract_tick["lastPrice"],
+            underlying_price=underlying_tick["lastPrice"],
+            t_days=datafeed.get_days_to_expiry(contract),
+            r=0.0,
+        )
+        results.append(
+            {
+                "instrument_id": symbol.split(".")[0],
+                "margin": None,
+                "delta": greeks["delta"],
+                "gamma": greeks["gamma"],
+                "theta": greeks["theta"],
+                "vega": greeks["vega"],
+                "rho": greeks["rho"],
+                "sigma": greeks["sigma"],
+                "undl_price": underlying_tick["lastPrice"],
+                "price": contract_tick["lastPrice"],
+            }
+        )
+        margin_inputs.append(
+            (
+                contract.option_type[0].lower(),
+                contract.strike_price,
+                contract.volume_multiple,
+            )
+        )
+    if results:
+        option_type, strike_price, volume_multiple = zip(*margin_inputs)
+        margins = calculate_margin_array(
+            option_type=option_type,
+            market_price=[result["price"] for result in results],
+            underlying_price=[result["undl_price"] for result in results],
+            strike_price=strike_price,
+            contract_multiplier=volume_multiple,
+        )
+        for result, margin in zip(results, margins.tolist()):
+            result["margin"] = margin * 1.2
+    return results
+
+
+def make_tick_frame(datafeed, seed):
+    """
+    生成带缺失和重复代码的tick查询结果
+    部分期权和一个标的没有tick，部分代码出现多行且价格不同
+    """
+    rng = np.random.default_rng(seed)
+    ticks = pd.DataFrame(
+        {"symbol": list(datafeed.ticks), "lastPrice": list(datafeed.ticks.values())}
+    )
+    ticks["time"] = pd.Timestamp("2026-10-19 10:00:00")
+    is_option = ~ticks["symbol"].isin(UNDERLYING_SYMBOLS)
+    missing = is_option & (rng.random(len(ticks)) < 0.2)
+    missing |= ticks["symbol"] == ticks.loc[~is_option, "symbol"].iloc[-1]
+    ticks = ticks[~missing]
+    duplicates = ticks.sample(frac=0.3, random_state=seed).copy()
+    duplicates["lastPrice"] = (duplicates["lastPrice"] * 1.5).round(4)
+    return pd.concat([ticks, duplicates]).sample(frac=1, random_state=seed)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_calculate_risk_matches_legacy(monkeypatch, seed):
+    datafeed = RawTickDataFeed()
+    frame = make_tick_frame(datafeed, seed)
+    monkeypatch.setattr(dolphindb_datafeed.ddb, "session", lambda: FakeSession(frame))
+
+    symbols = (
+        datafeed.instruments["InstrumentID"] + "." + datafeed.instruments["ExchangeID"]
+    ).tolist()
+    # 重复的合约代码，以及不带市场后缀的代码
+    symbols = symbols + symbols[:10] + [s.split(".")[0] for s in symbols[10:20]]
+
+    expected = legacy_calculate_risk(datafeed, symbols, frame.to_dict("records"))
+    actual = datafeed.calculate_risk(symbols)
+    assert 0 < len(actual) < len(datafeed.instruments)
+    assert actual == expected
+
+
+def test_calculate_risk_without_ticks(monkeypatch):
+    datafeed = RawTickDataFeed()
+    frame = pd.DataFrame(columns=["symbol", "lastPrice", "time"])
+    monkeypatch.setattr(dolphindb_datafeed.ddb, "session", lambda: FakeSession(frame))
+    symbol = datafeed.instruments["InstrumentID"].iloc[0]
+    assert datafeed.calculate_risk([symbol]) is None
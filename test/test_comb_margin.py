@@ -0,0 +1,197 @@
+# test_comb_margin.py
+# 组合保证金引擎与原逐行实现的一致性测试
+# 性能对比: PYTHONPATH=. python test/test_comb_margin.py
+
+import random
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.strategies.comb_margin import compute_comb_margin
+
+
+def legacy_adjust_margin_by_comb(positions, combinations, opt_type="BOTH"):
+    """原StrategyAccount.adjust_margin_by_comb的逐行实现"""
+    if opt_type == "BOTH":
+        total_margin = positions["margin"].sum()
+    else:
+        total_margin = positions[positions["opt_type"] == opt_type]["margin"].sum()
+    total_margin = total_margin.item()
+
+    for _, row in combinations.iterrows():
+        pair = row["instrument_id"].split("/")
+        pos = positions[positions["instrument_id"].isin(pair)]
+        pos = pos.sort_values(by="direction", ascending=False)
+
+        if len(pos) == 2:
+            if opt_type != "BOTH" and pos["opt_type"].iloc[0] != opt_type:
+                continue
+            if pos["direction"].prod() < 0:
+                diff = abs(pos["strike"].diff().iloc[1]) * pos["vol_mul"].iloc[0]
+                if (
+                    pos["opt_type"].iloc[0] == "CALL"
+                    and pos["strike"].iloc[0] < pos["strike"].iloc[1]
+                ) or (
+                    pos["opt_type"].iloc[0] == "PUT"
+                    and pos["strike"].iloc[0] > pos["strike"].iloc[1]
+                ):
+                    comb_margin = 0
+                else:
+                    comb_margin = abs(diff * row["volume"] * 1.06)
+                old_margin = pos["margin"] / pos["volume"] * row["volume"]
+                total_margin = total_margin + comb_margin - old_margin.sum()
+            if pos["direction"].prod() > 0:
+                comb_margin = (pos["margin"] / pos["volume"]).max() + (
+                    pos["price"] / pos["volume"]
+                ).min()
+                comb_margin = comb_margin * row["volume"]
+                total_margin = total_margin + (comb_margin - pos["margin"].sum())
+    return total_margin
+
+
+def legacy_get_month_margin(positions, combinations, month, opt_type="BOTH"):
+    """原StrategyAccount.get_month_margin的逐行实现"""
+    monthly = dict(zip(positions["instrument_id"], positions["monthly"]))
+    margin_total = 0.0
+    for _, row in positions.iterrows():
+        if opt_type != "BOTH" and row["opt_type"] != opt_type:
+            continue
+        if row["monthly"] is None or row["monthly"] != month:
+            continue
+        margin_total += row["margin"] if not pd.isna(row["margin"]) else 0
+
+    for _, comb_row in combinations.iterrows():
+        pair = comb_row["instrument_id"].split("/")
+        pos = positions[positions["instrument_id"].isin(pair)]
+        pos = pos.sort_values(by="direction", ascending=False)
+        if len(pos) == 2:
+            if monthly[pos.iloc[0]["instrument_id"]] != month:
+                continue
+            if opt_type != "BOTH" and pos["opt_type"].iloc[0] != opt_type:
+                continue
+            if pos["direction"].prod() < 0:
+                diff = abs(pos["strike"].diff().iloc[1]) * pos["vol_mul"].iloc[0]
+                if (
+                    pos["opt_type"].iloc[0] == "CALL"
+                    and pos["strike"].iloc[0] < pos["strike"].iloc[1]
+                ) or (
+                    pos["opt_type"].iloc[0] == "PUT"
+                    and pos["strike"].iloc[0] > pos["strike"].iloc[1]
+                ):
+                    comb_margin = 0
+                else:
+                    comb_margin = abs(diff * comb_row["volume"] * 1.06)
+                old_margin = pos["margin"] / pos["volume"] * comb_row["volume"]
+                margin_total += comb_margin - old_margin.sum()
+            if pos["direction"].prod() > 0:
+                comb_margin = (pos["margin"] / pos["volume"]).max() + (
+                    pos["price"] / pos["volume"]
+                ).min()
+                comb_margin = comb_margin * comb_row["volume"]
+                margin_total += comb_margin - pos["margin"].sum()
+    return margin_total
+
+
+def make_portfolio(n_positions, n_combinations, seed):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_positions):
+        direction = rng.choice([1, -1])
+        volume = rng.randint(1, 30)
+        if rng.random() < 0.05:  # 期权链中找不到的合约
+            strike, vol_mul, opt_type, monthly = None, None, None, None
+        else:
+            strike = round(rng.uniform(2.0, 4.0), 2)
+            vol_mul = rng.choice([10000, 10000, 10265])
+            opt_type = rng.choice(["CALL", "PUT"])
+            monthly = rng.randint(0, 3)
+        margin = 0
+        if direction == -1:
+            margin = rng.uniform(2000, 6000) * volume
+        rows.append(
+            {
+                "instrument_id": f"1000{i:04d}",
+                "direction": direction,
+                "volume": volume,
+                "open_price": rng.uniform(0.01, 0.3),
+                "commission": 1.8 * volume,
+                "margin": margin,
+                "price": rng.uniform(0.01, 0.3),
+                "strike": strike,
+                "vol_mul": vol_mul,
+                "opt_type": opt_type,
+                "monthly": monthly,
+            }
+        )
+    positions = pd.DataFrame(rows)
+    ids = positions["instrument_id"].tolist() + ["99999999"]  # 含缺腿的组合
+    combinations = pd.DataFrame(
+        [
+            {
+                "instrument_id": "/".join(rng.sample(ids, 2)),
+                "volume": rng.randint(1, 10),
+            }
+            for _ in range(n_combinations)
+        ]
+    )
+    return positions, combinations
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_comb_margin_matches_legacy(seed):
+    positions, combinations = make_portfolio(12, 8, seed)
+    result = compute_comb_margin(positions, combinations)
+
+    for opt_type in ["BOTH", "CALL", "PUT"]:
+        expected = legacy_adjust_margin_by_comb(positions, combinations, opt_type)
+        assert result.total(opt_type) == pytest.approx(expected, nan_ok=True)
+        for month in range(4):
+            expected = legacy_get_month_margin(
+                positions, combinations, month, opt_type
+            )
+            actual = result.month(month, opt_type)
+            assert actual == pytest.approx(expected, nan_ok=True)
+
+
+def test_by_month_table():
+    positions, combinations = make_portfolio(20, 10, 7)
+    table = compute_comb_margin(positions, combinations).by_month()
+    for month in range(4):
+        if month not in table.index:
+            continue
+        for opt_type in ["BOTH", "CALL", "PUT"]:
+            expected = legacy_get_month_margin(
+                positions, combinations, month, opt_type
+            )
+            actual = table.at[month, opt_type]
+            assert np.nan_to_num(actual) == pytest.approx(expected, nan_ok=True)
+
+
+def test_without_combinations():
+    positions, _ = make_portfolio(5, 0, 3)
+    result = compute_comb_margin(positions, pd.DataFrame())
+    assert result.total() == pytest.approx(positions["margin"].sum())
+    with pytest.raises(ValueError):
+        result.total("BAD")
+
+
+if __name__ == "__main__":
+    positions, combinations = make_portfolio(200, 80, 1)
+
+    start = time.perf_counter()
+    for month in range(4):
+        legacy_get_month_margin(positions, combinations, month)
+    legacy_adjust_margin_by_comb(positions, combinations)
+    legacy_cost = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = compute_comb_margin(positions, combinations)
+    for month in range(4):
+        result.month(month)
+    result.total()
+    engine_cost = time.perf_counter() - start
+
+    print(f"逐行实现: {legacy_cost * 1000:.1f} ms")
+    print(f"组合保证金引擎: {engine_cost * 1000:.1f} ms")
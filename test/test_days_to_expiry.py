@@ -0,0 +1,95 @@
+# test_days_to_expiry.py
+# 剩余天数数组及期权链被后台刷新替换后剩余天数的一致性测试
+
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from benchmarks.stand_ins import MemoryDataFeed, make_option_instruments
+from strategies.base import BaseDataFeed
+from utils.option import MarketOptionChain
+
+
+def expected_days(contract, today):
+    """原calculate_risk中逐合约计算的剩余自然日数"""
+    return (contract.expire_day - today).days + 1
+
+
+@pytest.mark.parametrize("offset", [0, 10, 40])
+def test_days_match_per_contract(offset):
+    chain = MarketOptionChain(make_option_instruments(0, strikes_per_side=3))
+    today = date.today() + timedelta(days=offset)
+    days = chain.time_to_expiry(today)
+    assert len(days) == len(chain.contracts)
+    for contract in chain.contracts:
+        assert days[contract.index] == expected_days(contract, today)
+        assert chain.get_days_to_expiry(contract, today) == expected_days(
+            contract, today
+        )
+    # 同一天只计算一次
+    assert chain.time_to_expiry(today) is days
+
+
+def test_contract_from_replaced_chain():
+    old_chain = MarketOptionChain(make_option_instruments(0, strikes_per_side=6))
+    # 新期权链的合约更少、到期日不同，同一位置是另一个合约
+    new_chain = MarketOptionChain(
+        make_option_instruments(
+            1, today=pd.Timestamp(date.today()) - pd.DateOffset(months=1)
+        )
+    )
+    today = date.today()
+    contracts = old_chain.contracts
+    assert len(new_chain.contracts) != len(contracts)
+    for contract in contracts:
+        assert new_chain.get_days_to_expiry(contract) == expected_days(contract, today)
+
+
+class SwappingDataFeed(MemoryDataFeed):
+    """每次读取market_option_chain都返回一个新的期权链，模拟后台刷新"""
+
+    def __init__(self):
+        super().__init__(instruments=make_option_instruments(0, strikes_per_side=3))
+        self.chains = [
+            MarketOptionChain(self.instruments),
+            MarketOptionChain(
+                make_option_instruments(
+                    1, today=pd.Timestamp(date.today()) - pd.DateOffset(months=1)
+                )
+            ),
+        ]
+        self.reads = 0
+
+    @property
+    def market_option_chain(self):
+        chain = self.chains[min(self.reads, 1)]
+        self.reads += 1
+        return chain
+
+
+def test_calculate_risk_reads_chain_once(monkeypatch):
+    datafeed = SwappingDataFeed()
+    t_days = {}
+
+    def get(instrument_id, **kwargs):
+        t_days[instrument_id] = kwargs["t_days"]
+        return dict.fromkeys(["delta", "gamma", "theta", "vega", "rho", "sigma"], 0.0)
+
+    monkeypatch.setattr(datafeed.greeks_cache, "get", get)
+    symbols = datafeed.instruments["InstrumentID"].head(20).tolist()
+    results = datafeed.calculate_risk(symbols)
+    assert datafeed.reads == 1
+    assert len(results) == 20
+    chain = datafeed.chains[0]
+    for symbol in symbols:
+        contract = chain.get_contract_by_id(symbol)
+        assert t_days[symbol] == expected_days(contract, date.today())
+
+
+def test_datafeed_days_to_expiry_with_chain():
+    datafeed = SwappingDataFeed()
+    contract = datafeed.chains[0].contracts[-1]
+    expected = expected_days(contract, date.today())
+    assert BaseDataFeed.get_days_to_expiry(datafeed, contract) == expected
+    assert datafeed.get_days_to_expiry(contract, datafeed.chains[1]) == expected
@@ -0,0 +1,157 @@
+# test_deal_revaluation.py
+# 成交处理线程合并账户重估、回调读取最新持仓及停止时执行剩余重估的测试
+
+import threading
+import time
+from types import SimpleNamespace
+
+import benchmarks  # noqa: F401  将src加入sys.path
+from strategies.base import (
+    BARS_RECEIVED,
+    HANDLER_SECONDS,
+    BaseStrategy,
+    StrategyAccount,
+    StrategyPosition,
+)
+
+
+class FakeDataFeed:
+    """只提供成交处理路径所需接口的数据源"""
+
+    def __init__(self):
+        self.saved_positions = []
+
+    def subscribe(self, symbol, period, callback):
+        pass
+
+    def get_strike(self, symbol):
+        return None, None
+
+    def get_available_volume(self, user_id, instrument_id):
+        return 0
+
+    def save_strategy_position(self, *args):
+        self.saved_positions.append(args)
+
+
+class CountingAccount(StrategyAccount):
+    """用持仓快照代替风险计算，记录每次重估"""
+
+    def __init__(self, strategy):
+        super().__init__(strategy)
+        self.revaluations = []
+
+    def set_last_account(self):
+        frame = self.strategy.strategy_positions.to_frame()
+        self.revaluations.append(frame["volume"].sum() if not frame.empty else 0)
+        self.positions = frame
+
+
+class DealStrategy(BaseStrategy):
+    def __init__(self, window, read_in_on_deal=False):
+        super().__init__(
+            FakeDataFeed(),
+            "teststrategy001",
+            "test",
+            {"period": 1, "symbol": "510050", "revaluation_window": window},
+        )
+        self.read_in_on_deal = read_in_on_deal
+        self.seen_volumes = []
+        self.processed = threading.Event()
+        self.strategy_positions = StrategyPosition(self)
+        self.strategy_account = CountingAccount(self)
+
+    def on_bar(self, symbol, period, bar):
+        pass
+
+    def on_deal(self, deal_info):
+        if self.read_in_on_deal:
+            self.seen_volumes.append(self.strategy_account.positions["volume"].sum())
+        if self._deal_queue.empty():
+            self.processed.set()
+
+
+def open_deal(volume):
+    return SimpleNamespace(
+        instrument_id="10000001",
+        instrument_name="C1",
+        direction=48,
+        offset_flag=48,
+        volume=volume,
+        price=0.1,
+        exchange_id="SSE",
+        remark="",
+    )
+
+
+def noop_deal():
+    """组合类型未知的成交，不修改持仓，只用于唤醒阻塞在队列上的处理线程"""
+    return SimpleNamespace(instrument_id="a/b", direction=0, remark="")
+
+
+def start_deal_thread(strategy, deals):
+    for deal in deals:
+        strategy._on_deal_arrived(deal)
+    strategy._running = True
+    strategy._deal_thread = threading.Thread(
+        target=strategy._run_deal_processor, daemon=True
+    )
+    strategy._deal_thread.start()
+    assert strategy.processed.wait(5)
+
+
+def stop_deal_thread(strategy):
+    strategy._running = False
+    strategy._on_deal_arrived(noop_deal())
+    strategy._deal_thread.join(5)
+    assert not strategy._deal_thread.is_alive()
+    strategy.stop()
+
+
+def test_burst_of_deals_revalues_once():
+    strategy = DealStrategy(window=0.5)
+    start_deal_thread(strategy, [open_deal(1) for _ in range(5)])
+    deadline = time.monotonic() + 5
+    while not strategy.strategy_account.revaluations and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stop_deal_thread(strategy)
+    assert strategy.strategy_account.revaluations == [5]
+    assert len(strategy.datafeed.saved_positions) == 5
+
+
+def test_stop_flushes_pending_revaluation():
+    strategy = DealStrategy(window=60)
+    for deal in [open_deal(2), open_deal(3)]:
+        strategy._update_strategy_info(deal)
+    assert strategy.strategy_account.revaluations == []
+    strategy.stop()
+    assert strategy.strategy_account.revaluations == [5]
+
+
+def test_on_deal_reads_revalued_positions():
+    strategy = DealStrategy(window=1, read_in_on_deal=True)
+    start_deal_thread(strategy, [open_deal(1), open_deal(2)])
+    # 回调中读取持仓时先完成重估
+    assert strategy.seen_volumes == [1, 3]
+    assert strategy.strategy_account.revaluations == [1, 3]
+    # 其他线程读取不触发重估
+    strategy.strategy_account.request_revaluation()
+    assert strategy.strategy_account.positions["volume"].sum() == 3
+    assert strategy.strategy_account.revaluations == [1, 3]
+    stop_deal_thread(strategy)
+    assert strategy.strategy_account.revaluations == [1, 3, 3]
+
+
+def test_stop_removes_strategy_series():
+    strategy = DealStrategy(window=0)
+    start_deal_thread(strategy, [open_deal(1)])
+    strategy._on_data_arrived("510050", 1, {})
+    labels = {"strategy_id": strategy.strategy_id}
+    assert HANDLER_SECONDS.count(handler="on_deal", **labels) == 1
+    assert BARS_RECEIVED.value(**labels) == 1
+    stop_deal_thread(strategy)
+    assert HANDLER_SECONDS.count(handler="on_deal", **labels) == 0
+    assert BARS_RECEIVED.value(**labels) == 0
+    # 停止后收到的K线不再重新创建序列
+    strategy._on_data_arrived("510050", 1, {})
+    assert not any(strategy.strategy_id in line for line in BARS_RECEIVED.render())
@@ -0,0 +1,117 @@
+# test_greeks_cache.py
+# 希腊字母缓存的命中、失效和价格阈值测试
+
+import threading
+
+import pytest
+
+from src.utils import greeks_cache as greeks_cache_module
+from src.utils.greeks_cache import GREEKS_COLUMNS, GreeksCache
+from src.utils.option import calculate_iv_and_greeks
+
+INPUTS = dict(
+    option_type="c",
+    strike_price=3.0,
+    option_price=0.12,
+    underlying_price=3.05,
+    t_days=30,
+    r=0.0,
+)
+
+
+@pytest.fixture
+def solves(monkeypatch):
+    """记录每次实际求解的输入"""
+    calls = []
+
+    def solve(**kwargs):
+        calls.append(kwargs)
+        return calculate_iv_and_greeks(**kwargs)
+
+    monkeypatch.setattr(greeks_cache_module, "calculate_iv_and_greeks", solve)
+    return calls
+
+
+def test_hit_and_miss(solves):
+    cache = GreeksCache()
+    first = cache.get("10000001", **INPUTS)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert cache.get("10000001", **INPUTS) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(solves) == 1
+    assert first == calculate_iv_and_greeks(
+        market_price=0.12,
+        underlying_price=3.05,
+        strike_price=3.0,
+        t_days=30,
+        r=0.0,
+        option_type="c",
+    )
+    # 其他合约单独缓存
+    cache.get("10000002", **INPUTS)
+    assert len(cache) == 2 and cache.misses == 2
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [{"t_days": 29}, {"r": 0.02}, {"strike_price": 3.1}],
+    ids=["t_days", "r", "strike"],
+)
+def test_input_change_misses(solves, changes):
+    cache = GreeksCache()
+    cache.get("10000001", **INPUTS)
+    greeks = cache.get("10000001", **{**INPUTS, **changes})
+    assert cache.misses == 2 and cache.hits == 0
+    assert solves[-1]["r"] == changes.get("r", 0.0)
+    # 新的输入替换原有缓存
+    assert cache.get("10000001", **{**INPUTS, **changes}) is greeks
+    assert cache.hits == 1
+
+
+def test_price_epsilon(solves):
+    cache = GreeksCache(price_epsilon=1e-4)
+    cache.get("10000001", **INPUTS)
+    # 变动不超过阈值时命中，阈值以上重新求解
+    cache.get("10000001", **{**INPUTS, "option_price": 0.12 + 5e-5})
+    cache.get("10000001", **{**INPUTS, "underlying_price": 3.05 - 9e-5})
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.get("10000001", **{**INPUTS, "option_price": 0.12 + 2e-4})
+    assert (cache.hits, cache.misses) == (2, 2)
+    cache.get("10000001", **{**INPUTS, "underlying_price": 3.05 + 2e-4})
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_hits_counted_across_threads(solves):
+    cache = GreeksCache()
+    cache.get("10000001", **INPUTS)
+
+    def read():
+        for _ in range(1000):
+            cache.get("10000001", **INPUTS)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.hits == 8000 and cache.misses == 1
+
+
+def test_lookup_and_invalidate(solves):
+    cache = GreeksCache()
+    greeks = cache.get("10000001", **INPUTS)
+    frame = cache.lookup(["10000001", "10000009"])
+    assert frame.columns.tolist() == GREEKS_COLUMNS
+    assert frame.loc["10000001"].tolist() == [greeks[c] for c in GREEKS_COLUMNS]
+    assert frame.loc["10000009"].isna().all()
+    cache.invalidate("10000001")
+    assert len(cache) == 0
+    cache.get("10000001", **INPUTS)
+    assert cache.misses == 2
+
+
+def test_failed_solve_not_cached():
+    cache = GreeksCache()
+    with pytest.raises(ValueError):
+        cache.get("10000001", **{**INPUTS, "t_days": 0})
+    assert len(cache) == 0
@@ -0,0 +1,75 @@
+# test_latest_day_records.py
+# 最近一个交易日持仓记录的查询测试，按UTC日期分日，与原先按日期过滤的两次查询结果一致
+
+import pytest
+
+from benchmarks.stand_ins import MemoryDataFeed
+
+# created为UTC时间，北京时间10月19日的记录有一部分落在UTC的10月18日
+ROWS = [
+    ("s1", "10000001", 1, "2026-10-17 06:00:00.000"),
+    ("s1", "10000002", 2, "2026-10-18 01:30:00.000"),
+    ("s1", "10000003", 0, "2026-10-18 16:30:00.000"),
+    ("s1", "10000001", 3, "2026-10-18 23:59:59.999"),
+    ("s1", "10000002", 0, "2026-10-19 00:00:00.000"),
+    ("s1", "10000004", 1, "2026-10-19 01:30:00.000"),
+    ("s1", "10000005", 2, "2026-10-19 06:59:00.000"),
+    ("s2", "10000006", 1, "2026-10-20 02:00:00.000"),
+]
+
+
+@pytest.fixture
+def datafeed():
+    datafeed = MemoryDataFeed()
+    for collection in ("strategyPositions", "strategyCombinations"):
+        for strategy, instrument_id, volume, created in ROWS:
+            datafeed.client.collection(collection).create(
+                {
+                    "strategy": strategy,
+                    "instrumentId": instrument_id,
+                    "volume": volume,
+                    "created": created,
+                }
+            )
+    return datafeed
+
+
+def legacy_latest_day_records(datafeed, collection, strategy_id):
+    """原先的查询：先取最新记录的日期，再查询created >= 该日期的全部记录"""
+    records = datafeed.client.collection(collection).get_list(
+        1, 1, {"filter": f'strategy="{strategy_id}"', "sort": "-created"}
+    )
+    if len(records.items) == 0:
+        return []
+    query_date = records.items[-1].created.date()
+    return datafeed.client.collection(collection).get_full_list(
+        -1,
+        {
+            "filter": f'strategy="{strategy_id}" && created >= "{query_date}"',
+            "sort": "created",
+        },
+    )
+
+
+@pytest.mark.parametrize("per_page", [1, 2, 500])
+@pytest.mark.parametrize("strategy_id", ["s1", "s2", "s3"])
+def test_matches_date_filter(datafeed, per_page, strategy_id):
+    for collection in ("strategyPositions", "strategyCombinations"):
+        records = datafeed._get_latest_day_records(
+            collection, f'strategy="{strategy_id}"', per_page=per_page
+        )
+        expected = legacy_latest_day_records(datafeed, collection, strategy_id)
+        assert [r.id for r in records] == [r.id for r in expected]
+
+
+def test_splits_on_utc_date(datafeed):
+    records = datafeed.get_latest_strategy_positions("s1")
+    # UTC 10月18日23:59:59的记录属于前一天，即使北京时间已是10月19日
+    assert [(r.instrument_id, r.volume) for r in records] == [
+        ("10000002", 0),
+        ("10000004", 1),
+        ("10000005", 2),
+    ]
+    # 组合持仓包括volume为0的记录
+    combinations = datafeed.get_latest_combinations_positions("s1")
+    assert [r.volume for r in combinations] == [0, 1, 2]
@@ -0,0 +1,163 @@
+# test_logger.py
+# 日志限流、队列写入、按日期切换文件和JSON格式测试
+
+import json
+import logging
+import queue
+import sys
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+import pytest
+
+from src.utils import logger
+
+
+@pytest.fixture
+def records(monkeypatch):
+    """把log()输出的记录收集到列表中，并重置限流状态"""
+    collected = []
+
+    class ListHandler(logging.Handler):
+        def emit(self, record):
+            collected.append(record.getMessage())
+
+    test_logger = logging.getLogger("botgo.test")
+    test_logger.handlers = [ListHandler()]
+    test_logger.propagate = False
+    test_logger.setLevel(logging.INFO)
+    monkeypatch.setattr(logger, "get_logger", lambda: test_logger)
+    monkeypatch.setattr(logger, "_sites", {})
+    return collected
+
+
+def test_interval_limits_per_call_site(records, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(logger.time, "monotonic", lambda: now[0])
+
+    def tick(i):
+        logger.log(f"tick {i}", interval=10)
+
+    for i in range(5):
+        tick(i)
+        now[0] += 1
+    now[0] = 111.0
+    tick(5)
+    # 其他调用位置单独限流
+    logger.log("elsewhere", interval=10)
+    assert records == ["tick 0", "tick 5 (省略了4条相同位置的日志)", "elsewhere"]
+
+    # 不限流的日志不受影响
+    logger.log("plain")
+    logger.log("plain")
+    assert records[-2:] == ["plain", "plain"]
+
+
+def test_key_groups_call_sites(records, monkeypatch):
+    monkeypatch.setattr(logger.time, "monotonic", lambda: 0.0)
+
+    def deal(strategy_id):
+        logger.log(f"deal {strategy_id}", interval=1, key=("deal", strategy_id))
+
+    for _ in range(3):
+        deal("s1")
+        deal("s2")
+    # 同一调用位置按key分别限流
+    assert records == ["deal s1", "deal s2"]
+    logger.log("other", interval=1, key=("deal", "s1"))
+    assert records == ["deal s1", "deal s2"]
+
+
+def test_sample(records, monkeypatch):
+    values = iter([0.05, 0.5, 0.95, 0.09])
+    monkeypatch.setattr(logger.random, "random", lambda: next(values))
+    for i in range(4):
+        logger.log(f"sample {i}", sample=0.1)
+    assert records == ["sample 0", "sample 3 (省略了2条相同位置的日志)"]
+
+
+def test_levels(records):
+    logger.log("a", "ERROR")
+    logger.log("b", "unknown")
+    assert records == ["a", "b"]
+
+
+def make_record(message, created, thread_name="worker"):
+    record = logging.LogRecord("botgo", logging.INFO, __file__, 1, message, None, None)
+    record.created = created.timestamp()
+    record.threadName = thread_name
+    return record
+
+
+def test_daily_file_rollover(tmp_path):
+    handler = logger.DailyFileHandler(str(tmp_path))
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    day1 = datetime(2026, 10, 19, 23, 59, 59)
+    day2 = datetime(2026, 10, 20, 0, 0, 1)
+    handler.current_date = "2026-10-19"
+    handler.baseFilename = str(tmp_path / "2026-10-19.log")
+    handler.emit(make_record("before midnight", day1))
+    handler.emit(make_record("after midnight", day2))
+    handler.emit(make_record("next", day2))
+    handler.close()
+    assert (tmp_path / "2026-10-19.log").read_text(encoding="utf-8") == (
+        "before midnight\n"
+    )
+    assert (tmp_path / "2026-10-20.log").read_text(encoding="utf-8") == (
+        "after midnight\nnext\n"
+    )
+
+
+def test_json_formatter():
+    record = make_record('含"引号"的消息', datetime(2026, 10, 19, 9, 30))
+    data = json.loads(logger.JsonFormatter().format(record))
+    assert data == {
+        "time": "2026-10-19 09:30:00",
+        "level": "INFO",
+        "message": '含"引号"的消息',
+        "thread": "worker",
+    }
+    try:
+        raise ValueError("失败")
+    except ValueError:
+        record.exc_info = sys.exc_info()
+    data = json.loads(logger.JsonFormatter().format(record))
+    assert "ValueError: 失败" in data["exception"]
+
+
+def test_queue_pipeline_writes_from_other_threads(tmp_path):
+    # 全局logger只挂QueueHandler，写文件和控制台由后台线程完成
+    assert [type(h) for h in logger.get_logger().handlers] == [QueueHandler]
+
+    handler = logger.DailyFileHandler(str(tmp_path))
+    handler.setFormatter(logger.JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    test_logger = logging.getLogger("botgo.queue_test")
+    test_logger.handlers = [QueueHandler(log_queue)]
+    test_logger.propagate = False
+    test_logger.setLevel(logging.INFO)
+    listener.start()
+
+    def write(name):
+        for i in range(50):
+            test_logger.info(f"{name} {i}")
+
+    threads = [
+        threading.Thread(target=write, args=(f"t{i}",), name=f"t{i}") for i in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # stop()会写完队列中剩余的日志
+    listener.stop()
+    handler.close()
+
+    lines = (tmp_path / f"{handler.current_date}.log").read_text(encoding="utf-8")
+    rows = [json.loads(line) for line in lines.splitlines()]
+    assert len(rows) == 200
+    for name in ("t0", "t3"):
+        messages = [r["message"] for r in rows if r["thread"] == name]
+        assert messages == [f"{name} {i}" for i in range(50)]
@@ -0,0 +1,183 @@
+# test_memory_pocketbase.py
+# 进程内PocketBase替身的过滤、排序、分页、索引和实时订阅测试
+
+import threading
+
+import pytest
+from pocketbase.errors import ClientResponseError
+
+from src.utils.memory_pocketbase import MemoryPocketBase, parse_filter
+
+
+@pytest.fixture
+def client():
+    return MemoryPocketBase(async_events=False)
+
+
+def _fill(client):
+    positions = client.collection("strategyPositions")
+    rows = [
+        ("s1", "u1", "10000001", 2, "2025-06-05 10:00:00"),
+        ("s1", "u1", "10000002", 0, "2025-06-06 09:30:00"),
+        ("s1", "u2", "10000001", 3, "2025-06-06 10:00:00"),
+        ("s2", "u1", "10000003", 1, "2025-06-07 14:00:00"),
+    ]
+    for strategy, user, instrument_id, volume, created in rows:
+        positions.create(
+            {
+                "strategy": strategy,
+                "user": user,
+                "instrumentId": instrument_id,
+                "volume": volume,
+                "created": created,
+            }
+        )
+    return positions
+
+
+def _ids(records):
+    return [(r.instrument_id, r.volume) for r in records]
+
+
+def test_filter_grammar(client):
+    positions = _fill(client)
+
+    def query(f):
+        return _ids(positions.get_full_list(query_params={"filter": f}))
+
+    assert query('strategy="s1"') == [("10000001", 2), ("10000002", 0), ("10000001", 3)]
+    assert query('strategy="s1" && created >= "2025-06-06"') == [
+        ("10000002", 0),
+        ("10000001", 3),
+    ]
+    assert query('strategy="s1" && created >= "2025-06-06" && volume>0') == [
+        ("10000001", 3)
+    ]
+    assert query('user="u1" && instrumentId="10000001"') == [("10000001", 2)]
+    assert query('(strategy="s2" || user="u2") && volume != 0') == [
+        ("10000001", 3),
+        ("10000003", 1),
+    ]
+    assert query('created < "2025-06-06"') == [("10000001", 2)]
+    assert query('instrumentId ~ "0003"') == [("10000003", 1)]
+    assert query('strategy="missing"') == []
+
+
+def test_filter_errors():
+    for text in ['strategy="s1" &&', 'strategy "s1"', '(strategy="s1"', "volume > x"]:
+        with pytest.raises(ValueError):
+            parse_filter(text)
+
+
+def test_sort_and_pagination(client):
+    positions = _fill(client)
+    result = positions.get_list(1, 3, {"sort": "-created"})
+    assert result.total_items == 4 and result.total_pages == 2
+    assert _ids(result.items)[0] == ("10000003", 1)
+    assert _ids(positions.get_list(2, 3, {"sort": "-created"}).items) == [
+        ("10000001", 2)
+    ]
+    records = positions.get_full_list(query_params={"sort": "instrumentId,-volume"})
+    assert _ids(records) == [
+        ("10000001", 3),
+        ("10000001", 2),
+        ("10000002", 0),
+        ("10000003", 1),
+    ]
+
+
+def test_update_delete_and_index(client):
+    positions = _fill(client)
+    record = positions.get_first_list_item('strategy="s2"')
+    positions.update(record.id, {"strategy": "s1"})
+    assert positions.count('strategy="s1"') == 4
+    assert positions.count('strategy="s2"') == 0
+    positions.delete(record.id)
+    assert positions.count('strategy="s1"') == 3
+    with pytest.raises(ClientResponseError):
+        positions.get_one(record.id)
+
+
+def test_json_fields_and_expand(client):
+    user = client.collection("users").create({"name": "tester"})
+    states = client.collection("strategyStates")
+    states.create({"user": user.id, "state_data": '{"signal": 1}'})
+    record = states.get_first_list_item(
+        f'user="{user.id}"', {"expand": "user", "sort": "-created"}
+    )
+    assert record.state_data == {"signal": 1}
+    assert record.expand["user"].name == "tester"
+
+
+def test_realtime_events():
+    client = MemoryPocketBase()
+    deals = client.collection("deals")
+    events = []
+    deals.subscribe(lambda e: events.append((e.action, e.record.volume)))
+    record = deals.create({"volume": 1})
+    deals.update(record.id, {"volume": 2})
+    deals.delete(record.id)
+    client.wait_for_events()
+    assert events == [("create", 1), ("update", 2), ("delete", 2)]
+
+
+def test_concurrent_writes(client):
+    deals = client.collection("deals")
+
+    def write(user):
+        for i in range(500):
+            deals.create({"user": user, "volume": i})
+
+    threads = [threading.Thread(target=write, args=(f"u{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert deals.count() == 4000
+    assert deals.count('user="u3" && volume >= 250') == 250
+    assert len({r.id for r in deals.get_full_list()}) == 4000
+
+
+def test_index_matches_full_scan_across_types(client):
+    positions = client.collection("strategyPositions")
+    positions.create({"strategy": "123", "volume": 1})
+    positions.create({"strategy": 123, "volume": 2})
+    positions.create({"strategy": True, "volume": 3})
+    positions.create({"volume": 4})
+
+    def volumes(f):
+        records = positions.get_full_list(query_params={"filter": f})
+        return [r.volume for r in records]
+
+    # 等值索引与逐条比较（作用于非索引字段的同样条件）结果一致
+    for literal in ['"123"', "123", '"true"', "true", '""']:
+        scan = volumes(f"strategy={literal} || volume<0")
+        assert volumes(f"strategy={literal}") == scan
+    assert volumes("strategy=123") == [1, 2]
+    assert volumes('strategy=""') == [4]
+    positions.delete(positions.get_first_list_item("volume=4").id)
+    assert volumes('strategy=""') == []
+
+
+def test_expand_reads_related_under_lock(client):
+    users = client.collection("users")
+    user = users.create({"name": "tester"})
+    states = client.collection("strategyStates")
+    states.create({"user": user.id, "state_data": "{}"})
+    acquired = []
+
+    class RecordingLock:
+        def __init__(self, lock):
+            self.lock = lock
+
+        def __enter__(self):
+            acquired.append(True)
+            return self.lock.__enter__()
+
+        def __exit__(self, *args):
+            return self.lock.__exit__(*args)
+
+    users._lock = RecordingLock(users._lock)
+    record = states.get_first_list_item(f'user="{user.id}"', {"expand": "user"})
+    assert record.expand["user"].name == "tester"
+    assert acquired
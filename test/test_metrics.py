@@ -0,0 +1,106 @@
+# test_metrics.py
+# 指标的直方图分桶、Prometheus文本导出和子序列删除测试
+
+import math
+
+import numpy as np
+import pytest
+
+from src.utils.metrics import (
+    HISTOGRAM_UNIT,
+    SUB_BUCKETS,
+    QUANTILES,
+    MetricsRegistry,
+    _HistogramSeries,
+)
+
+
+def test_bucket_boundaries():
+    # 小于最小精度的值计入第一个桶
+    assert _HistogramSeries.bucket_index(0.0) == 0
+    assert _HistogramSeries.bucket_index(HISTOGRAM_UNIT / 2) == 0
+    assert _HistogramSeries.bucket_upper(0) == HISTOGRAM_UNIT
+    for exponent in range(1, 30):
+        for sub in range(SUB_BUCKETS):
+            index = exponent * SUB_BUCKETS + sub
+            upper = _HistogramSeries.bucket_upper(index)
+            # 上界属于下一个桶，上界以下的值属于本桶
+            assert _HistogramSeries.bucket_index(upper) == index + 1
+            assert _HistogramSeries.bucket_index(upper * (1 - 1e-12)) == index
+    # 2的幂恰好是区间的第一个桶
+    for k in range(20):
+        assert _HistogramSeries.bucket_index(2.0**k * HISTOGRAM_UNIT) == (
+            (k + 1) * SUB_BUCKETS
+        )
+
+
+def test_bucket_relative_error():
+    rng = np.random.default_rng(0)
+    for value in rng.uniform(-6, 2, 2000):
+        value = 10.0**value
+        upper = _HistogramSeries.bucket_upper(_HistogramSeries.bucket_index(value))
+        assert value < upper <= value * (1 + 1 / SUB_BUCKETS) + HISTOGRAM_UNIT
+
+
+def test_histogram_quantiles():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "耗时")
+    for value in range(1, 1001):
+        histogram.observe(value / 1000)
+    assert histogram.count() == 1000
+    for q in (0.5, 0.9, 0.99):
+        assert histogram.quantile(q) == pytest.approx(q, rel=1 / SUB_BUCKETS)
+    assert histogram.quantile(1.0) == 1.0
+    assert math.isnan(registry.histogram("empty_seconds", "空").quantile(0.5))
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_events", "事件数", ["name"])
+    counter.inc(name='a"b\\c\nd')
+    counter.inc(2, name="plain")
+    gauge = registry.gauge("test_depth", "队列长度", ["queue"])
+    gauge.set(float("inf"), queue="bar")
+    gauge.set_function(lambda: 3, queue="deal")
+    gauge.set_function(lambda: 1 / 0, queue="broken")
+    histogram = registry.histogram("test_seconds", "耗时", ["handler"])
+    histogram.observe(0.5, handler="on_bar")
+    histogram.observe(1.5, handler="on_bar")
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP test_events 事件数", "# TYPE test_events counter"]
+    assert 'test_events_total{name="a\\"b\\\\c\\nd"} 1.0' in lines
+    assert 'test_events_total{name="plain"} 2.0' in lines
+    assert "# TYPE test_depth gauge" in lines
+    assert 'test_depth{queue="bar"} +Inf' in lines
+    assert 'test_depth{queue="deal"} 3.0' in lines
+    assert 'test_depth{queue="broken"} NaN' in lines
+    assert "# TYPE test_seconds summary" in lines
+    for q in QUANTILES:
+        value = histogram.quantile(q, handler="on_bar")
+        assert f'test_seconds{{handler="on_bar",quantile="{q}"}} {value!r}' in lines
+    assert 'test_seconds_sum{handler="on_bar"} 2.0' in lines
+    assert 'test_seconds_count{handler="on_bar"} 2' in lines
+
+
+def test_remove_series():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("test_depth", "队列长度", ["strategy_id", "queue"])
+    gauge.set(1, strategy_id="s1", queue="bar")
+    gauge.set(2, strategy_id="s2", queue="bar")
+    gauge.remove(strategy_id="s1", queue="bar")
+    # 删除不存在的序列不报错，标签不全时报错
+    gauge.remove(strategy_id="s1", queue="bar")
+    with pytest.raises(ValueError):
+        gauge.remove(strategy_id="s1")
+    assert gauge.value(strategy_id="s1", queue="bar") is None
+    text = registry.render()
+    assert "s1" not in text
+    assert 'test_depth{strategy_id="s2",queue="bar"} 2' in text
+
+
+def test_registry_reuses_metrics():
+    registry = MetricsRegistry()
+    assert registry.counter("test_total", "计数") is registry.counter("test_total", "")
+    with pytest.raises(ValueError):
+        registry.gauge("test_total", "计数")
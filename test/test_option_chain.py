@@ -0,0 +1,379 @@
+# test_option_chain.py
+# OptionChain排序数组构建及二分查找选约与原实现的一致性测试
+
+import random
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from benchmarks.stand_ins import MemoryDataFeed, make_option_instruments
+from utils.option import MarketOptionChain, OptionChain, OptionContract
+
+LINKS = ["prev_strike", "next_strike", "prev_expiry", "next_expiry", "counterpart"]
+SEEDS = range(6)
+
+
+def legacy_build(df):
+    """原OptionChain._build_chain_structure的逐行实现，合约以合约代码表示"""
+    all_expire_dates = sorted(set(df["ExpireDate"]))
+    strikes = dict(zip(df["InstrumentID"], df["OptExercisePrice"]))
+    monthly = {
+        row.InstrumentID: all_expire_dates.index(row.ExpireDate)
+        for row in df.itertuples()
+    }
+    links = {instrument_id: dict.fromkeys(LINKS) for instrument_id in monthly}
+
+    strike_chains = {}
+    for (expire_date, option_type), group_df in df.groupby(["ExpireDate", "OptType"]):
+        chain = group_df.sort_values("OptExercisePrice")["InstrumentID"].tolist()
+        strike_chains[(expire_date, option_type)] = chain
+        for prev, current in zip(chain, chain[1:]):
+            links[current]["prev_strike"] = prev
+            links[prev]["next_strike"] = current
+
+    expiry_chains = {}
+    for (strike_price, option_type), group_df in df.groupby(
+        ["OptExercisePrice", "OptType"]
+    ):
+        expire_to_contract = dict(zip(group_df["ExpireDate"], group_df["InstrumentID"]))
+        expiry_chains[(strike_price, option_type)] = [
+            expire_to_contract[expire_date]
+            for expire_date in all_expire_dates
+            if expire_date in expire_to_contract
+        ]
+        for i, expire_date in enumerate(all_expire_dates):
+            if expire_date not in expire_to_contract:
+                continue
+            current = expire_to_contract[expire_date]
+            if i > 0 and all_expire_dates[i - 1] in expire_to_contract:
+                links[current]["prev_expiry"] = expire_to_contract[
+                    all_expire_dates[i - 1]
+                ]
+            if (
+                i < len(all_expire_dates) - 1
+                and all_expire_dates[i + 1] in expire_to_contract
+            ):
+                links[current]["next_expiry"] = expire_to_contract[
+                    all_expire_dates[i + 1]
+                ]
+
+    for _, group_df in df.groupby(["ExpireDate", "OptExercisePrice"]):
+        calls = group_df.loc[group_df["OptType"] == "CALL", "InstrumentID"].tolist()
+        puts = group_df.loc[group_df["OptType"] == "PUT", "InstrumentID"].tolist()
+        for call in calls:
+            for put in puts:
+                links[call]["counterpart"] = put
+                links[put]["counterpart"] = call
+
+    return SimpleNamespace(
+        df=df,
+        expire_dates=all_expire_dates,
+        strikes=strikes,
+        monthly=monthly,
+        strike_chains=strike_chains,
+        expiry_chains=expiry_chains,
+        links=links,
+    )
+
+
+def legacy_atm_contracts(legacy, underlying_price, expire_date=None):
+    """原OptionChain.get_atm_contracts"""
+    df = legacy.df
+    if expire_date is None:
+        expire_date = legacy.expire_dates[0]
+    strikes = sorted(set(df[df["ExpireDate"] == expire_date]["OptExercisePrice"]))
+    if not strikes:
+        return None, {}
+    atm_strike = min(strikes, key=lambda x: abs(x - underlying_price))
+    result = {}
+    for option_type in ("CALL", "PUT"):
+        for instrument_id in legacy.expiry_chains.get((atm_strike, option_type), []):
+            if legacy.monthly[instrument_id] == legacy.expire_dates.index(expire_date):
+                result[option_type] = instrument_id
+                break
+    return atm_strike, result
+
+
+def legacy_moneyness(legacy, price, moneyness_range, expire_date, option_type):
+    """原BaseDataFeed.get_option_contract_by_moneyness中的价值度筛选"""
+    valid = []
+    for instrument_id in legacy.strike_chains.get((expire_date, option_type), []):
+        strike = legacy.strikes[instrument_id]
+        moneyness = price / strike if option_type == "CALL" else strike / price
+        if moneyness_range[0] <= moneyness <= moneyness_range[1]:
+            valid.append(instrument_id)
+    valid.sort(key=lambda instrument_id: legacy.strikes[instrument_id])
+    return valid
+
+
+def legacy_contract_by_moneyness(
+    legacy, price, moneyness_range, monthly, is_call, need_higher_strike
+):
+    """原BaseDataFeed.get_option_contract_by_moneyness"""
+    if monthly >= len(legacy.expire_dates):
+        return None
+    expire_date = legacy.expire_dates[monthly]
+    option_type = "CALL" if is_call else "PUT"
+    valid = legacy_moneyness(legacy, price, moneyness_range, expire_date, option_type)
+    if not valid:
+        return None
+    instrument_id = valid[-1] if need_higher_strike else valid[0]
+    exchange_id = legacy.df.loc[
+        legacy.df["InstrumentID"] == instrument_id, "ExchangeID"
+    ].item()
+    return f"{instrument_id}.{exchange_id}"
+
+
+def chain_frames(seed):
+    """按MarketOptionChain的规则拆分出各品种的标准和非标准合约"""
+    instruments = make_option_instruments(seed, strikes_per_side=6)
+    for underlying_code, group_df in instruments.groupby("OptUndlCode"):
+        standard = group_df["VolumeMultiple"] == 10000
+        for chain_type, df in (
+            ("standard", group_df[standard]),
+            ("non_standard", group_df[~standard]),
+        ):
+            if not df.empty:
+                yield underlying_code, chain_type, df
+
+
+def chains(seed):
+    for underlying_code, chain_type, df in chain_frames(seed):
+        yield OptionChain(df, underlying_code, chain_type), legacy_build(df)
+
+
+def ids(contracts):
+    return [contract.instrument_id for contract in contracts]
+
+
+def sample_prices(rng, strikes, count=40):
+    """随机价格，包含恰好等于行权价和两档行权价中点的价格"""
+    strikes = sorted(set(strikes))
+    prices = [strikes[0] - 0.3, strikes[-1] + 0.3]
+    for _ in range(count):
+        i = rng.randrange(len(strikes) - 1) if len(strikes) > 1 else 0
+        prices.append(
+            rng.choice(
+                [
+                    strikes[i],
+                    (strikes[i] + strikes[min(i + 1, len(strikes) - 1)]) / 2,
+                    rng.uniform(strikes[0] - 0.1, strikes[-1] + 0.1),
+                ]
+            )
+        )
+    return prices
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_build_matches_legacy(seed):
+    for chain, legacy in chains(seed):
+        assert chain.get_all_expire_dates() == legacy.expire_dates
+        assert chain.get_all_strike_prices() == sorted(set(legacy.strikes.values()))
+        assert {k: ids(v) for k, v in chain.strike_chains.items()} == (
+            legacy.strike_chains
+        )
+        assert {k: ids(v) for k, v in chain.expiry_chains.items()} == (
+            legacy.expiry_chains
+        )
+        for instrument_id, contract in chain.contracts.items():
+            assert contract.monthly == legacy.monthly[instrument_id]
+            for name in LINKS:
+                linked = getattr(contract, name)
+                expected = legacy.links[instrument_id][name]
+                assert (linked and linked.instrument_id) == expected, name
+
+
+def test_build_with_missing_contracts():
+    # 固定种子下的合约表同时包含非标合约和缺失的合约
+    instruments = make_option_instruments(0, strikes_per_side=6)
+    counts = instruments.groupby(["OptUndlCode", "ExpireDate", "OptExercisePrice"])
+    assert (instruments["VolumeMultiple"] != 10000).any()
+    assert (counts.size() % 2 == 1).any()
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_atm_matches_legacy(seed):
+    rng = random.Random(seed)
+    for chain, legacy in chains(seed):
+        for expire_date in [None] + legacy.expire_dates:
+            for price in sample_prices(rng, legacy.strikes.values(), 10):
+                atm_strike, expected = legacy_atm_contracts(legacy, price, expire_date)
+                assert chain.get_atm_strike(price, expire_date) == atm_strike
+                contracts = chain.get_atm_contracts(price, expire_date)
+                assert {k: v.instrument_id for k, v in contracts.items()} == expected
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_contract_by_strike(seed):
+    for chain, legacy in chains(seed):
+        for (expire_date, option_type), chain_ids in legacy.strike_chains.items():
+            for instrument_id in chain_ids:
+                contract = chain.get_contract_by_strike(
+                    expire_date, option_type, legacy.strikes[instrument_id]
+                )
+                assert contract.instrument_id == instrument_id
+            # 不存在的行权价和到期日
+            assert chain.get_contract_by_strike(expire_date, option_type, 0.01) is None
+        assert chain.get_contract_by_strike(19990101, "CALL", 3.0) is None
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_nearest_and_strike_range(seed):
+    rng = random.Random(seed)
+    for chain, legacy in chains(seed):
+        for (expire_date, option_type), chain_ids in legacy.strike_chains.items():
+            strikes = [legacy.strikes[i] for i in chain_ids]
+            for price in sample_prices(rng, strikes, 10):
+                count = rng.randint(1, len(chain_ids) + 1)
+                # 距离相同时取较低的行权价
+                nearest = sorted(
+                    range(len(strikes)),
+                    key=lambda i: (abs(strikes[i] - price), strikes[i]),
+                )[:count]
+                expected = [chain_ids[i] for i in sorted(nearest)]
+                actual = chain.get_nearest_contracts(
+                    price, expire_date, option_type, count
+                )
+                assert ids(actual) == expected
+
+                low, high = sorted([price, price + rng.uniform(-0.3, 0.3)])
+                for min_strike, max_strike in [(low, high), (None, high), (low, None)]:
+                    expected = [
+                        instrument_id
+                        for instrument_id in chain_ids
+                        if (min_strike is None or legacy.strikes[instrument_id] >= low)
+                        and (
+                            max_strike is None or legacy.strikes[instrument_id] <= high
+                        )
+                    ]
+                    actual = chain.get_contracts_by_strike_range(
+                        expire_date, option_type, min_strike, max_strike
+                    )
+                    assert ids(actual) == expected
+        assert chain.get_nearest_contracts(3.0, 19990101, "CALL") == []
+        assert chain.get_contracts_by_strike_range(19990101, "CALL") == []
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_moneyness_matches_legacy(seed):
+    rng = random.Random(seed)
+    for chain, legacy in chains(seed):
+        for (expire_date, option_type), chain_ids in legacy.strike_chains.items():
+            strikes = [legacy.strikes[i] for i in chain_ids]
+            for price in sample_prices(rng, strikes, 10):
+                strike = rng.choice(strikes)
+                # 恰好落在边界上的价值度
+                edge = price / strike if option_type == "CALL" else strike / price
+                for moneyness_range in [
+                    (rng.uniform(0.8, 1.0), rng.uniform(1.0, 1.2)),
+                    (edge, edge),
+                    (edge, 1.3),
+                    (0.7, edge),
+                    (0.0, 10.0),
+                ]:
+                    expected = legacy_moneyness(
+                        legacy, price, moneyness_range, expire_date, option_type
+                    )
+                    actual = chain.get_contracts_by_moneyness(
+                        price, moneyness_range, expire_date, option_type
+                    )
+                    assert ids(actual) == expected
+
+
+def test_get_expire_date():
+    chain, legacy = next(chains(0))
+    count = len(legacy.expire_dates)
+    for monthly in range(-count, count):
+        assert chain.get_expire_date(monthly) == legacy.expire_dates[monthly]
+    # 越界的索引返回None（原实现负数越界时抛出IndexError）
+    assert chain.get_expire_date(count) is None
+    assert chain.get_expire_date(-count - 1) is None
+
+
+@pytest.mark.parametrize("seed", [0, 3])
+def test_datafeed_contract_by_moneyness(seed):
+    rng = random.Random(seed)
+    datafeed = MemoryDataFeed(
+        seed=seed, instruments=make_option_instruments(seed, strikes_per_side=6)
+    )
+    for underlying_code, chain_type, df in chain_frames(seed):
+        legacy = legacy_build(df)
+        undl = f"{underlying_code}.{df['OptUndlMarket'].iloc[0]}"
+        for price in sample_prices(rng, legacy.strikes.values(), 10):
+            moneyness_range = (rng.uniform(0.8, 1.0), rng.uniform(1.0, 1.2))
+            for monthly in range(-len(legacy.expire_dates), 5):
+                for is_call in (True, False):
+                    for need_higher_strike in (True, False):
+                        expected = legacy_contract_by_moneyness(
+                            legacy,
+                            price,
+                            moneyness_range,
+                            monthly,
+                            is_call,
+                            need_higher_strike,
+                        )
+                        actual = datafeed.get_option_contract_by_moneyness(
+                            price,
+                            moneyness_range,
+                            monthly,
+                            undl,
+                            is_call,
+                            need_higher_strike,
+                            chain_type,
+                        )
+                        assert actual == expected
+
+
+def test_build_with_datetime_expire_dates():
+    # 到期日为日期类型时，合约和链的键与DataFrame中取出的pd.Timestamp一致
+    for underlying_code, chain_type, df in chain_frames(1):
+        df = df.assign(ExpireDate=pd.to_datetime(df["ExpireDate"].astype(str)))
+        chain, legacy = OptionChain(df, underlying_code, chain_type), legacy_build(df)
+        assert chain.get_all_expire_dates() == legacy.expire_dates
+        assert {k: ids(v) for k, v in chain.strike_chains.items()} == (
+            legacy.strike_chains
+        )
+        for contract in chain.contracts.values():
+            assert type(contract.expire_date) is pd.Timestamp
+            assert type(contract.data["ExpireDate"]) is pd.Timestamp
+            assert contract.expire_day == contract.expire_date.date()
+
+
+def test_contract_from_dict():
+    row = make_option_instruments(0, strikes_per_side=1).iloc[0].to_dict()
+    row["ExpireDate"] = pd.Timestamp(str(row["ExpireDate"]))
+    row["monthly"] = 2
+    contract = OptionContract(row)
+    assert contract.data is row
+    assert contract.instrument_id == row["InstrumentID"]
+    assert contract.expire_date is row["ExpireDate"]
+    assert contract.expire_day == row["ExpireDate"].date()
+    assert contract.monthly == 2 and contract.volume_multiple == row["VolumeMultiple"]
+    assert contract.symbol == f"{row['InstrumentID']}.{row['ExchangeID']}"
+    assert OptionContract.from_dict(row).data is row
+
+
+def test_market_contract_index():
+    instruments = make_option_instruments(2, strikes_per_side=3)
+    market = MarketOptionChain(instruments)
+    expected = [
+        contract
+        for chains_by_type in market.option_chains.values()
+        for chain in chains_by_type.values()
+        for contract in chain.contracts.values()
+    ]
+    assert market.contracts == expected
+    # 每个合约以合约代码和"合约代码.交易所"两个键各索引一次
+    assert len(market.contract_index) == 2 * len(instruments)
+    for row in instruments.itertuples():
+        contract = market.contract_index[row.InstrumentID]
+        assert contract.instrument_id == row.InstrumentID
+        assert market.contract_index[f"{row.InstrumentID}.{row.ExchangeID}"] is (
+            contract
+        )
+        assert market.get_contract_by_id(row.InstrumentID) is contract
+        assert market.get_contract_by_id(contract.symbol) is contract
+        assert market.contracts[contract.index] is contract
+    assert market.get_contract_by_id("99999999") is None
+    assert market.get_contract_by_id(f"{instruments['InstrumentID'][0]}.SZ") is None
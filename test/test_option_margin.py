@@ -0,0 +1,80 @@
+# test_option_margin.py
+# calculate_margin_array与逐合约calculate_margin的一致性测试
+
+import numpy as np
+import pytest
+
+from src.utils.option import calculate_margin, calculate_margin_array
+
+
+def random_contracts(n, seed):
+    rng = np.random.default_rng(seed)
+    return {
+        "option_type": rng.choice(["c", "p", "C", "P"], n),
+        "market_price": rng.uniform(0.0001, 0.5, n).round(4),
+        "underlying_price": rng.uniform(2.0, 5.0, n).round(3),
+        "strike_price": rng.uniform(2.0, 5.0, n).round(2),
+        "contract_multiplier": rng.choice([10000, 10265, 10150], n),
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_scalar(seed):
+    contracts = random_contracts(2000, seed)
+    actual = calculate_margin_array(**contracts)
+    # 以Python原生类型调用，与calculate_risk中的用法一致
+    expected = [
+        calculate_margin(*values)
+        for values in zip(
+            contracts["option_type"].tolist(),
+            contracts["market_price"].tolist(),
+            contracts["underlying_price"].tolist(),
+            contracts["strike_price"].tolist(),
+            contracts["contract_multiplier"].tolist(),
+        )
+    ]
+    np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("margin_coeff,min_coeff", [(0.12, 0.07), (0.15, 0.1)])
+def test_coefficients_and_broadcast(margin_coeff, min_coeff):
+    strikes = np.array([2.8, 3.0, 3.2])
+    actual = calculate_margin_array(
+        "p", 0.05, 3.0, strikes, 10000, margin_coeff, min_coeff
+    )
+    expected = [
+        calculate_margin("p", 0.05, 3.0, strike, 10000, margin_coeff, min_coeff)
+        for strike in strikes.tolist()
+    ]
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_half_cent_rounding():
+    # 1467.895在二进制下略小于半分，round()结果为1467.89
+    expected = calculate_margin("p", 0.031, 2.0, 1.6, 10265)
+    actual = calculate_margin_array(["p"], [0.031], [2.0], [1.6], [10265])
+    assert actual[0] == expected
+
+
+@pytest.mark.parametrize(
+    "value",
+    [0.125, 0.375, 1.005, 1.015, 2.675, 0.285, 8.345, 1467.895, 123456.785],
+)
+def test_ties_match_round(value):
+    # 行权价和标的价格为0、合约单位为1时保证金等于market_price本身
+    # 前两个是二进制下精确的半分（银行家舍入），其余略大于或略小于半分
+    actual = calculate_margin_array(["p"], [value], 0.0, 0.0, 1)
+    assert actual[0] == calculate_margin("p", value, 0.0, 0.0, 1) == round(value, 2)
+
+
+def test_half_cent_sweep_matches_round():
+    # 各数量级上全部xx.xx5的值
+    values = np.arange(1, 20001) / 100 + 0.005 + np.array([[0], [1000], [100000]])
+    values = values.ravel()
+    actual = calculate_margin_array("p", values, 0.0, 0.0, 1)
+    np.testing.assert_array_equal(actual, [round(v, 2) for v in values.tolist()])
+
+
+def test_invalid_option_type():
+    with pytest.raises(ValueError):
+        calculate_margin_array(["c", "x"], 0.1, 3.0, 3.0)
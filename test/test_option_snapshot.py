@@ -0,0 +1,65 @@
+# test_option_snapshot.py
+# 期权合约快照的保存和加载测试
+
+import os
+
+import pandas as pd
+import pytest
+
+from benchmarks.stand_ins import make_option_instruments
+from utils.option_snapshot import (
+    load_option_snapshot,
+    save_option_snapshot,
+    snapshot_key,
+)
+
+DATE = pd.Timestamp("2026-10-19")
+
+
+def mapped_files(path):
+    """当前进程内存映射的、位于path下的文件"""
+    with open("/proc/self/maps") as f:
+        return {line.split()[-1] for line in f if str(path) in line}
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    df = make_option_instruments(0, today=DATE, strikes_per_side=3)
+    save_option_snapshot(df, DATE, tmp_path)
+    return df, tmp_path
+
+
+def test_round_trip(snapshot):
+    df, path = snapshot
+    assert (path / snapshot_key(DATE) / "meta.json").exists()
+    loaded = load_option_snapshot(DATE, path)
+    pd.testing.assert_frame_equal(loaded, df, check_dtype=False)
+
+
+def test_mapped_columns_are_read_only(snapshot):
+    df, path = snapshot
+    loaded = load_option_snapshot(DATE, path, copy_columns=["OptExercisePrice"])
+    with pytest.raises(ValueError):
+        loaded.loc[0, "VolumeMultiple"] = 1
+    # 读入内存的列可以原地修改，不影响快照文件
+    loaded.loc[0, "OptExercisePrice"] = 0.0
+    reloaded = load_option_snapshot(DATE, path)
+    assert reloaded["OptExercisePrice"].iloc[0] == df["OptExercisePrice"].iloc[0]
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="需要/proc/self/maps")
+def test_columns_are_memory_mapped(snapshot):
+    df, path = snapshot
+    key = path / snapshot_key(DATE)
+    names = list(df.columns)
+    mapped = str(key / f"{names.index('VolumeMultiple')}.npy")
+    copied = str(key / f"{names.index('OptExercisePrice')}.npy")
+    loaded = load_option_snapshot(DATE, path, copy_columns=["OptExercisePrice"])
+    files = mapped_files(path)
+    assert mapped in files
+    assert copied not in files
+    del loaded
+
+
+def test_missing_snapshot(tmp_path):
+    assert load_option_snapshot("2026-10-19", tmp_path) is None
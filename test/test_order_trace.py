@@ -0,0 +1,152 @@
+# test_order_trace.py
+# 订单链路从下单备注到成交处理的各阶段记录，以及/traces接口测试
+
+import threading
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+from pocketbase.services.realtime_service import MessageData
+
+import benchmarks  # noqa: F401  将src加入sys.path
+from strategies import manager
+from strategies.base import BaseStrategy
+from utils import order_trace
+from utils.metrics import start_metrics_server
+from utils.order_trace import STAGES, order_traces, trace_id_from_remark
+
+
+class CommandDataFeed:
+    """记录交易指令的数据源"""
+
+    def __init__(self):
+        self.commands = []
+
+    def subscribe(self, symbol, period, callback):
+        pass
+
+    def create_trade_command(self, data):
+        self.commands.append(data)
+
+
+class TraceStrategy(BaseStrategy):
+    def __init__(self):
+        super().__init__(
+            CommandDataFeed(),
+            "teststrategy001",
+            "test",
+            {"period": 1, "symbol": "510050"},
+        )
+        self.deals = []
+        self.processed = threading.Event()
+        # 不做账户重估，等待超时后处理线程可以检查_running退出
+        self.strategy_account = SimpleNamespace(
+            revaluation_wait_time=lambda window: 0.05,
+            flush_revaluation=lambda: None,
+        )
+
+    def on_bar(self, symbol, period, bar):
+        pass
+
+    def on_deal(self, deal_info):
+        self.deals.append(deal_info)
+        self.processed.set()
+
+    def _update_strategy_info(self, deal_record):
+        pass
+
+
+@pytest.fixture
+def strategy(monkeypatch):
+    order_traces.clear()
+    strategy = TraceStrategy()
+    monkeypatch.setattr(manager, "running_strategies", {strategy.strategy_id: strategy})
+    yield strategy
+    order_traces.clear()
+
+
+def deal_event(remark):
+    record = SimpleNamespace(remark=remark, instrument_id="10000001", volume=1)
+    return MessageData("create", record)
+
+
+def test_trace_lifecycle(strategy):
+    strategy.buy_open("10000001.SHO", 1, "10000002.SHO")
+    remark = strategy.datafeed.commands[0]["userOrderId"]
+    trace_id = trace_id_from_remark(remark)
+    trace = order_traces.get(trace_id)
+    assert trace.strategy_id == strategy.strategy_id
+    assert trace.instrument_id == "10000001.SHO"
+    assert list(trace.times) == ["signal", "command_created", "pb_ack"]
+
+    # 成交回报由manager按备注分发并记录收到时间
+    manager.on_deal_event(deal_event(remark))
+    assert "deal_received" in trace.times
+    assert trace.deals == 1
+    assert strategy._deal_queue.qsize() == 1
+
+    strategy._running = True
+    thread = threading.Thread(target=strategy._run_deal_processor, daemon=True)
+    thread.start()
+    assert strategy.processed.wait(5)
+    strategy._running = False
+    thread.join(5)
+
+    assert list(trace.times) == list(STAGES)
+    times = [trace.times[stage] for stage in STAGES]
+    assert times == sorted(times)
+    assert set(trace.latencies()) == set(STAGES[1:])
+
+    # 部分成交：成交笔数增加，已记录的阶段时间不变
+    received = trace.times["deal_received"]
+    manager.on_deal_event(deal_event(remark))
+    assert trace.deals == 2
+    assert trace.times["deal_received"] == received
+
+    row = order_traces.to_frame().iloc[0]
+    assert row["trace_id"] == trace_id and row["deals"] == 2
+    assert row["total"] == pytest.approx((times[-1] - times[0]) * 1000)
+
+
+def test_unknown_remarks_are_ignored(strategy):
+    # 没有追踪ID或重启前下的单不创建追踪
+    manager.on_deal_event(deal_event(""))
+    manager.on_deal_event(deal_event(f"{strategy.strategy_id}|unknown|"))
+    assert len(order_traces) == 0
+    assert order_traces.mark(None, "deal_received") is None
+    with pytest.raises(ValueError):
+        order_traces.mark("unknown", "filled")
+
+
+def request(server, path, method="GET"):
+    host, port = server.server_address
+    req = urllib.request.Request(f"http://{host}:{port}{path}", method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return response.status, response.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode("utf-8")
+
+
+def test_traces_endpoint_only_dumps_on_post(strategy, monkeypatch, tmp_path):
+    monkeypatch.setattr(order_trace, "logs_dir", str(tmp_path))
+    strategy.buy_open("10000001.SHO", 1)
+    server = start_metrics_server(port=0)
+    try:
+        status, text = request(server, "/traces?dump=1&by=instrument_id")
+        assert status == 200
+        assert "10000001.SHO" in text and "pb_ack" in text
+        assert list(tmp_path.iterdir()) == []
+
+        status, _ = request(server, "/traces?by=user")
+        assert status == 400
+        assert request(server, "/traces/dump")[0] == 405
+
+        status, text = request(server, "/traces/dump", method="POST")
+        assert status == 200
+        files = list(tmp_path.iterdir())
+        assert len(files) == 1 and text.strip() == str(files[0])
+    finally:
+        server.shutdown()
+        server.server_close()
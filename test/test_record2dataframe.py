@@ -0,0 +1,80 @@
+# test_record2dataframe.py
+# record2dataframe与原逐条dir()实现的一致性测试
+
+import pandas as pd
+from pocketbase.models import Record
+
+from src.utils.common import record2dataframe
+
+
+def legacy_record2dataframe(records):
+    """原record2dataframe的逐条实现"""
+    values = []
+    for record in records:
+        values.append(
+            {
+                name: getattr(record, name)
+                for name in dir(record)
+                if not name.startswith("_")
+                and name
+                not in [
+                    "collection_id",
+                    "collection_name",
+                    "is_new",
+                    "load",
+                    "load_expanded",
+                    "parse_expanded",
+                    "expand",
+                ]
+            }
+        )
+    if len(values) == 0:
+        return pd.DataFrame()
+    return pd.DataFrame(values)
+
+
+def make_records(count, extra=None):
+    records = []
+    for i in range(count):
+        data = {
+            "id": f"{i:015d}",
+            "collectionId": "pbc_positions",
+            "collectionName": "strategyPositions",
+            "created": f"2025-06-06 09:{i // 60 % 60:02d}:{i % 60:02d}.123Z",
+            "updated": f"2025-06-06 09:{i // 60 % 60:02d}:{i % 60:02d}.456Z",
+            "strategy": "s1",
+            "instrumentId": str(10000000 + i % 40),
+            "direction": 1 if i % 2 else -1,
+            "volume": i % 7,
+            "openPrice": 0.05 + i * 1e-5,
+        }
+        if extra and i % 2:
+            data.update(extra)
+        records.append(Record(data))
+    return records
+
+
+def test_same_as_legacy():
+    records = make_records(500)
+    expected = legacy_record2dataframe(records)
+    pd.testing.assert_frame_equal(record2dataframe(records), expected)
+    # 第二次命中字段缓存
+    pd.testing.assert_frame_equal(record2dataframe(records[:10]), expected[:10])
+
+
+def test_mixed_fields():
+    records = make_records(20, extra={"commission": 1.8})
+    result = record2dataframe(records)
+    pd.testing.assert_frame_equal(result, legacy_record2dataframe(records))
+    assert result["commission"].isna().sum() == 10
+    # 字段变化后再转换完整记录不受缓存影响
+    pd.testing.assert_frame_equal(
+        record2dataframe(records[1::2]), legacy_record2dataframe(records[1::2])
+    )
+
+
+def test_empty():
+    assert record2dataframe([]).empty
+    assert pd.api.types.is_datetime64_any_dtype(
+        record2dataframe(make_records(1))["created"]
+    )
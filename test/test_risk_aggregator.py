@@ -0,0 +1,121 @@
+# test_risk_aggregator.py
+# 跨策略风险汇总的对冲合计、保证金、指标导出和/risk接口测试
+
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import benchmarks  # noqa: F401  将src加入sys.path
+from strategies import manager
+from strategies.risk_aggregator import RISK_GAUGES, RiskAggregator
+from utils.metrics import _ENDPOINTS
+
+# 每张合约的风险指标
+RISKS = {
+    "10000001": dict(delta=0.5, gamma=0.2, vega=0.1, theta=-0.05, margin=3000.0),
+    "10000002": dict(delta=-0.4, gamma=0.3, vega=0.2, theta=-0.02, margin=2500.0),
+    "90000001": dict(delta=0.6, gamma=0.1, vega=0.3, theta=-0.01, margin=4000.0),
+}
+UNDERLYING = {"10000001": "510050", "10000002": "510050", "90000001": "159915"}
+
+
+class FakeDataFeed:
+    def __init__(self):
+        self.requests = []
+
+    def calculate_risk(self, symbols):
+        self.requests.append(list(symbols))
+        return [{"instrument_id": s, **RISKS[s]} for s in symbols if s in RISKS]
+
+    def get_option_contract_by_id(self, instrument_id):
+        return SimpleNamespace(underlying_code=UNDERLYING[instrument_id])
+
+
+def fake_strategy(strategy_id, user_id, rows):
+    frame = pd.DataFrame(rows, columns=["instrument_id", "direction", "volume"])
+    return SimpleNamespace(
+        strategy_id=strategy_id,
+        user_id=user_id,
+        strategy_positions=SimpleNamespace(to_frame=lambda: frame),
+    )
+
+
+@pytest.fixture
+def aggregator():
+    strategies = {
+        "s1": fake_strategy("s1", "u1", [("10000001", 1, 2), ("10000002", -1, 1)]),
+        "s2": fake_strategy("s2", "u2", [("10000001", -1, 2), ("90000001", -1, 1)]),
+    }
+    aggregator = RiskAggregator(FakeDataFeed(), strategies)
+    yield aggregator
+    # 清除导出的序列，不影响其他测试
+    aggregator.strategies.clear()
+    aggregator.compute()
+
+
+def test_netted_greeks_and_margin(aggregator):
+    report = aggregator.compute()
+    # 所有策略持仓合约的并集只计算一次
+    assert [sorted(r) for r in aggregator.datafeed.requests] == [
+        ["10000001", "10000002", "90000001"]
+    ]
+
+    s1 = report.by_strategy.loc["s1"]
+    assert s1["delta"] == pytest.approx(0.5 * 2 + 0.4)
+    assert s1["gamma"] == pytest.approx(0.2 * 2 - 0.3)
+    # 只有义务仓收取保证金
+    assert s1["margin"] == pytest.approx(2500.0)
+    s2 = report.by_strategy.loc["s2"]
+    assert s2["delta"] == pytest.approx(-0.5 * 2 - 0.6)
+    assert s2["margin"] == pytest.approx(3000.0 * 2 + 4000.0)
+
+    # 两个策略在10000001上的权利仓和义务仓相互抵消
+    etf50 = report.by_underlying.loc["510050"]
+    assert etf50["delta"] == pytest.approx(0.4)
+    assert etf50["vega"] == pytest.approx(-0.2)
+    assert etf50["margin"] == pytest.approx(3000.0 * 2 + 2500.0)
+    assert report.by_user.loc["u2", "theta"] == pytest.approx(0.05 * 2 + 0.01)
+
+    total = report.total()
+    assert total["delta"] == pytest.approx(s1["delta"] + s2["delta"])
+    assert total["margin"] == pytest.approx(12500.0)
+
+
+def test_publish_removes_stale_series(aggregator):
+    aggregator.compute()
+    gauge = RISK_GAUGES["strategy"]
+    assert gauge.value(strategy_id="s2", metric="margin") == pytest.approx(10000.0)
+    del aggregator.strategies["s2"]
+    report = aggregator.compute()
+    assert gauge.value(strategy_id="s2", metric="margin") is None
+    assert list(report.by_strategy.index) == ["s1"]
+    assert RISK_GAUGES["underlying"].value(underlying="159915", metric="delta") is None
+
+
+def test_missing_risk_counts_as_zero(aggregator):
+    aggregator.strategies["s3"] = fake_strategy("s3", "u1", [("10000001", 1, 1)])
+    aggregator.datafeed.calculate_risk = lambda symbols: None
+    report = aggregator.compute()
+    assert report.by_strategy["delta"].sum() == 0
+
+
+def test_risk_endpoint(aggregator, monkeypatch):
+    endpoint = _ENDPOINTS["GET"]["/risk"]
+    monkeypatch.setattr(manager, "risk_aggregator", None)
+    assert endpoint({}) == "风险汇总尚未完成\n"
+
+    monkeypatch.setattr(manager, "risk_aggregator", aggregator)
+    aggregator.compute()
+    text = endpoint({})
+    lines = text.splitlines()
+    assert lines[0].endswith(" by strategy")
+    assert lines[1].split() == ["delta", "gamma", "vega", "theta", "margin"]
+    assert lines[2].split()[0] == "s1"
+    assert lines[-1].split()[0] == "total"
+    assert lines[-1].split()[-1] == "12500.0000"
+
+    by_user = endpoint({"by": "user"}).splitlines()
+    assert [line.split()[0] for line in by_user[2:]] == ["u1", "u2", "total"]
+    assert "510050" in endpoint({"by": "underlying"})
+    assert endpoint({"by": "month"}) == "by只能是 strategy/user/underlying\n"
@@ -0,0 +1,128 @@
+# test_sampling_profiler.py
+# 采样分析器的collapsed stack输出，以及采样请求的参数校验测试
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import benchmarks  # noqa: F401  将src加入sys.path
+from strategies import manager
+from utils.metrics import _ENDPOINTS
+from utils.sampling_profiler import SamplingProfiler
+
+
+def busy_loop(stop):
+    total = 0
+    while not stop.is_set():
+        total += sum(range(1000))
+    return total
+
+
+def test_profiler_samples_busy_thread(tmp_path):
+    stop = threading.Event()
+    busy = threading.Thread(target=busy_loop, args=(stop,), daemon=True)
+    idle = threading.Thread(target=stop.wait, daemon=True)
+    busy.start()
+    idle.start()
+    output = tmp_path / "profile.folded"
+    profiler = SamplingProfiler(
+        {"busy": busy, "idle": idle}, duration=0.5, interval=0.005, output=output
+    ).start()
+    profiler.join(5)
+    stop.set()
+    assert not profiler.running
+
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert lines
+    stacks = {}
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        stacks[stack] = int(count)
+    # 每行为 根;...;栈顶 次数，按次数从高到低排列
+    counts = list(stacks.values())
+    assert counts == sorted(counts, reverse=True)
+    assert sum(counts) == sum(profiler.stacks.values())
+    for stack in stacks:
+        frames = stack.split(";")
+        # 只记录消耗CPU的线程，阻塞在Event上的线程不出现
+        assert frames[0] == "busy"
+        assert any(
+            f.startswith("busy_loop (test_sampling_profiler.py:") for f in frames
+        )
+    assert sum(counts) <= profiler.samples
+    assert profiler.cpu_seconds > 0
+
+
+def test_profiler_stop_writes_partial_result(tmp_path):
+    stop = threading.Event()
+    busy = threading.Thread(target=busy_loop, args=(stop,), daemon=True)
+    busy.start()
+    output = tmp_path / "profile.folded"
+    profiler = SamplingProfiler(
+        {"worker": busy}, duration=60, interval=0.005, output=output, cpu_only=False
+    ).start()
+    threading.Event().wait(0.1)
+    profiler.stop()
+    profiler.join(5)
+    stop.set()
+    assert not profiler.running
+    text = output.read_text(encoding="utf-8")
+    assert text.startswith("worker;")
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"seconds": "30"},
+        {"strategy_id": "s1", "seconds": "abc"},
+        {"strategy_id": "s1", "seconds": "0"},
+        {"strategy_id": "s1", "seconds": "-5"},
+        {"strategy_id": "s1", "seconds": "nan"},
+        {"strategy_id": "s1", "seconds": "inf"},
+        {"strategy_id": "s1", "seconds": str(manager.MAX_PROFILE_SECONDS + 1)},
+    ],
+)
+def test_profile_endpoint_rejects_invalid_params(monkeypatch, params):
+    started = []
+    monkeypatch.setattr(manager, "profile_strategy", lambda *a: started.append(a))
+    with pytest.raises(ValueError):
+        manager._profile_endpoint(params)
+    assert started == []
+
+
+def test_profile_endpoint(monkeypatch):
+    started = []
+
+    def profile_strategy(strategy_id, seconds):
+        started.append((strategy_id, seconds))
+        return SimpleNamespace(output="logs/profile_s1.folded")
+
+    monkeypatch.setattr(manager, "profile_strategy", profile_strategy)
+    assert manager._profile_endpoint({"strategy_id": "s1"}) == (
+        "logs/profile_s1.folded\n"
+    )
+    manager._profile_endpoint({"strategy_id": "s1", "seconds": "2.5"})
+    assert started == [("s1", 30.0), ("s1", 2.5)]
+    assert "/profile" in _ENDPOINTS["POST"]
+    assert "/profile" not in _ENDPOINTS["GET"]
+
+
+@pytest.mark.parametrize(
+    "value, expected", [(0, None), (None, None), (15, 15.0), (-1, None), (1e6, None)]
+)
+def test_profile_request_from_record(monkeypatch, value, expected):
+    started, updates = [], []
+    monkeypatch.setattr(
+        manager, "profile_strategy", lambda *args: started.append(args[1])
+    )
+    collection = SimpleNamespace(update=lambda *args: updates.append(args))
+    monkeypatch.setattr(
+        manager,
+        "get_pb_client",
+        lambda: SimpleNamespace(collection=lambda name: collection),
+    )
+    manager._check_profile_request(SimpleNamespace(id="s1", profile_seconds=value))
+    assert started == ([] if expected is None else [expected])
+    # 有采样请求时无论是否有效都清零
+    assert updates == ([] if not value else [("s1", {"profile_seconds": 0})])
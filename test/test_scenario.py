@@ -0,0 +1,142 @@
+# test_scenario.py
+# black_scholes_price_array与py_vollib、情景网格与逐腿逐情景计算的一致性测试
+
+import numpy as np
+import pandas as pd
+import pytest
+from py_vollib.black_scholes import black_scholes
+
+from benchmarks.stand_ins import MemoryDataFeed
+from strategies.scenario import (
+    LEG_COLUMNS,
+    MARGIN_RATIO,
+    build_scenario_legs,
+    compute_scenario_grid,
+)
+from utils.option import black_scholes_price_array, calculate_margin
+
+
+def legacy_price(flag, s, k, t, r, sigma):
+    """逐合约定价，到期后取内在价值"""
+    if t <= 0:
+        return max(s - k, 0) if flag == "c" else max(k - s, 0)
+    return black_scholes(flag, s, k, t, r, sigma)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_black_scholes_price_array_matches_py_vollib(seed):
+    rng = np.random.default_rng(seed)
+    n = 2000
+    flags = rng.choice(["c", "p"], n)
+    s = rng.uniform(2.0, 5.0, n)
+    k = rng.uniform(2.0, 5.0, n)
+    t = rng.uniform(1 / 365, 1.0, n)
+    sigma = rng.uniform(0.05, 0.8, n)
+    r = rng.choice([0.0, 0.02])
+    actual = black_scholes_price_array(flags == "c", s, k, t, r, sigma)
+    expected = [
+        black_scholes(*values, r, vol)
+        for values, vol in zip(
+            zip(flags.tolist(), s.tolist(), k.tolist(), t.tolist()), sigma.tolist()
+        )
+    ]
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12)
+
+
+def test_black_scholes_price_array_expired_and_broadcast():
+    strikes = np.array([2.8, 3.0, 3.2])
+    # 到期（t<=0）时返回内在价值
+    np.testing.assert_array_equal(
+        black_scholes_price_array(True, 3.0, strikes, 0.0, 0.0, 0.2),
+        np.maximum(3.0 - strikes, 0),
+    )
+    np.testing.assert_array_equal(
+        black_scholes_price_array(False, 3.0, strikes, -0.01, 0.0, 0.2),
+        np.maximum(strikes - 3.0, 0),
+    )
+    actual = black_scholes_price_array(
+        [[True], [False]], 3.0, strikes, [0.1, 0.2, 0.3], 0.01, 0.25
+    )
+    assert actual.shape == (2, 3)
+    expected = [
+        [
+            black_scholes(flag, 3.0, strike, t, 0.01, 0.25)
+            for strike, t in zip(strikes.tolist(), [0.1, 0.2, 0.3])
+        ]
+        for flag in ("c", "p")
+    ]
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12)
+
+
+@pytest.fixture(scope="module")
+def legs():
+    datafeed = MemoryDataFeed(seed=0)
+    instrument_ids = datafeed.instruments["InstrumentID"].head(6).tolist()
+    positions = pd.DataFrame(
+        {
+            "instrument_id": instrument_ids,
+            "direction": [1, -1, -1, 1, -1, 1],
+            "volume": [1, 2, 3, 4, 5, 6],
+        }
+    )
+    return build_scenario_legs(datafeed, positions)
+
+
+def test_build_scenario_legs(legs):
+    assert legs.columns.tolist() == LEG_COLUMNS
+    assert len(legs) == 6
+    assert legs["is_call"].dtype == bool
+    assert (legs["t_days"] > 0).all()
+
+
+def test_scenario_grid_matches_per_leg_loop(legs):
+    moves = [-0.1, 0.0, 0.05]
+    shifts = [-0.5, 0.0, 0.02]  # -0.5会触发波动率下限
+    days = [0, 3, 40]  # 部分合约在40天后已到期
+    r = 0.01
+    grid = compute_scenario_grid(legs, moves, shifts, days, r)
+    assert grid.pnl.shape == grid.margin.shape == (3, 3, 3)
+
+    for i, move in enumerate(moves):
+        for j, shift in enumerate(shifts):
+            for m, day in enumerate(days):
+                pnl = margin = 0.0
+                for leg in legs.itertuples():
+                    flag = "c" if leg.is_call else "p"
+                    underlying = leg.underlying_price * (1 + move)
+                    price = legacy_price(
+                        flag,
+                        underlying,
+                        leg.strike,
+                        (leg.t_days - day) / 365.0,
+                        r,
+                        max(leg.sigma + shift, 1e-4),
+                    )
+                    volume = leg.volume * leg.direction
+                    pnl += (price - leg.price) * leg.vol_mul * volume
+                    if leg.direction < 0:
+                        margin += (
+                            calculate_margin(
+                                flag, price, underlying, leg.strike, leg.vol_mul
+                            )
+                            * leg.volume
+                            * MARGIN_RATIO
+                        )
+                assert grid.pnl[i, j, m] == pytest.approx(pnl, rel=1e-9, abs=1e-6)
+                assert grid.margin[i, j, m] == pytest.approx(margin, rel=1e-9)
+
+
+def test_scenario_frame_and_worst(legs):
+    grid = compute_scenario_grid(legs)
+    frame = grid.to_frame()
+    assert len(frame) == grid.pnl.size
+    assert frame.index.names == ["underlying_move", "vol_shift", "days_forward"]
+    worst = grid.worst()
+    assert worst["pnl"] == grid.pnl.min()
+    assert frame.loc[worst.name, "pnl"] == worst["pnl"]
+
+
+def test_empty_legs():
+    grid = compute_scenario_grid(pd.DataFrame(columns=LEG_COLUMNS), [0.0], [0.0])
+    assert grid.pnl.shape == (1, 1, 3)
+    assert not grid.pnl.any() and not grid.margin.any()
@@ -0,0 +1,91 @@
+# test_strategy_combination.py
+# StrategyCombination.refresh按最近交易日恢复组合持仓的测试（内存PocketBase）
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.stand_ins import MemoryDataFeed
+from strategies.base import StrategyCombination
+
+STRATEGY_ID = "teststrategy001"
+
+
+class AlwaysTradeCalendar:
+    def is_trade_date(self, date):
+        return True
+
+
+@pytest.fixture
+def datafeed(monkeypatch):
+    monkeypatch.setattr(
+        MemoryDataFeed, "trade_calendar", property(lambda self: AlwaysTradeCalendar())
+    )
+    return MemoryDataFeed()
+
+
+def make_combination(datafeed):
+    strategy = SimpleNamespace(
+        datafeed=datafeed, strategy_id=STRATEGY_ID, user_id="testuser0000001"
+    )
+    return StrategyCombination(strategy)
+
+
+def save(datafeed, instrument_id, volume, created):
+    datafeed.client.collection("strategyCombinations").create(
+        {
+            "strategy": STRATEGY_ID,
+            "instrumentId": instrument_id,
+            "instrumentName": instrument_id,
+            "volume": volume,
+            "created": created.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            "user": "testuser0000001",
+        }
+    )
+
+
+def count_records(datafeed):
+    return len(datafeed.client.collection("strategyCombinations").get_full_list())
+
+
+def test_released_today_not_restored(datafeed):
+    now = datetime.now(timezone.utc)
+    yesterday = now - timedelta(days=1)
+    save(datafeed, "A/B", 2, yesterday)
+    save(datafeed, "C/D", 1, yesterday)
+    # 当天两个组合都已解除
+    save(datafeed, "A/B", 0, now - timedelta(seconds=2))
+    save(datafeed, "C/D", 0, now - timedelta(seconds=1))
+
+    combination = make_combination(datafeed)
+    combination.refresh()
+    assert combination.combinations.empty
+    # 不会把前一天的组合重新保存
+    assert count_records(datafeed) == 4
+
+
+def test_partially_released_today(datafeed):
+    now = datetime.now(timezone.utc)
+    save(datafeed, "A/B", 2, now - timedelta(days=1))
+    save(datafeed, "A/B", 2, now - timedelta(seconds=3))
+    save(datafeed, "C/D", 1, now - timedelta(seconds=2))
+    save(datafeed, "A/B", 0, now - timedelta(seconds=1))
+
+    combination = make_combination(datafeed)
+    combination.refresh()
+    assert combination.combinations["instrument_id"].tolist() == ["C/D"]
+    assert count_records(datafeed) == 4
+
+
+def test_carry_forward_from_previous_day(datafeed):
+    yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+    save(datafeed, "A/B", 2, yesterday)
+    save(datafeed, "C/D", 1, yesterday + timedelta(seconds=1))
+    save(datafeed, "C/D", 0, yesterday + timedelta(seconds=2))
+
+    combination = make_combination(datafeed)
+    combination.refresh()
+    assert combination.combinations["instrument_id"].tolist() == ["A/B"]
+    # 当天是交易日且没有记录时保存最新持仓
+    assert count_records(datafeed) == 4
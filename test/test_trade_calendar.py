@@ -0,0 +1,116 @@
+# test_trade_calendar.py
+# 交易日历的范围检查和离线生成测试
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils import trade_calendar
+from src.utils.trade_calendar import (
+    CALENDAR_COLUMNS,
+    TradeCalendar,
+    load_calendar_binary,
+    load_calendar_csv,
+)
+
+
+@pytest.fixture(scope="module")
+def calendar():
+    return TradeCalendar()
+
+
+def test_bundled_calendar_covers_today(calendar):
+    assert calendar.covers(date.today())
+    assert calendar.is_trade_date(date(2026, 10, 9))
+    assert not calendar.is_trade_date(date(2026, 10, 5))  # 国庆休市
+    assert calendar.get_next_trade_date(date(2026, 9, 30)) == date(2026, 10, 8)
+
+
+def test_binary_matches_csv():
+    pd.testing.assert_frame_equal(
+        load_calendar_binary()[CALENDAR_COLUMNS],
+        load_calendar_csv()[CALENDAR_COLUMNS],
+        check_dtype=False,
+    )
+
+
+def test_offline_dates_match_bundle(calendar):
+    dates = TradeCalendar._get_offline_dates(calendar.last_date.year)
+    pd.testing.assert_frame_equal(
+        dates[CALENDAR_COLUMNS].reset_index(drop=True),
+        calendar.trade_dates[CALENDAR_COLUMNS].reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_offline_dates_missing_year():
+    with pytest.raises(ValueError):
+        TradeCalendar._get_offline_dates(2099)
+
+
+def test_navigation_after_calendar_raises(calendar):
+    after = date(calendar.last_date.year + 1, 1, 5)
+    with pytest.raises(ValueError):
+        calendar.get_pre_trade_date(after)
+    with pytest.raises(ValueError):
+        calendar.get_next_trade_date(after)
+    with pytest.raises(ValueError):
+        calendar.offset_trade_date(after, -1)
+    with pytest.raises(ValueError):
+        calendar.count_trade_dates(calendar.last_date, after)
+    with pytest.raises(ValueError):
+        calendar.get_pre_trade_dates([calendar.last_date, after])
+    with pytest.raises(ValueError):
+        calendar.count_trade_dates_between([calendar.last_date], [after])
+    # 范围内的最后一天仍可查询，之后没有交易日时返回None/NaT
+    assert calendar.is_trade_date(calendar.last_date)
+    assert calendar.get_next_trade_date(calendar.last_date) is None
+    assert np.isnat(calendar.get_next_trade_dates([calendar.last_date])[0])
+
+
+def test_is_trade_date_after_calendar(monkeypatch):
+    # 判断类查询返回False，只记录一次警告，策略启动时的判断不会因此失败
+    calendar = TradeCalendar()
+    messages = []
+    monkeypatch.setattr(
+        trade_calendar, "log", lambda message, level: messages.append(level)
+    )
+    after = date(calendar.last_date.year + 1, 1, 5)
+    assert not calendar.is_trade_date(after)
+    np.testing.assert_array_equal(
+        calendar.is_trade_dates([calendar.last_date, after]), [True, False]
+    )
+    assert calendar.get_day_info(after) is None
+    assert messages == ["warning"]
+
+
+def test_empty_calendar():
+    calendar = TradeCalendar(pd.DataFrame(columns=CALENDAR_COLUMNS))
+    dates = [date(2026, 10, 9), date(2026, 10, 10)]
+    assert not calendar.is_trade_date(dates[0])
+    np.testing.assert_array_equal(calendar.is_trade_dates(dates), [False, False])
+    assert calendar.get_pre_trade_date(dates[0]) is None
+    assert calendar.get_next_trade_date(dates[0]) is None
+    assert calendar.offset_trade_date(dates[0], 1) is None
+    assert np.isnat(calendar.get_next_trade_dates(dates)).all()
+
+
+def test_stale_calendar_stays_offline(monkeypatch):
+    # 运行时不应联网，也不应改写随代码发布的交易日历文件
+    calls = []
+
+    def forbidden(*args, **kwargs):
+        calls.append(args)
+        raise RuntimeError("forbidden")
+
+    monkeypatch.setattr(trade_calendar, "_trade_calendar", None)
+    monkeypatch.setattr(TradeCalendar, "covers", lambda self, day: False)
+    monkeypatch.setattr(TradeCalendar, "_get_online_dates", forbidden)
+    monkeypatch.setattr(trade_calendar, "_save_dates", forbidden)
+    monkeypatch.setattr(trade_calendar, "save_calendar_binary", forbidden)
+    calendar = trade_calendar.get_trade_calendar()
+    assert calls == []
+    assert len(calendar.dates) > 0
+    assert trade_calendar.get_trade_calendar() is calendar